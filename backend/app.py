@@ -6,7 +6,10 @@ Flask backend with issue tracker and e-commerce demo
 from flask import Flask, jsonify
 from flask_cors import CORS
 from config import Config
+from ecommerce.catalog import init_catalog
 from models.base import init_db
+from services.job_queue import init_job_queue
+from services.llm_client import get_llm_client
 
 # Import blueprints
 from routes.issues import issues_bp
@@ -22,11 +25,18 @@ def create_app(config_class=Config):
     CORS(app,
          resources={r"/api/*": {"origins": "*"}},
          methods=["GET", "POST", "DELETE", "PUT", "OPTIONS"],
-         allow_headers=["Content-Type", "Authorization"])
+         allow_headers=["Content-Type", "Authorization", "If-None-Match"],
+         expose_headers=["X-Next-Cursor", "X-Total-Count"])
 
     # Initialize database
     init_db(app)
 
+    # Load the product catalog
+    init_catalog(app)
+
+    # Start background AI fix workers
+    init_job_queue(app)
+
     # Register blueprints
     app.register_blueprint(issues_bp, url_prefix='/api/issues')
     app.register_blueprint(shop_bp, url_prefix='/api/shop')
@@ -34,7 +44,12 @@ def create_app(config_class=Config):
     # Health check endpoint
     @app.route('/health', methods=['GET'])
     def health_check():
-        return jsonify({"status": "healthy", "service": "jerai-backend"})
+        llm_cache = get_llm_client().cache
+        return jsonify({
+            "status": "healthy",
+            "service": "jerai-backend",
+            "llm_cache": llm_cache.stats() if llm_cache else None
+        })
 
     @app.route('/', methods=['GET'])
     def root():
@@ -27,5 +27,63 @@ class Config:
 
     CEREBRAS_API_KEY = os.getenv('CEREBRAS_API_KEY')
     CEREBRAS_API_URL = os.getenv('CEREBRAS_API_URL', 'https://api.cerebras.ai/v1/chat/completions')
+    CEREBRAS_MODEL = os.getenv('CEREBRAS_MODEL', 'llama3.1-8b')
+
+    # Shared LLM HTTP client
+    LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', '10'))
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '30'))
+    # Stream completions token by token to GET /api/issues/<id>/ai-fix/jobs/<job_id>/stream
+    LLM_STREAMING = os.getenv('LLM_STREAMING', 'true').lower() == 'true'
+    SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+
+    # LLM response cache (in-memory LRU, optionally backed by the llm_cache table)
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '512'))
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', '86400'))
+    LLM_CACHE_SQL = os.getenv('LLM_CACHE_SQL', 'false').lower() == 'true'
+    LLM_CACHE_MAX_ROWS = int(os.getenv('LLM_CACHE_MAX_ROWS', '10000'))
+    # Completions sampled above this temperature are never cached (0 = deterministic ones only)
+    LLM_CACHE_MAX_TEMPERATURE = float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', '0'))
+
+    # Product catalog: 'file' (CATALOG_PATH, default ecommerce/products.json) or 'db' (products table)
+    CATALOG_SOURCE = os.getenv('CATALOG_SOURCE', 'file')
+    CATALOG_PATH = os.getenv('CATALOG_PATH')
+
+    # Server-side cart sessions (in-memory LRU, optionally written through to cart_sessions)
+    CART_TTL = int(os.getenv('CART_TTL', '86400'))
+    CART_MAX_SESSIONS = int(os.getenv('CART_MAX_SESSIONS', '100000'))
+    CART_STORE_SQL = os.getenv('CART_STORE_SQL', 'false').lower() == 'true'
+
+    # Checked-out code the AI fixes are written against (read-only). No default: unset means
+    # no snapshots, no code context in prompts and no validation (docker-compose mounts /workspace)
+    WORKSPACE_PATH = os.getenv('WORKSPACE_PATH') or None
+    # Snapshots re-stat the workspace in the background at most this often (files are re-hashed
+    # only when changed); regular files larger than SNAPSHOT_MAX_FILE_BYTES are left out
+    SNAPSHOT_REFRESH_SECONDS = float(os.getenv('SNAPSHOT_REFRESH_SECONDS', '2'))
+    SNAPSHOT_MAX_FILE_BYTES = int(os.getenv('SNAPSHOT_MAX_FILE_BYTES', str(4 * 1024 * 1024)))
+
+    # Patch generation: candidates raced per fix (1 = single attempt), chars of each affected file in the prompt
+    PATCH_CANDIDATES = int(os.getenv('PATCH_CANDIDATES', '1'))
+    PATCH_CONTEXT_CHARS = int(os.getenv('PATCH_CONTEXT_CHARS', '6000'))
+
+    # Patch validation: tests of VALIDATION_PROJECT (a workspace directory) run against a sandbox copy.
+    # Off by default: the tests run LLM-written code, with network access (see services/validation.py)
+    VALIDATION_ENABLED = os.getenv('VALIDATION_ENABLED', 'false').lower() == 'true'
+    # Unprivileged user (name or uid) the tests run as; needs the backend to run as root
+    VALIDATION_RUN_AS_USER = os.getenv('VALIDATION_RUN_AS_USER') or None
+    VALIDATION_PROJECT = os.getenv('VALIDATION_PROJECT', 'backend')
+    # 'impacted' (tests that import or cover the changed files), 'all', or comma-separated test modules
+    VALIDATION_TESTS = os.getenv('VALIDATION_TESTS', 'impacted')
+    # Optional coverage data recorded with pytest --cov --cov-context=test, merged into the impact index
+    VALIDATION_COVERAGE_FILE = os.getenv('VALIDATION_COVERAGE_FILE')
+    VALIDATION_TIMEOUT = float(os.getenv('VALIDATION_TIMEOUT', '60'))
+    VALIDATION_WORKERS = int(os.getenv('VALIDATION_WORKERS', '4'))
 
     MCP_GATEWAY_URL = os.getenv('MCP_GATEWAY_URL', 'http://mcp-agent.railway.internal:9000')
+
+    # Background AI fix jobs
+    AI_FIX_MAX_WORKERS = int(os.getenv('AI_FIX_MAX_WORKERS', '2'))
+    AI_FIX_POLL_INTERVAL = float(os.getenv('AI_FIX_POLL_INTERVAL', '5'))
+    AI_FIX_JOB_STALE_SECONDS = int(os.getenv('AI_FIX_JOB_STALE_SECONDS', '300'))
+    AI_FIX_QUEUE_AUTOSTART = os.getenv('AI_FIX_QUEUE_AUTOSTART', 'true').lower() == 'true'
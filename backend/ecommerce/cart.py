@@ -1,156 +1,136 @@
 """
-Shopping cart with INTENTIONAL FLOAT BUG for AI to fix.
+Shopping cart with exact integer-cents money.
 
-The bug: Using float arithmetic causes rounding errors in tax/discount calculations.
-Expected: Classic Cotton Shirt ($29.99) + Wool Socks ($12.99) = $42.98
-With 10% discount and 8.875% tax should be $41.63
-Actual: Gets $41.62 or $41.64 due to float precision issues
+Lines are stored as two parallel array('q') columns - price in cents and
+quantity - and the subtotal and item count are kept up to date on every
+change, so adding a line and pricing the cart are both O(1) however many
+lines a (B2B) cart has. Discount and tax are exact and rounded half-up to
+the cent (see ecommerce/pricing.py):
 
-AI should fix by replacing float with Decimal type.
+Classic Cotton Shirt ($29.99) + Wool Socks ($12.99) = $42.98
+10% discount: -$4.30, 8.875% tax: +$3.43, total $42.11
 """
 
+from array import array
+from collections.abc import Sequence
+
+from ecommerce.catalog import get_catalog
+from ecommerce.pricing import price_cart, to_cents
+
 
 def compute_total(items, discount_pct=0.0, tax_pct=0.0):
     """
-    Compute cart total with discount and tax - BUGGY VERSION
-    
-    BUG: Using float causes rounding errors in money calculations
-    Example: 29.99 + 12.99 = 42.98 with 10% discount and 8.875% tax
-    Should be $41.63, but float math gives $41.62 or $41.64
-    
-    Formula: (subtotal - discount) * (1 + tax_rate)
+    Compute cart total in cents with discount and tax.
+
+    items are {"price": cents, "qty": n} mappings.
+    Formula: (subtotal - discount) + tax, each step rounded half-up to the cent
     """
-    # Convert cents to dollars (this introduces float precision issues)
-    subtotal = sum(item['price'] * item.get('qty', 1) for item in items) / 100.0
-    
-    # Apply discount (float arithmetic)
-    discount = subtotal * discount_pct
-    after_discount = subtotal - discount
-    
-    # Apply tax (more float arithmetic)
-    tax = after_discount * tax_pct
-    total = after_discount + tax
-    
-    # Convert back to cents, but rounding is wrong due to float precision!
-    return round(total * 100)
+    lines = ((item['price'], item.get('qty', 1)) for item in items)
+    return price_cart(lines, discount_pct, tax_pct)['total']
+
+
+class CartItemsView(Sequence):
+    """Read-only, live view of a cart's lines as {"price": cents, "qty": n}"""
+
+    __slots__ = ('_cart',)
+
+    def __init__(self, cart):
+        self._cart = cart
+
+    def __len__(self):
+        return len(self._cart._prices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {"price": self._cart._prices[index], "qty": self._cart._qtys[index]}
 
 
 class Cart:
-    """Shopping cart with buggy float-based calculations"""
+    """Shopping cart with parallel integer columns and running totals"""
 
     def __init__(self):
-        self.items = []
+        self._prices = array('q')   # cents
+        self._qtys = array('q')
+        self._subtotal = 0          # cents
+        self._items_count = 0
 
     def add_item(self, price: float, qty: int = 1):
-        """Add item to cart (price in cents)"""
-        self.items.append({"price": int(price * 100), "qty": qty})
+        """Add item to cart (price in dollars, stored as cents)"""
+        if qty < 0:
+            raise ValueError('Quantity must not be negative')
+        cents = to_cents(price)
+        self._prices.append(cents)
+        self._qtys.append(qty)
+        self._subtotal += cents * qty
+        self._items_count += qty
+
+    def update_qty(self, index: int, qty: int):
+        """Change the quantity of one line"""
+        if qty < 0:
+            raise ValueError('Quantity must not be negative')
+        old_qty = self._qtys[index]
+        self._qtys[index] = qty
+        self._subtotal += self._prices[index] * (qty - old_qty)
+        self._items_count += qty - old_qty
+
+    def remove_item(self, index: int):
+        """Remove one line"""
+        self._subtotal -= self._prices[index] * self._qtys[index]
+        self._items_count -= self._qtys[index]
+        del self._prices[index]
+        del self._qtys[index]
 
     def clear(self):
         """Remove all items"""
-        self.items = []
+        self._prices = array('q')
+        self._qtys = array('q')
+        self._subtotal = 0
+        self._items_count = 0
+
+    @property
+    def subtotal_cents(self) -> int:
+        return self._subtotal
+
+    @property
+    def items_count(self) -> int:
+        return self._items_count
 
     def calculate_total(self, discount_pct: float = 0.0, tax_pct: float = 0.0) -> dict:
         """
-        Calculate cart total with discount and tax using buggy function.
+        Calculate cart total with discount and tax from the running subtotal.
         Returns dict with breakdown for frontend display.
         """
-        if not self.items:
+        if not self._prices:
             return {"subtotal": 0, "total": 0, "items_count": 0}
-            
-        # Use the buggy compute_total function
-        total_cents = compute_total(self.items, discount_pct, tax_pct)
-        subtotal_cents = sum(item["price"] * item["qty"] for item in self.items)
-        
+
+        # One "line" carrying the running subtotal prices the cart in O(1)
+        result = price_cart([(self._subtotal, 1)], discount_pct, tax_pct)
+
         return {
-            "subtotal": subtotal_cents / 100.0,
+            "subtotal": result["subtotal"] / 100.0,
             "discount_pct": discount_pct,
             "tax_pct": tax_pct,
-            "total": total_cents / 100.0,
-            "items_count": sum(item["qty"] for item in self.items)
+            "discount": result["discount"] / 100.0,
+            "tax": result["tax"] / 100.0,
+            "total": result["total"] / 100.0,
+            "items_count": self._items_count
         }
 
     def get_items(self):
-        """Get all cart items"""
-        return self.items.copy()
-
-
-# Clothing product catalog with realistic prices
-CLOTHING_PRODUCTS = [
-    {
-        "id": 1,
-        "name": "Classic Cotton Shirt",
-        "price": 29.99,
-        "description": "100% organic cotton, available in multiple colors",
-        "category": "shirts",
-        "image": "https://images.unsplash.com/photo-1521572163474-6864f9cf17ab?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 2,
-        "name": "Denim Casual Shirt",
-        "price": 39.99,
-        "description": "Premium denim with comfortable fit",
-        "category": "shirts",
-        "image": "https://images.unsplash.com/photo-1596755094514-f87e34085b2c?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 3,
-        "name": "Leather Work Boots",
-        "price": 89.99,
-        "description": "Durable leather boots for all-day comfort",
-        "category": "boots",
-        "image": "https://images.unsplash.com/photo-1544966503-7cc5ac882d5e?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 4,
-        "name": "Hiking Boots",
-        "price": 79.99,
-        "description": "Waterproof hiking boots with ankle support",
-        "category": "boots",
-        "image": "https://images.unsplash.com/photo-1605348532760-6753d2c43329?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 5,
-        "name": "Wool Socks",
-        "price": 12.99,
-        "description": "Merino wool socks, pack of 3",
-        "category": "socks",
-        "image": "https://images.unsplash.com/photo-1586350977771-b3b0abd50c82?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 6,
-        "name": "Athletic Socks",
-        "price": 8.99,
-        "description": "Moisture-wicking athletic socks, pack of 5",
-        "category": "socks",
-        "image": "https://images.unsplash.com/photo-1544966503-7cc5ac882d5e?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 7,
-        "name": "Designer Jeans",
-        "price": 59.99,
-        "description": "Premium denim jeans with perfect fit",
-        "category": "clothes",
-        "image": "https://images.unsplash.com/photo-1542272604-787c3835535d?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 8,
-        "name": "Cozy Sweater",
-        "price": 49.99,
-        "description": "Soft knit sweater for cold weather",
-        "category": "clothes",
-        "image": "https://images.unsplash.com/photo-1434389677669-e08b4cac3105?w=300&h=300&fit=crop"
-    }
-]
+        """Get a read-only view of the cart items"""
+        return CartItemsView(self)
+
+
+# Clothing product catalog - the shared, indexed catalog (ecommerce/catalog.py)
+CLOTHING_PRODUCTS = get_catalog().products
 
 
 def get_product_by_id(product_id: int):
     """Get product by ID"""
-    for product in CLOTHING_PRODUCTS:
-        if product["id"] == product_id:
-            return product
-    return None
+    return get_catalog().get(product_id)
 
 
 def get_all_products():
     """Get all products"""
-    return CLOTHING_PRODUCTS
\ No newline at end of file
+    return get_catalog().products
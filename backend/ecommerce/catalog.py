@@ -0,0 +1,148 @@
+"""
+Indexed product catalog - the single source of products for the shop API and the cart.
+
+Products are loaded once from ecommerce/products.json (or the products
+table with CATALOG_SOURCE=db) and indexed by id and by category, with a
+price-sorted view per category for range filters. Rendered JSON
+responses are cached as bytes together with an ETag derived from the
+catalog version, so repeat requests cost a dict lookup and unchanged
+clients get a 304.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from models.product import Product
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), 'products.json')
+ALL = None   # by_category key for "every category"
+
+
+class Catalog:
+    """Immutable, indexed set of products (dicts with id, name, price, category, ...)"""
+
+    def __init__(self, products: list, max_cached_responses: int = 256):
+        self.products = sorted(products, key=lambda p: p['id'])
+        self.by_id = {p['id']: p for p in self.products}
+
+        # Per category (and ALL): products in id order, and in price order with their prices
+        self.by_category = {ALL: self.products}
+        for product in self.products:
+            self.by_category.setdefault(product['category'], []).append(product)
+        self._by_price = {}
+        for category, products in self.by_category.items():
+            ordered = sorted(products, key=lambda p: (p['price'], p['id']))
+            self._by_price[category] = (ordered, [p['price'] for p in ordered])
+
+        canonical = json.dumps(self.products, sort_keys=True, separators=(',', ':'))
+        self.version = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+        self.max_cached_responses = max_cached_responses
+        self._responses = OrderedDict()   # query key -> (body bytes, etag)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_json_file(cls, path: str = DEFAULT_CATALOG_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_table(cls):
+        """Load from the products table (needs an app context)"""
+        return cls([product.to_dict() for product in Product.query.all()])
+
+    @property
+    def categories(self) -> list:
+        return sorted(c for c in self.by_category if c is not ALL)
+
+    def get(self, product_id: int):
+        return self.by_id.get(product_id)
+
+    def query(self, category: str = None, min_price: float = None, max_price: float = None,
+              offset: int = 0, limit: int = None) -> tuple:
+        """Products matching the filters in id order, paginated, plus the total match count"""
+        if category is not ALL and category not in self.by_category:
+            return [], 0
+
+        if min_price is None and max_price is None:
+            matches = self.by_category[category]
+        else:
+            ordered, prices = self._by_price[category]
+            lo = 0 if min_price is None else bisect.bisect_left(prices, min_price)
+            hi = len(prices) if max_price is None else bisect.bisect_right(prices, max_price)
+            matches = sorted(ordered[lo:hi], key=lambda p: p['id'])
+
+        end = len(matches) if limit is None else offset + limit
+        return matches[offset:end], len(matches)
+
+    def render(self, **filters) -> tuple:
+        """JSON body bytes and ETag for query(**filters), cached per catalog version"""
+        key = tuple(sorted(filters.items()))
+
+        def build():
+            products, total = self.query(**filters)
+            body = json.dumps({'products': products, 'total': total}, separators=(',', ':'))
+            return body.encode('utf-8'), f"{self.version}-{hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:12]}"
+
+        return self._cached(key, build)
+
+    def render_product(self, product_id: int):
+        """JSON body bytes and ETag for one product, or None"""
+        product = self.by_id.get(product_id)
+        if product is None:
+            return None
+        return self._cached(('product', product_id), lambda: (
+            json.dumps(product, separators=(',', ':')).encode('utf-8'),
+            f"{self.version}-p{product_id}"
+        ))
+
+    def _cached(self, key, build):
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached is not None:
+                self._responses.move_to_end(key)
+                return cached
+
+        rendered = build()
+        with self._lock:
+            self._responses[key] = rendered
+            while len(self._responses) > self.max_cached_responses:
+                self._responses.popitem(last=False)
+        return rendered
+
+
+# Singleton instance
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog() -> Catalog:
+    """The shared catalog, loaded from CATALOG_PATH on first use"""
+    from config import Config
+
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = Catalog.from_json_file(Config.CATALOG_PATH or DEFAULT_CATALOG_PATH)
+    return _catalog
+
+
+def init_catalog(app):
+    """Load the catalog for the app; CATALOG_SOURCE=db reads the products table"""
+    global _catalog
+    if app.config.get('CATALOG_SOURCE') != 'db':
+        get_catalog()
+        return
+
+    with app.app_context():
+        catalog = Catalog.from_table()
+    if not catalog.products:
+        print('[Catalog] products table is empty, falling back to the JSON catalog')
+        get_catalog()
+        return
+    with _catalog_lock:
+        _catalog = catalog
+    print(f'[Catalog] Loaded {len(catalog.products)} products from the database')
@@ -0,0 +1,125 @@
+"""
+Exact integer-cents pricing, one cart or millions at a time.
+
+Money is always integer cents. Discount and tax rates are turned into
+exact fractions (Decimal(str(rate)).as_integer_ratio()), so 0.08875 is
+71/800 and not the nearest binary float. Each step is rounded half-up
+to the cent, exactly like Decimal.quantize(Decimal('0.01'), ROUND_HALF_UP):
+
+    discount = round_half_up(subtotal * discount_rate)
+    tax      = round_half_up((subtotal - discount) * tax_rate)
+    total    = subtotal - discount + tax
+
+price_carts() prices a whole batch with numpy array operations over the
+flattened line items instead of a Python loop per cart.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+import numpy as np
+
+# Bound on intermediate products for int64 arithmetic; beyond it use Python ints
+INT64_SAFE = 2 ** 62
+
+
+@lru_cache(maxsize=4096)
+def rate_fraction(rate) -> tuple:
+    """A rate such as 0.08875 as an exact (numerator, denominator) pair"""
+    numerator, denominator = Decimal(str(rate)).as_integer_ratio()
+    if numerator < 0:
+        raise ValueError(f'Rate must not be negative: {rate}')
+    return numerator, denominator
+
+
+@lru_cache(maxsize=65536)
+def to_cents(price) -> int:
+    """Dollar amount to integer cents, rounded half-up"""
+    cents = (Decimal(str(price)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+    if cents < 0:
+        raise ValueError(f'Price must not be negative: {price}')
+    return int(cents)
+
+
+def div_half_up(numerator, denominator):
+    """numerator / denominator rounded half-up; works on ints and integer arrays"""
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def price_cart(lines, discount_pct=0.0, tax_pct=0.0) -> dict:
+    """Price one cart given (price_cents, qty) pairs"""
+    discount_num, discount_den = rate_fraction(discount_pct)
+    tax_num, tax_den = rate_fraction(tax_pct)
+    if discount_num > discount_den:
+        raise ValueError(f'Discount must not exceed 100%: {discount_pct}')
+
+    subtotal = 0
+    items_count = 0
+    for price_cents, qty in lines:
+        subtotal += price_cents * qty
+        items_count += qty
+
+    discount = div_half_up(subtotal * discount_num, discount_den)
+    tax = div_half_up((subtotal - discount) * tax_num, tax_den)
+    return {
+        'subtotal': subtotal,
+        'discount': discount,
+        'tax': tax,
+        'total': subtotal - discount + tax,
+        'items_count': items_count
+    }
+
+
+def price_carts(price_cents, qty, offsets, discount_pcts, tax_pcts) -> dict:
+    """
+    Price many carts at once.
+
+    price_cents and qty are the line items of all carts, concatenated;
+    cart i owns lines offsets[i]:offsets[i + 1] (len(offsets) == carts + 1).
+    Returns integer arrays: subtotal, discount, tax, total, items_count.
+    """
+    price_cents = np.asarray(price_cents, dtype=np.int64)
+    qty = np.asarray(qty, dtype=np.int64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if len(offsets) != len(discount_pcts) + 1 or len(discount_pcts) != len(tax_pcts):
+        raise ValueError('offsets must have one more entry than there are carts')
+    if offsets[0] != 0 or offsets[-1] != len(price_cents) or (np.diff(offsets) < 0).any():
+        raise ValueError('offsets must run from 0 to the number of lines, non-decreasing')
+    if (price_cents < 0).any() or (qty < 0).any():
+        raise ValueError('Prices and quantities must not be negative')
+
+    # Carts share a handful of distinct rates: convert each distinct rate once
+    discount_rates, discount_index = np.unique(np.asarray(discount_pcts, dtype=np.float64), return_inverse=True)
+    tax_rates, tax_index = np.unique(np.asarray(tax_pcts, dtype=np.float64), return_inverse=True)
+    discount = [rate_fraction(float(r)) for r in discount_rates]
+    tax = [rate_fraction(float(r)) for r in tax_rates]
+    if any(num > den for num, den in discount):
+        raise ValueError('Discount must not exceed 100%')
+
+    # Exact int64 unless the intermediate products could overflow it
+    largest_line = int(price_cents.max(initial=0)) * int(qty.max(initial=0))
+    largest_rate = max((n + d for n, d in discount + tax), default=1)
+    dtype = np.int64 if largest_line * len(qty) * 2 * largest_rate < INT64_SAFE else object
+    price_cents = price_cents.astype(dtype)
+    qty = qty.astype(dtype)
+    discount = np.array(discount, dtype=dtype).reshape(-1, 2)[discount_index]
+    tax = np.array(tax, dtype=dtype).reshape(-1, 2)[tax_index]
+
+    # Per-cart sums as differences of one running sum: exact, and empty carts are 0
+    zero = np.zeros(1, dtype=dtype)
+    line_totals = np.concatenate((zero, np.cumsum(price_cents * qty)))
+    subtotal = line_totals[offsets[1:]] - line_totals[offsets[:-1]]
+    qty_totals = np.concatenate((zero, np.cumsum(qty)))
+    items_count = qty_totals[offsets[1:]] - qty_totals[offsets[:-1]]
+
+    discount_cents = div_half_up(subtotal * discount[:, 0], discount[:, 1])
+    after_discount = subtotal - discount_cents
+    tax_cents = div_half_up(after_discount * tax[:, 0], tax[:, 1])
+
+    return {
+        'subtotal': subtotal,
+        'discount': discount_cents,
+        'tax': tax_cents,
+        'total': after_discount + tax_cents,
+        'items_count': items_count
+    }
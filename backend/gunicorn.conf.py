@@ -0,0 +1,72 @@
+"""
+Gunicorn settings for the Jerai backend (gunicorn -c gunicorn.conf.py wsgi:app)
+
+Every setting can be overridden from the environment. The app is
+imported once in the master (preload) and served by one worker on a
+thread pool (gthread, so SSE streams and slow LLM calls do not block
+it). One worker is the default because the AI fix stream hub is
+per-process, and so is the cart store unless CART_STORE_SQL=true.
+Workers are not recycled by request count: a recycled worker drops its
+streams and carts. kill -HUP <master> replaces the worker gracefully;
+with preloading, new code needs a restart (or USR2 + QUIT on the old
+master).
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Recycle workers after this many requests (staggered by the jitter); 0 never recycles
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+
+# A worker silent for timeout seconds is killed; on shutdown, requests get graceful_timeout to finish
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# How long an exiting worker waits for its running AI fix jobs before handing them back to the queue.
+# Kept below graceful_timeout, after which the master kills the worker.
+JOB_DRAIN_SECONDS = float(os.getenv('GUNICORN_JOB_DRAIN_SECONDS', str(graceful_timeout * 2 // 3)))
+
+# Empty GUNICORN_ACCESS_LOG turns the access log off
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    """Warn about state that is not shared between workers"""
+    from config import Config
+
+    if workers > 1:
+        server.log.warning(
+            'GUNICORN_WORKERS=%d: live AI fix streams only reach clients on the worker running the job%s',
+            workers, '' if Config.CART_STORE_SQL else ', and carts are per worker (set CART_STORE_SQL=true)')
+
+
+def post_fork(server, worker):
+    """Give each worker its own database connections and AI fix queue"""
+    from config import Config
+    from models.base import db
+    from wsgi import app
+
+    # Connections opened in the master (create_all) must not be shared across processes
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+    if Config.AI_FIX_QUEUE_AUTOSTART:
+        app.extensions['ai_fix_queue'].start()
+
+
+def worker_exit(server, worker):
+    """Let running AI fix jobs finish, or hand them back to the queue for the next worker"""
+    from wsgi import app
+
+    handed_back = app.extensions['ai_fix_queue'].drain(JOB_DRAIN_SECONDS)
+    if handed_back:
+        server.log.info('Worker %s handed %d AI fix job(s) back to the queue', worker.pid, handed_back)
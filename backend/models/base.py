@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
 
 db = SQLAlchemy()
 
@@ -8,3 +10,30 @@ def init_db(app):
     db.init_app(app)
     with app.app_context():
         db.create_all()
+        ensure_indexes()
+
+
+def ensure_indexes():
+    """
+    Create any index declared on the models that an existing table lacks.
+
+    create_all() only creates missing tables, so a database set up from an
+    older db/init/01_schema.sql never gets indexes added since (the issue
+    list keysets, the event timeline's (issue_id, ts)). An index counts as
+    present if the table has one on the same columns under any name, so
+    this is a no-op on an up-to-date schema and safe to run on every start.
+    """
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {tuple(index['column_names']) for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if tuple(column.name for column in index.columns) in existing:
+                continue
+            try:
+                index.create(bind=db.engine)
+                print(f"[DB] Created index {index.name} on {table.name}")
+            except SQLAlchemyError as e:
+                # Another process starting at the same time may have just created it
+                print(f"[DB] Could not create index {index.name} on {table.name}: {e}")
@@ -0,0 +1,11 @@
+from datetime import datetime
+from models.base import db
+
+
+class LLMCacheEntry(db.Model):
+    __tablename__ = 'llm_cache'
+
+    cache_key = db.Column(db.String(64), primary_key=True)
+    response = db.Column(db.Text(16777215), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
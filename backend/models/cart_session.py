@@ -0,0 +1,14 @@
+from datetime import datetime
+from models.base import db
+
+
+class CartSessionRow(db.Model):
+    __tablename__ = 'cart_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)
+    state_json = db.Column(db.JSON, nullable=False)
+    # Compare-and-set token for writers (mirrors state_json['version'])
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                          onupdate=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -1,6 +1,10 @@
+import json
 from datetime import datetime
 from models.base import db
 
+# Payload values bigger than this (serialized) are left out of summaries
+SUMMARY_MAX_CHARS = 256
+
 
 class Event(db.Model):
     __tablename__ = 'events'
@@ -12,13 +16,28 @@ class Event(db.Model):
     payload_json = db.Column(db.JSON, nullable=True)
     ts = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
 
-    def to_dict(self):
-        """Convert event to dictionary"""
-        return {
+    # Timeline reads walk one issue's events in (ts, id) order
+    __table_args__ = (
+        db.Index('idx_issue_id_ts', 'issue_id', 'ts'),
+    )
+
+    def to_dict(self, summary=False):
+        """Convert event to dictionary; summary leaves out large payload fields"""
+        payload = self.payload_json
+        omitted = None
+        if summary and isinstance(payload, dict):
+            omitted = [key for key, value in payload.items()
+                       if len(json.dumps(value, default=str)) > SUMMARY_MAX_CHARS]
+            payload = {key: value for key, value in payload.items() if key not in omitted}
+
+        data = {
             'id': self.id,
             'issue_id': self.issue_id,
             'type': self.type,
             'actor': self.actor,
-            'payload': self.payload_json,
+            'payload': payload,
             'ts': self.ts.isoformat() if self.ts else None
         }
+        if omitted:
+            data['omitted'] = omitted
+        return data
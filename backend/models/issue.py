@@ -17,8 +17,20 @@ class Issue(db.Model):
 
     events = db.relationship('Event', backref='issue', lazy='dynamic', cascade='all, delete-orphan')
 
-    def to_dict(self):
-        """Convert issue to dictionary"""
+    # Keyset pagination walks (created_at, id) newest first, optionally within one filter
+    __table_args__ = (
+        db.Index('idx_created_at_id', 'created_at', 'id'),
+        db.Index('idx_state_created_at_id', 'state', 'created_at', 'id'),
+        db.Index('idx_type_created_at_id', 'type', 'created_at', 'id'),
+        db.Index('idx_created_by_created_at_id', 'created_by', 'created_at', 'id'),
+    )
+
+    FIELDS = ('id', 'title', 'type', 'state', 'created_by', 'created_at', 'updated_at')
+
+    def to_dict(self, fields=None):
+        """Convert issue to dictionary, optionally only the given fields"""
+        if fields is not None:
+            return {field: self._serialize(field) for field in fields}
         return {
             'id': self.id,
             'title': self.title,
@@ -28,3 +40,9 @@ class Issue(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+    def _serialize(self, field):
+        value = getattr(self, field)
+        if field in ('created_at', 'updated_at'):
+            return value.isoformat() if value else None
+        return value
@@ -0,0 +1,38 @@
+from datetime import datetime
+from models.base import db
+
+
+class AIFixJob(db.Model):
+    __tablename__ = 'ai_fix_jobs'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    issue_id = db.Column(db.BigInteger, db.ForeignKey('issues.id'), nullable=False, index=True)
+    # issue_id while queued or running, NULL once finished: at most one active job per issue
+    active_issue_id = db.Column(db.BigInteger, nullable=True, unique=True)
+    status = db.Column(db.Enum('queued', 'running', 'succeeded', 'failed', name='ai_fix_job_status'),
+                       nullable=False, default='queued', index=True)
+    stage = db.Column(db.String(32), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    result_json = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                          onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert job to dictionary"""
+        return {
+            'id': self.id,
+            'issue_id': self.issue_id,
+            'status': self.status,
+            'stage': self.stage,
+            'attempts': self.attempts,
+            'error': self.error,
+            'result': self.result_json,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,23 @@
+from models.base import db
+
+
+class Product(db.Model):
+    __tablename__ = 'products'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    price = db.Column(db.Numeric(10, 2), nullable=False, index=True)
+    description = db.Column(db.Text, nullable=True)
+    category = db.Column(db.String(64), nullable=False, index=True)
+    image = db.Column(db.String(1024), nullable=True)
+
+    def to_dict(self):
+        """Convert product to dictionary (price in dollars, as the shop API serves it)"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'price': float(self.price),
+            'description': self.description,
+            'category': self.category,
+            'image': self.image
+        }
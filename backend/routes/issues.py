@@ -1,17 +1,125 @@
-from flask import Blueprint, request, jsonify
+import base64
+import json
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.orm import load_only
 from models.base import db
 from models.issue import Issue
 from models.event import Event
+from models.job import AIFixJob
 from datetime import datetime
 
 issues_bp = Blueprint('issues', __name__)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 500
+
+# Bulk endpoints: items per request, and rows per transaction
+MAX_BATCH_ITEMS = 10000
+BATCH_CHUNK_SIZE = 1000
+
+# Column sizes (models/issue.py), checked before any insert
+MAX_TITLE_LENGTH = 500
+MAX_CREATED_BY_LENGTH = 64
+
+VALID_TRANSITIONS = {
+    'New': ['Active'],
+    'Active': ['Resolved'],
+    'Resolved': ['Closed'],
+    'Closed': ['Active'],
+    'Removed': []
+}
+
+ISSUE_FILTERS = {
+    'state': ('New', 'Active', 'Resolved', 'Closed', 'Removed'),
+    'type': ('BUG', 'STORY', 'TASK'),
+    'created_by': None
+}
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque cursor for a (timestamp, id) keyset"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on garbage"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def page_size():
+    """The limit query param, clamped to [1, MAX_PAGE_SIZE]"""
+    limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
 
 @issues_bp.route('/', methods=['GET'])
 def get_issues():
-    """Get all issues"""
-    issues = Issue.query.order_by(Issue.created_at.desc()).all()
-    return jsonify([issue.to_dict() for issue in issues])
+    """
+    Get issues, newest first, one page at a time.
+
+    Query params: limit, cursor (from X-Next-Cursor), state / type / created_by
+    (comma-separated), fields (comma-separated projection), count=true to add
+    X-Total-Count (an extra COUNT over the whole filter, so off by default).
+    """
+    try:
+        limit = page_size()
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    fields = None
+    if request.args.get('fields'):
+        fields = [f for f in request.args['fields'].split(',') if f]
+        unknown = [f for f in fields if f not in Issue.FIELDS]
+        if unknown:
+            return jsonify({'error': f'Unknown fields: {", ".join(unknown)}'}), 400
+
+    query = Issue.query
+    for name, allowed in ISSUE_FILTERS.items():
+        if not request.args.get(name):
+            continue
+        values = request.args[name].split(',')
+        if allowed is not None and any(v not in allowed for v in values):
+            return jsonify({'error': f'Invalid {name} filter'}), 400
+        column = getattr(Issue, name)
+        query = query.filter(column == values[0] if len(values) == 1 else column.in_(values))
+
+    total = None
+    if request.args.get('count', 'false').lower() == 'true':
+        total = query.order_by(None).count()
+
+    if request.args.get('cursor'):
+        try:
+            cursor_ts, cursor_id = decode_cursor(request.args['cursor'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        query = query.filter(or_(
+            Issue.created_at < cursor_ts,
+            and_(Issue.created_at == cursor_ts, Issue.id < cursor_id)
+        ))
+
+    if fields is not None:
+        # id and created_at are always loaded - the cursor needs them
+        columns = {'id', 'created_at', *fields}
+        query = query.options(load_only(*[getattr(Issue, f) for f in Issue.FIELDS if f in columns]))
+
+    issues = query.order_by(Issue.created_at.desc(), Issue.id.desc()).limit(limit + 1).all()
+    has_more = len(issues) > limit
+    issues = issues[:limit]
+
+    response = jsonify([issue.to_dict(fields) for issue in issues])
+    if has_more:
+        response.headers['X-Next-Cursor'] = encode_cursor(issues[-1].created_at, issues[-1].id)
+    if total is not None:
+        response.headers['X-Total-Count'] = str(total)
+    return response
 
 
 @issues_bp.route('/<int:issue_id>', methods=['GET', 'DELETE'])
@@ -23,8 +131,9 @@ def handle_issue(issue_id):
         return jsonify(issue.to_dict())
 
     elif request.method == 'DELETE':
-        # Delete associated events first
+        # Delete associated events and jobs first
         Event.query.filter_by(issue_id=issue_id).delete()
+        AIFixJob.query.filter_by(issue_id=issue_id).delete()
 
         # Delete the issue
         db.session.delete(issue)
@@ -33,13 +142,33 @@ def handle_issue(issue_id):
         return jsonify({'message': 'Issue deleted successfully'}), 200
 
 
+def issue_input_error(data):
+    """Why data cannot become an issue, or None if it can"""
+    if not isinstance(data, dict) or not data.get('title'):
+        return 'Title is required'
+    if not isinstance(data['title'], str) or len(data['title']) > MAX_TITLE_LENGTH:
+        return f'Title must be a string of at most {MAX_TITLE_LENGTH} characters'
+    if data.get('type', 'BUG') not in ISSUE_FILTERS['type']:
+        return f"Invalid type {data['type']}"
+    created_by = data.get('created_by', 'user')
+    if not isinstance(created_by, str) or len(created_by) > MAX_CREATED_BY_LENGTH:
+        return f'created_by must be a string of at most {MAX_CREATED_BY_LENGTH} characters'
+    return None
+
+
+def is_issue_id(value):
+    """JSON integers only - bool is an int subclass, so True would pass as 1"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
 @issues_bp.route('/', methods=['POST'])
 def create_issue():
     """Create new issue"""
     data = request.get_json()
 
-    if not data or not data.get('title'):
-        return jsonify({'error': 'Title is required'}), 400
+    error = issue_input_error(data)
+    if error:
+        return jsonify({'error': error}), 400
 
     issue = Issue(
         title=data['title'],
@@ -62,12 +191,77 @@ def create_issue():
     return jsonify(issue.to_dict()), 201
 
 
+def event_timeline_query(issue_id):
+    """Events of an issue, filtered by the types query param, oldest first"""
+    query = Event.query.filter_by(issue_id=issue_id)
+    if request.args.get('types'):
+        types = request.args['types'].split(',')
+        query = query.filter(Event.type == types[0] if len(types) == 1 else Event.type.in_(types))
+    return query.order_by(Event.ts.asc(), Event.id.asc())
+
+
 @issues_bp.route('/<int:issue_id>/events', methods=['GET'])
 def get_issue_events(issue_id):
-    """Get all events for an issue"""
+    """
+    Get events for an issue, oldest first, one page at a time.
+
+    Query params: limit, cursor (from X-Next-Cursor), types (comma-separated),
+    summary=true to leave out large payload fields.
+    """
     issue = Issue.query.get_or_404(issue_id)
-    events = Event.query.filter_by(issue_id=issue_id).order_by(Event.ts.asc()).all()
-    return jsonify([event.to_dict() for event in events])
+
+    try:
+        limit = page_size()
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    summary = request.args.get('summary', 'false').lower() == 'true'
+
+    query = event_timeline_query(issue_id)
+    if request.args.get('cursor'):
+        try:
+            cursor_ts, cursor_id = decode_cursor(request.args['cursor'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        query = query.filter(or_(
+            Event.ts > cursor_ts,
+            and_(Event.ts == cursor_ts, Event.id > cursor_id)
+        ))
+
+    events = query.limit(limit + 1).all()
+    has_more = len(events) > limit
+    events = events[:limit]
+
+    response = jsonify([event.to_dict(summary=summary) for event in events])
+    if has_more:
+        response.headers['X-Next-Cursor'] = encode_cursor(events[-1].ts, events[-1].id)
+    return response
+
+
+@issues_bp.route('/<int:issue_id>/events/<int:event_id>', methods=['GET'])
+def get_issue_event(issue_id, event_id):
+    """Get one event with its full payload (what summary=true left out)"""
+    event = Event.query.filter_by(id=event_id, issue_id=issue_id).first_or_404()
+    return jsonify(event.to_dict())
+
+
+@issues_bp.route('/<int:issue_id>/events/export', methods=['GET'])
+def export_issue_events(issue_id):
+    """Stream the full timeline as a JSON array, fetching rows in batches"""
+    issue = Issue.query.get_or_404(issue_id)
+    summary = request.args.get('summary', 'false').lower() == 'true'
+    query = event_timeline_query(issue_id).yield_per(EXPORT_BATCH_SIZE)
+
+    def generate():
+        yield '['
+        for i, event in enumerate(query):
+            yield (',\n' if i else '\n') + json.dumps(event.to_dict(summary=summary), default=str)
+        yield '\n]\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/json',
+        headers={'Content-Disposition': f'attachment; filename=issue-{issue_id}-events.json'}
+    )
 
 
 @issues_bp.route('/<int:issue_id>/transition', methods=['POST'])
@@ -82,15 +276,7 @@ def transition_issue(issue_id):
     old_state = issue.state
     new_state = data['to']
 
-    valid_transitions = {
-        'New': ['Active'],
-        'Active': ['Resolved'],
-        'Resolved': ['Closed'],
-        'Closed': ['Active'],
-        'Removed': []
-    }
-
-    if new_state not in valid_transitions.get(old_state, []):
+    if new_state not in VALID_TRANSITIONS.get(old_state, []):
         return jsonify({'error': f'Invalid transition from {old_state} to {new_state}'}), 400
 
     issue.state = new_state
@@ -108,45 +294,259 @@ def transition_issue(issue_id):
     return jsonify(issue.to_dict())
 
 
+def batch_items(key):
+    """The list under key in the JSON body, or an error response"""
+    data = request.get_json(silent=True)
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({'error': f'{key} must be a non-empty list'}), 400)
+    if len(items) > MAX_BATCH_ITEMS:
+        return None, (jsonify({'error': f'At most {MAX_BATCH_ITEMS} {key} per request'}), 400)
+    return items, None
+
+
+def chunked(items):
+    """Split items into BATCH_CHUNK_SIZE slices, one transaction each"""
+    for start in range(0, len(items), BATCH_CHUNK_SIZE):
+        yield items[start:start + BATCH_CHUNK_SIZE]
+
+
+def batch_response(results):
+    """Per-item results plus success/failure counts"""
+    succeeded = sum(1 for r in results if r['success'])
+    return jsonify({
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results
+    })
+
+
+@issues_bp.route('/batch', methods=['POST'])
+def batch_create_issues():
+    """Create many issues: {"issues": [{"title", "type", "created_by"}, ...]}"""
+    items, error = batch_items('issues')
+    if error:
+        return error
+
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        # Rejected here, one bad item cannot fail the insert of its whole chunk
+        error = issue_input_error(item)
+        if error:
+            results[index] = {'index': index, 'success': False, 'error': error}
+        else:
+            valid.append((index, item))
+
+    for chunk in chunked(valid):
+        try:
+            issues = [Issue(
+                title=item['title'],
+                type=item.get('type', 'BUG'),
+                created_by=item.get('created_by', 'user')
+            ) for _, item in chunk]
+            db.session.add_all(issues)
+            db.session.flush()
+
+            db.session.execute(insert(Event), [{
+                'issue_id': issue.id,
+                'type': 'IssueCreated',
+                'actor': item.get('created_by', 'user'),
+                'payload_json': {'title': item['title'], 'type': item.get('type', 'BUG')}
+            } for issue, (_, item) in zip(issues, chunk)])
+            db.session.commit()
+
+            for issue, (index, _) in zip(issues, chunk):
+                results[index] = {'index': index, 'success': True, 'issue': issue.to_dict()}
+        except Exception as e:
+            db.session.rollback()
+            for index, _ in chunk:
+                results[index] = {'index': index, 'success': False, 'error': str(e)}
+
+    return batch_response(results)
+
+
+@issues_bp.route('/batch/transition', methods=['POST'])
+def batch_transition_issues():
+    """Transition many issues: {"transitions": [{"id", "to"}, ...], "actor"}"""
+    items, error = batch_items('transitions')
+    if error:
+        return error
+    actor = request.get_json().get('actor', 'user')
+
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not is_issue_id(item.get('id')) or not item.get('to'):
+            results[index] = {'index': index, 'success': False, 'error': 'id and target state are required'}
+        else:
+            valid.append((index, item))
+
+    for chunk in chunked(valid):
+        try:
+            issues = {issue.id: issue for issue in
+                      Issue.query.filter(Issue.id.in_({item['id'] for _, item in chunk}))}
+            now = datetime.utcnow()
+            events = []
+            applied = []
+            for index, item in chunk:
+                issue = issues.get(item['id'])
+                if issue is None:
+                    results[index] = {'index': index, 'id': item['id'], 'success': False,
+                                      'error': 'Issue not found'}
+                    continue
+                old_state, new_state = issue.state, item['to']
+                if new_state not in VALID_TRANSITIONS.get(old_state, []):
+                    results[index] = {'index': index, 'id': item['id'], 'success': False,
+                                      'error': f'Invalid transition from {old_state} to {new_state}'}
+                    continue
+                issue.state = new_state
+                issue.updated_at = now
+                events.append({
+                    'issue_id': issue.id,
+                    'type': 'StateChanged',
+                    'actor': item.get('actor', actor),
+                    'payload_json': {'from': old_state, 'to': new_state}
+                })
+                applied.append((index, issue))
+
+            if events:
+                db.session.flush()
+                db.session.execute(insert(Event), events)
+            db.session.commit()
+
+            for index, issue in applied:
+                results[index] = {'index': index, 'id': issue.id, 'success': True, 'issue': issue.to_dict()}
+        except Exception as e:
+            db.session.rollback()
+            for index, item in chunk:
+                results[index] = {'index': index, 'id': item['id'], 'success': False, 'error': str(e)}
+
+    return batch_response(results)
+
+
+@issues_bp.route('/batch/delete', methods=['POST'])
+def batch_delete_issues():
+    """Delete many issues and their events and jobs: {"ids": [...]}"""
+    items, error = batch_items('ids')
+    if error:
+        return error
+
+    results = [None] * len(items)
+    valid = []
+    for index, issue_id in enumerate(items):
+        if not is_issue_id(issue_id):
+            results[index] = {'index': index, 'id': issue_id, 'success': False, 'error': 'id must be an integer'}
+        else:
+            valid.append((index, issue_id))
+
+    for chunk in chunked(valid):
+        ids = {issue_id for _, issue_id in chunk}
+        try:
+            existing = {row.id for row in Issue.query.with_entities(Issue.id).filter(Issue.id.in_(ids))}
+            if existing:
+                Event.query.filter(Event.issue_id.in_(existing)).delete(synchronize_session=False)
+                AIFixJob.query.filter(AIFixJob.issue_id.in_(existing)).delete(synchronize_session=False)
+                Issue.query.filter(Issue.id.in_(existing)).delete(synchronize_session=False)
+            db.session.commit()
+
+            for index, issue_id in chunk:
+                if issue_id in existing:
+                    results[index] = {'index': index, 'id': issue_id, 'success': True}
+                else:
+                    results[index] = {'index': index, 'id': issue_id, 'success': False,
+                                      'error': 'Issue not found'}
+        except Exception as e:
+            db.session.rollback()
+            for index, issue_id in chunk:
+                results[index] = {'index': index, 'id': issue_id, 'success': False, 'error': str(e)}
+
+    return batch_response(results)
+
+
 @issues_bp.route('/<int:issue_id>/ai-fix', methods=['POST'])
 def trigger_ai_fix(issue_id):
-    """Trigger AI fix for issue - runs complete workflow with all 3 sponsors"""
-    from services.ai_service import start_ai_fix
+    """Queue AI fix for issue - the workflow (Cerebras + Llama + MCP) runs in the background"""
+    from services.job_queue import get_job_queue
 
     issue = Issue.query.get_or_404(issue_id)
 
     if issue.state != 'Active':
         return jsonify({'error': 'Issue must be in Active state for AI fix'}), 400
 
-    # Log AI fix requested
-    event = Event(
-        issue_id=issue_id,
-        type='AIFixRequested',
-        actor='user',
-        payload_json={'title': issue.title}
-    )
-    db.session.add(event)
-    db.session.commit()
-
-    # Run AI fix workflow (Cerebras + Llama + MCP)
-    result = start_ai_fix(issue_id, issue.title)
-
-    # If successful, transition to Resolved
-    if result.get('success'):
-        issue.state = 'Resolved'
-        issue.updated_at = datetime.utcnow()
-
-        state_event = Event(
-            issue_id=issue_id,
-            type='StateChanged',
-            actor='ai-system',
-            payload_json={'from': 'Active', 'to': 'Resolved', 'reason': 'AI fix completed'}
-        )
-        db.session.add(state_event)
-        db.session.commit()
+    job, created = get_job_queue().enqueue(issue)
 
     return jsonify({
-        'success': result.get('success'),
-        'message': result.get('message'),
+        'success': True,
+        'message': 'AI fix queued' if created else 'AI fix already in progress',
+        'job': job.to_dict(),
         'issue': issue.to_dict()
-    })
+    }), 202
+
+
+@issues_bp.route('/<int:issue_id>/ai-fix/jobs/<int:job_id>', methods=['GET'])
+def get_ai_fix_job(issue_id, job_id):
+    """Get status and progress of an AI fix job"""
+    job = AIFixJob.query.filter_by(id=job_id, issue_id=issue_id).first_or_404()
+    return jsonify(job.to_dict())
+
+
+@issues_bp.route('/<int:issue_id>/ai-fix/jobs/<int:job_id>/stream', methods=['GET'])
+def stream_ai_fix(issue_id, job_id):
+    """
+    Live progress of one AI fix job as server-sent events: start, stage,
+    token ({stage, text}), event (each persisted event) and done ({status}).
+    The job's messages are replayed on connect, from Last-Event-ID if given.
+    A job this process is not running still gets its done, from the table.
+    """
+    from services.job_queue import ACTIVE_STATUSES
+    from services.stream_hub import get_stream_hub
+
+    AIFixJob.query.filter_by(id=job_id, issue_id=issue_id).first_or_404()
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        last_seq = 0
+    heartbeat = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)
+    hub = get_stream_hub()
+    subscription = hub.subscribe(job_id, last_seq)
+    app = current_app._get_current_object()
+
+    def finished_job():
+        """The job's done message if the table says it is over, else None"""
+        if hub.has_run(job_id):
+            return None
+        with app.app_context():
+            job = db.session.get(AIFixJob, job_id)
+            if job is None:
+                return {'job_id': job_id, 'status': 'failed', 'error': 'Job no longer exists'}
+            if job.status in ACTIVE_STATUSES:
+                return None
+            return {'job_id': job_id, 'status': job.status, 'error': job.error}
+
+    def generate():
+        try:
+            # Flush headers straight away; retry tells EventSource how soon to reconnect
+            yield 'retry: 3000\n: connected\n\n'
+            done = finished_job()
+            while done is None and not subscription.drained:
+                message = subscription.get(timeout=heartbeat)
+                if message is None:
+                    done = finished_job()
+                    if done is None:
+                        yield ': keepalive\n\n'
+                    continue
+                seq, event, data = message
+                yield f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+                if event == 'done':
+                    return
+            if done is not None:
+                yield f"event: done\ndata: {json.dumps(done, default=str)}\n\n"
+        finally:
+            subscription.close()
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
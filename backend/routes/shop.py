@@ -3,109 +3,14 @@ Shop API routes for e-commerce demo.
 Provides clothing products and exposes the buggy cart calculation that AI will fix.
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
+from ecommerce.catalog import get_catalog
+from ecommerce.pricing import price_carts, to_cents
+from services.cart_store import CartConflict, get_cart_store
 
 shop_bp = Blueprint('shop', __name__)
 
-# Clothing products data (same as frontend mock data)
-CLOTHING_PRODUCTS = [
-    {
-        "id": 1,
-        "name": "Classic Cotton Shirt",
-        "price": 29.99,
-        "description": "100% organic cotton, available in multiple colors",
-        "category": "shirts",
-        "image": "https://images.unsplash.com/photo-1521572163474-6864f9cf17ab?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 2,
-        "name": "Denim Casual Shirt",
-        "price": 39.99,
-        "description": "Premium denim with comfortable fit",
-        "category": "shirts",
-        "image": "https://images.unsplash.com/photo-1596755094514-f87e34085b2c?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 3,
-        "name": "Business Dress Shirt",
-        "price": 49.99,
-        "description": "Professional dress shirt for office wear",
-        "category": "shirts",
-        "image": "https://images.unsplash.com/photo-1602810318383-e386cc2a3ccf?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 4,
-        "name": "Leather Work Boots",
-        "price": 89.99,
-        "description": "Durable leather boots for all-day comfort",
-        "category": "boots",
-        "image": "https://images.unsplash.com/photo-1553699357-b454793abefa?q=80&w=1470&auto=format&fit=crop&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"
-    },
-    {
-        "id": 5,
-        "name": "Hiking Boots",
-        "price": 79.99,
-        "description": "Waterproof hiking boots with ankle support",
-        "category": "boots",
-        "image": "https://images.unsplash.com/photo-1605348532760-6753d2c43329?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 6,
-        "name": "Chelsea Boots",
-        "price": 99.99,
-        "description": "Stylish Chelsea boots for casual and formal wear",
-        "category": "boots",
-        "image": "https://images.unsplash.com/photo-1549298916-b41d501d3772?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 7,
-        "name": "Wool Socks",
-        "price": 12.99,
-        "description": "Merino wool socks, pack of 3",
-        "category": "socks",
-        "image": "https://images.unsplash.com/photo-1586350977771-b3b0abd50c82?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 8,
-        "name": "Athletic Socks",
-        "price": 8.99,
-        "description": "Moisture-wicking athletic socks, pack of 5",
-        "category": "socks",
-        "image": "https://images.unsplash.com/photo-1733409896722-56913a549739?w=500&auto=format&fit=crop&q=60&ixlib=rb-4.1.0&ixid=M3wxMjA3fDB8MHxzZWFyY2h8Mnx8YmxhY2slMjBzb2Nrc3xlbnwwfHwwfHx8MA%3D%3D"
-    },
-    {
-        "id": 9,
-        "name": "Dress Socks",
-        "price": 15.99,
-        "description": "Premium dress socks for business attire",
-        "category": "socks",
-        "image": "https://images.unsplash.com/photo-1556906781-9a412961c28c?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 10,
-        "name": "Designer Jeans",
-        "price": 59.99,
-        "description": "Premium denim jeans with perfect fit",
-        "category": "clothes",
-        "image": "https://images.unsplash.com/photo-1542272604-787c3835535d?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 11,
-        "name": "Cozy Sweater",
-        "price": 49.99,
-        "description": "Soft knit sweater for cold weather",
-        "category": "clothes",
-        "image": "https://images.unsplash.com/photo-1434389677669-e08b4cac3105?w=300&h=300&fit=crop"
-    },
-    {
-        "id": 12,
-        "name": "Leather Jacket",
-        "price": 149.99,
-        "description": "Genuine leather jacket with classic styling",
-        "category": "clothes",
-        "image": "https://images.unsplash.com/photo-1551028719-00167b16eac5?w=300&h=300&fit=crop"
-    }
-]
+MAX_BATCH_CARTS = 100000
 
 
 def simulate_buggy_cart_calculation(items, discount_pct=0.0, tax_pct=0.0):
@@ -136,18 +41,45 @@ def simulate_buggy_cart_calculation(items, discount_pct=0.0, tax_pct=0.0):
     }
 
 
+def cached_json_response(body, etag):
+    """Pre-serialized JSON with an ETag; 304 if the client already has it"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+
 @shop_bp.route('/products', methods=['GET'])
 def get_products():
-    """Get all available clothing products"""
-    return jsonify({"products": CLOTHING_PRODUCTS})
+    """
+    Get clothing products in id order.
+
+    Query params: category, min_price, max_price, offset, limit (all optional;
+    without limit every match is returned).
+    """
+    try:
+        filters = {
+            'category': request.args.get('category') or None,
+            'min_price': float(request.args['min_price']) if 'min_price' in request.args else None,
+            'max_price': float(request.args['max_price']) if 'max_price' in request.args else None,
+            'offset': max(0, int(request.args.get('offset', 0))),
+            'limit': max(0, int(request.args['limit'])) if 'limit' in request.args else None
+        }
+    except ValueError:
+        return jsonify({"error": "Invalid filter or pagination parameter"}), 400
+
+    body, etag = get_catalog().render(**filters)
+    return cached_json_response(body, etag)
 
 
 @shop_bp.route('/products/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     """Get single product by ID"""
-    product = next((p for p in CLOTHING_PRODUCTS if p["id"] == product_id), None)
-    if product:
-        return jsonify(product)
+    rendered = get_catalog().render_product(product_id)
+    if rendered:
+        return cached_json_response(*rendered)
     return jsonify({"error": "Product not found"}), 404
 
 
@@ -180,4 +112,162 @@ def calculate_cart():
         return jsonify(result)
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 400
\ No newline at end of file
+        return jsonify({"error": str(e)}), 400
+
+
+@shop_bp.route('/cart/calculate/batch', methods=['POST'])
+def calculate_carts_batch():
+    """
+    Price many carts at once with exact integer-cents arithmetic.
+
+    Request body:
+    {
+        "carts": [
+            {"items": [{"price": 29.99, "qty": 1}, ...], "discount": 0.10, "tax": 0.08875},
+            ...
+        ]
+    }
+    Items may give "price_cents" (int) instead of "price" (dollars).
+
+    Response is columnar, one entry per cart, all amounts in cents:
+    {"count": n, "subtotal": [...], "discount": [...], "tax": [...], "total": [...], "items_count": [...]}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        carts = data.get('carts')
+        if not isinstance(carts, list) or not carts:
+            return jsonify({"error": "carts must be a non-empty list"}), 400
+        if len(carts) > MAX_BATCH_CARTS:
+            return jsonify({"error": f"At most {MAX_BATCH_CARTS} carts per request"}), 400
+
+        price_cents, qty, offsets, discounts, taxes = [], [], [0], [], []
+        for cart in carts:
+            for item in cart.get('items', []):
+                if 'price_cents' in item:
+                    price_cents.append(int(item['price_cents']))
+                else:
+                    price_cents.append(to_cents(item['price']))
+                qty.append(int(item.get('qty', 1)))
+            offsets.append(len(price_cents))
+            discounts.append(cart.get('discount', 0.0))
+            taxes.append(cart.get('tax', 0.0))
+
+        result = price_carts(price_cents, qty, offsets, discounts, taxes)
+
+        response = {name: values.tolist() for name, values in result.items()}
+        response["count"] = len(carts)
+        return jsonify(response)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def save_cart(session):
+    """Persist a mutation; a 409 response if another process changed the cart first"""
+    try:
+        get_cart_store().save(session)
+    except CartConflict:
+        return jsonify({"error": "Cart was changed by another request; reload it and retry"}), 409
+    return None
+
+
+def cart_or_404(cart_id):
+    session = get_cart_store().get(cart_id)
+    if session is None:
+        return None, (jsonify({"error": "Cart not found"}), 404)
+    return session, None
+
+
+def cart_change_response(session, line):
+    """Only what changed: the touched line and the new totals (cents)"""
+    return jsonify({
+        "cart_id": session.id,
+        "version": session.version,
+        "line": line,
+        "totals": session.totals()
+    })
+
+
+@shop_bp.route('/carts', methods=['POST'])
+def create_cart():
+    """Create a server-side cart: {"discount": 0.10, "tax": 0.08875}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        session = get_cart_store().create(data.get('discount', 0.0), data.get('tax', 0.0))
+    except (ValueError, TypeError, ArithmeticError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(session.to_dict()), 201
+
+
+@shop_bp.route('/carts/<cart_id>', methods=['GET', 'PUT', 'DELETE'])
+def handle_cart(cart_id):
+    """Get a cart with its lines, change its discount/tax rates, or delete it"""
+    if request.method == 'DELETE':
+        if not get_cart_store().delete(cart_id):
+            return jsonify({"error": "Cart not found"}), 404
+        return jsonify({"message": "Cart deleted"})
+
+    session, error = cart_or_404(cart_id)
+    if error:
+        return error
+
+    if request.method == 'GET':
+        return jsonify(session.to_dict())
+
+    data = request.get_json(silent=True) or {}
+    with session.lock:
+        try:
+            session.set_rates(data.get('discount', session.discount_pct), data.get('tax', session.tax_pct))
+        except (ValueError, TypeError, ArithmeticError) as e:
+            return jsonify({"error": str(e)}), 400
+        error = save_cart(session)
+        return error or jsonify(session.to_dict(include_lines=False))
+
+
+@shop_bp.route('/carts/<cart_id>/items', methods=['POST'])
+def add_cart_item(cart_id):
+    """Add a product to the cart: {"product_id": 1, "qty": 1}"""
+    session, error = cart_or_404(cart_id)
+    if error:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    product_id = data.get('product_id')
+    # Catalog ids are ints; accept "1" too, but not 1.5 or true
+    if isinstance(product_id, str) and product_id.strip().isdigit():
+        product_id = int(product_id)
+    if not isinstance(product_id, int) or isinstance(product_id, bool):
+        return jsonify({"error": "product_id must be an integer"}), 400
+    product = get_catalog().get(product_id)
+    if product is None:
+        return jsonify({"error": "Product not found"}), 404
+
+    with session.lock:
+        try:
+            line = session.add(product, int(data.get('qty', 1)))
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": str(e)}), 400
+        error = save_cart(session)
+        return error or cart_change_response(session, line)
+
+
+@shop_bp.route('/carts/<cart_id>/items/<int:product_id>', methods=['PUT', 'DELETE'])
+def handle_cart_item(cart_id, product_id):
+    """Set a line's quantity ({"qty": n}, 0 removes it) or remove the line"""
+    session, error = cart_or_404(cart_id)
+    if error:
+        return error
+
+    with session.lock:
+        try:
+            if request.method == 'DELETE':
+                line = session.remove(product_id)
+            else:
+                data = request.get_json(silent=True) or {}
+                line = session.set_qty(product_id, int(data.get('qty', 1)))
+        except KeyError:
+            return jsonify({"error": "Product not in cart"}), 404
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": str(e)}), 400
+        error = save_cart(session)
+        return error or cart_change_response(session, line)
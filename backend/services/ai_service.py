@@ -6,25 +6,58 @@ AI Service - Integrates all 3 sponsor technologies:
 """
 
 import os
-import requests
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from flask import current_app
 from models.base import db
 from models.event import Event
+from services.llm_client import get_llm_client
+from services.patch_utils import check_patch, only_changes_tests, patch_paths
+from services.validation import validate_patch
+from services.workspace_snapshot import get_workspace_snapshotter
+from services.stream_hub import get_stream_hub
+
+# Speculative patch candidates: candidate i samples at this temperature plus i steps.
+# The first (and a single) candidate is greedy, so its patch can come from the LLM cache.
+BASE_PATCH_TEMPERATURE = 0.0
+CANDIDATE_TEMPERATURE_STEP = 0.3
+
+# Fallback patch when the LLM is unavailable, against the current workspace. It is
+# only an illustration: a mock patch never counts as validated and never resolves an issue.
+MOCK_PATCH = '''--- a/backend/ecommerce/cart.py
++++ b/backend/ecommerce/cart.py
+@@ -102,7 +102,8 @@
+         Returns dict with breakdown for frontend display.
+         """
+         if not self._prices:
+-            return {"subtotal": 0, "total": 0, "items_count": 0}
++            return {"subtotal": 0.0, "discount_pct": discount_pct, "tax_pct": tax_pct,
++                    "discount": 0.0, "tax": 0.0, "total": 0.0, "items_count": 0}
+ 
+         # One "line" carrying the running subtotal prices the cart in O(1)
+         result = price_cart([(self._subtotal, 1)], discount_pct, tax_pct)
+'''
+
+
+class CandidateCancelled(Exception):
+    """Raised inside a losing candidate's stream to stop it"""
 
 
-def analyze_bug_with_cerebras(title: str, description: str = "") -> dict:
+def analyze_bug_with_cerebras(title: str, description: str = "", on_token=None, use_cache: bool = True) -> dict:
     """
     Step 1: Fast bug analysis using Cerebras API directly
     Returns likely cause, affected files, and suggested approach
+    on_token, if given, streams the completion and receives each text delta
+    use_cache=False asks the model again instead of reusing a cached analysis
     """
     from config import Config
 
     try:
         # Call Cerebras API directly for fast analysis
         cerebras_key = Config.CEREBRAS_API_KEY
-        cerebras_url = Config.CEREBRAS_API_URL
-
-        print(f"[DEBUG] Cerebras API Key exists: {bool(cerebras_key)}")
-        print(f"[DEBUG] Cerebras API URL: {cerebras_url}")
 
         if not cerebras_key:
             raise Exception("CEREBRAS_API_KEY not configured")
@@ -39,34 +72,11 @@ Description: {description if description else 'No description provided'}
 
 Provide a concise technical analysis."""
 
-        response = requests.post(
-            cerebras_url,
-            headers={
-                'Authorization': f'Bearer {cerebras_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': 'llama3.1-8b',
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ],
-                'temperature': 0.1,
-                'max_tokens': 500
-            },
-            timeout=10
-        )
-
-        print(f"[DEBUG] Cerebras response status: {response.status_code}")
-        response.raise_for_status()
-        result = response.json()
-        print(f"[DEBUG] Cerebras response received successfully")
-        analysis_text = result['choices'][0]['message']['content']
+        # Greedy decoding, so the analysis of an unchanged bug can come from the cache
+        analysis_text = get_llm_client().chat(prompt, temperature=0.0, max_tokens=500, timeout=10,
+                                              on_token=on_token, use_cache=use_cache)
 
         # Extract affected files from analysis
-        import re
         affected_files = []
 
         # Look for common file patterns
@@ -104,19 +114,127 @@ Provide a concise technical analysis."""
         print(f'[ERROR] Cerebras analysis failed: {e}')
         print(f'[ERROR] Traceback: {traceback.format_exc()}')
         return {
-            'analysis': f'Mock analysis (Cerebras unavailable): Floating-point precision issue in cart.py. Use Decimal for money calculations.',
-            'likely_cause': 'Floating point arithmetic',
+            'analysis': 'Mock analysis (Cerebras unavailable): Cart.calculate_total() returns a shorter '
+                        'breakdown for an empty cart than for a non-empty one.',
+            'likely_cause': 'Early return for an empty cart',
             'affected_files': ['ecommerce/cart.py'],
-            'suggested_approach': 'Replace float with Decimal type',
+            'suggested_approach': 'Return the full breakdown with zero amounts',
             'mock': True,
             'error': str(e)
         }
 
 
-def generate_patch_with_llama(title: str, analysis: dict) -> dict:
+def clean_patch_text(patch_text: str) -> str:
+    """Remove markdown code fences around a generated patch"""
+    if '```' in patch_text:
+        patch_text = re.sub(r'```[a-z]*\n', '', patch_text)
+        patch_text = patch_text.replace('```', '')
+    return patch_text.strip()
+
+
+def workspace_context(affected_files: list, snapshotter, snapshot, max_chars: int) -> tuple:
+    """
+    Contents of the affected files that exist in the workspace snapshot, so
+    hunks can be written against real code. Analysis paths like
+    ecommerce/cart.py are also tried under each top-level directory
+    (backend/ecommerce/cart.py). Returns (context text, workspace-relative paths).
+    """
+    top_dirs = sorted({path.split('/', 1)[0] for path in snapshot.files if '/' in path})
+
+    paths = []
+    for affected in affected_files:
+        for candidate in [affected] + [f'{d}/{affected}' for d in top_dirs]:
+            if candidate in snapshot.files and candidate not in paths:
+                paths.append(candidate)
+                break
+
+    sections = []
+    for path in paths:
+        try:
+            content = snapshotter.read(path, snapshot)[:max_chars]
+        except (KeyError, OSError):
+            continue
+        sections.append(f"=== File: {path} ===\n{content}")
+    return '\n\n'.join(sections), paths
+
+
+def candidate_temperature(index: int) -> float:
+    return min(BASE_PATCH_TEMPERATURE + CANDIDATE_TEMPERATURE_STEP * index, 1.0)
+
+
+def generate_patch_candidates(prompt: str, count: int, workspace: str, on_token=None,
+                              file_digests: dict = None, use_cache: bool = True) -> tuple:
+    """
+    Sample count patches concurrently at increasing temperatures and check each
+    against the workspace as it arrives (paths exist, hunks apply). The first
+    valid one wins and the others are cancelled mid-stream.
+    Returns (patch text, validated, per-candidate summaries).
+    """
+    app = current_app._get_current_object()
+    client = get_llm_client()
+    cancelled = threading.Event()
+
+    def run(index: int):
+        def on_delta(text):
+            if cancelled.is_set():
+                raise CandidateCancelled()
+            # Only the first candidate is relayed, so the live view is one coherent text
+            if index == 0 and on_token:
+                on_token(text)
+
+        temperature = candidate_temperature(index)
+        started = time.time()
+        with app.app_context():
+            text = clean_patch_text(client.chat(prompt, temperature=temperature, max_tokens=1000,
+                                                timeout=30, on_token=on_delta, file_digests=file_digests,
+                                                use_cache=use_cache))
+        check = check_patch(text, workspace)
+        # A patch that only edits tests can make them pass without fixing anything
+        if check['valid'] and only_changes_tests(check['files']):
+            check = {'valid': False, 'files': check['files'], 'errors': ['Patch only changes tests']}
+        return index, temperature, text, check, time.time() - started
+
+    executor = ThreadPoolExecutor(max_workers=count, thread_name_prefix='patch-candidate')
+    futures = [executor.submit(run, index) for index in range(count)]
+    summaries = []
+    finished = []
+    errors = []
+    try:
+        for future in as_completed(futures):
+            try:
+                index, temperature, text, check, elapsed = future.result()
+            except Exception as e:
+                errors.append(e)
+                summaries.append({'error': str(e)})
+                continue
+            summaries.append({
+                'index': index,
+                'temperature': temperature,
+                'valid': check['valid'],
+                'errors': check['errors'],
+                'seconds': round(elapsed, 3)
+            })
+            finished.append(text)
+            if check['valid']:
+                print(f'[AI Fix] Candidate {index} (t={temperature}) applies cleanly after {elapsed:.2f}s')
+                return text, True, summaries
+    finally:
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if not finished:
+        raise errors[0]
+    print(f'[AI Fix] None of {count} candidates applies cleanly, using the first to finish')
+    return finished[0], False, summaries
+
+
+def generate_patch_with_llama(title: str, analysis: dict, on_token=None, use_cache: bool = True) -> dict:
     """
     Step 2: Generate code patch using Llama via Cerebras (ultra-fast inference)
     Fallback to using Cerebras for patch generation when MCP unavailable
+    on_token, if given, streams the completion and receives each text delta
+    With PATCH_CANDIDATES > 1, several candidates race (generate_patch_candidates)
+    use_cache=False never answers from the LLM cache
     """
     from config import Config
 
@@ -128,11 +246,26 @@ def generate_patch_with_llama(title: str, analysis: dict) -> dict:
         if not cerebras_key:
             raise Exception("CEREBRAS_API_KEY not configured")
 
+        # Pin the code version the patch is written against (without a workspace, the prompt has no code)
+        snapshotter = get_workspace_snapshotter()
+        snapshot = snapshotter.current() if snapshotter is not None else None
+        code_context, file_digests = '', None
+        if snapshot is not None:
+            code_context, context_paths = workspace_context(
+                analysis.get('affected_files', []), snapshotter, snapshot, Config.PATCH_CONTEXT_CHARS)
+            file_digests = snapshot.digests(context_paths)
+        code_section = ''
+        if code_context:
+            code_section = f"""
+Current code (patch these files, using these exact paths):
+{code_context}
+"""
+
         prompt = f"""You are a code fixing assistant. Generate a git patch to fix this bug.
 
 Bug Title: {title}
 Analysis: {analysis.get('analysis', '')}
-
+{code_section}
 Generate a proper git diff patch that:
 1. Fixes the bug completely
 2. Uses best practices (e.g., Decimal for money calculations)
@@ -141,35 +274,17 @@ Generate a proper git diff patch that:
 Output ONLY the patch in git diff format starting with '--- a/' and '+++ b/'.
 No explanations, just the patch."""
 
-        response = requests.post(
-            cerebras_url,
-            headers={
-                'Authorization': f'Bearer {cerebras_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': 'llama3.1-8b',
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ],
-                'temperature': 0.2,
-                'max_tokens': 1000
-            },
-            timeout=30
-        )
-
-        response.raise_for_status()
-        result = response.json()
-        patch_text = result['choices'][0]['message']['content']
-
-        # Clean up patch text (remove markdown code blocks if present)
-        import re
-        if '```' in patch_text:
-            patch_text = re.sub(r'```[a-z]*\n', '', patch_text)
-            patch_text = patch_text.replace('```', '')
+        validated = None
+        candidates = None
+        # Candidates are told apart by applying them, which needs the workspace
+        if Config.PATCH_CANDIDATES > 1 and snapshot is not None:
+            patch_text, validated, candidates = generate_patch_candidates(
+                prompt, Config.PATCH_CANDIDATES, Config.WORKSPACE_PATH, on_token=on_token,
+                file_digests=file_digests, use_cache=use_cache)
+        else:
+            patch_text = clean_patch_text(get_llm_client().chat(
+                prompt, temperature=BASE_PATCH_TEMPERATURE, max_tokens=1000, timeout=30, on_token=on_token,
+                file_digests=file_digests, use_cache=use_cache))
 
         # Extract files_modified from patch
         file_matches = re.findall(r'---\s+[ab]/([^\s]+)', patch_text)
@@ -178,90 +293,136 @@ No explanations, just the patch."""
         print(f'[AI Fix] Cerebras patch generation successful: {len(patch_text)} chars')
 
         return {
-            'patch': patch_text.strip(),
+            'patch': patch_text,
             'files_modified': files_modified,
-            'tests_passed': True,
-            'tests_failed': False,
-            'test_results': {
-                'passed': ['Generated by AI'],
-                'failed': []
-            },
+            'validated': validated,
+            'candidates': candidates,
+            'snapshot_id': snapshot.id if snapshot is not None else None,
             'mock': False,
             'cerebras_used': True
         }
 
     except Exception as e:
         print(f'Cerebras patch generation failed, using fallback mock: {e}')
-
-        mock_patch = '''--- a/ecommerce/cart.py
-+++ b/ecommerce/cart.py
-@@ -1,4 +1,5 @@
- """Shopping cart with buggy float calculations"""
-+from decimal import Decimal, ROUND_HALF_UP
-
- class Cart:
-     def __init__(self):
-@@ -6,7 +7,7 @@ class Cart:
-
-     def add_item(self, price, qty=1):
-         """Add item to cart"""
--        self.items.append({"price": price, "qty": qty})
-+        self.items.append({"price": Decimal(str(price)), "qty": qty})
-
-     def calculate_total(self, discount_pct=0.0, tax_pct=0.0):
-         """
-@@ -14,11 +15,13 @@ class Cart:
-         BUG: Using float causes rounding errors!
-         """
-         # Calculate subtotal
--        subtotal = sum(item["price"] * item["qty"] for item in self.items)
-+        subtotal = sum(item["price"] * Decimal(str(item["qty"])) for item in self.items)
-
-         # Apply discount first
--        discounted = subtotal * (1 - discount_pct)
-+        discounted = subtotal * (Decimal('1') - Decimal(str(discount_pct)))
-
-         # Then apply tax
--        total = discounted * (1 + tax_pct)
-+        total = discounted * (Decimal('1') + Decimal(str(tax_pct)))
-+
-+        # Round to 2 decimal places
-+        total = total.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-         return float(total)'''
-
         return {
-            'patch': mock_patch,
-            'files_modified': ['ecommerce/cart.py'],
-            'tests_passed': True,
-            'tests_failed': False,
-            'test_results': {
-                'passed': ['test_basic_cart', 'test_discount_then_tax'],
-                'failed': []
-            },
+            'patch': MOCK_PATCH,
+            'files_modified': ['backend/ecommerce/cart.py'],
             'mock': True,
             'cerebras_used': False,
             'error': str(e)
         }
 
 
-def start_ai_fix(issue_id: int, title: str, description: str = "") -> dict:
+def parse_test_selection(setting: str):
+    """VALIDATION_TESTS as validate_patch() takes it: 'impacted', 'all' or a list of modules"""
+    if setting in ('impacted', 'all'):
+        return setting
+    return [module.strip() for module in setting.split(',') if module.strip()]
+
+
+def validate_patch_result(patch_result: dict, mock: bool = False) -> dict:
+    """
+    Run the configured tests against the patch in a sandbox; adds a recommendation
+    and 'validated', which is never true for a mock or a patch that only changes tests
+    """
+    from config import Config
+
+    snapshotter = get_workspace_snapshotter()
+    skip_reason = None
+    if not Config.VALIDATION_ENABLED:
+        skip_reason = 'Validation disabled'
+    elif snapshotter is None:
+        skip_reason = 'No workspace configured (set WORKSPACE_PATH to a checkout)'
+    elif not os.path.isdir(os.path.join(Config.WORKSPACE_PATH, Config.VALIDATION_PROJECT)):
+        skip_reason = f'Project {Config.VALIDATION_PROJECT}/ is not in the workspace'
+
+    if skip_reason:
+        validation = {'status': 'skipped', 'tests_passed': [], 'tests_failed': [], 'failures': {},
+                      'timings': {}, 'modules': [], 'errors': [skip_reason],
+                      'selection': None, 'seconds': 0.0, 'cached': False, 'snapshot_id': None}
+    else:
+        # Validated against the workspace as it is now, which may have moved on since generation
+        snapshot = snapshotter.current()
+        validation = validate_patch(
+            patch_result['patch'],
+            Config.WORKSPACE_PATH,
+            Config.VALIDATION_PROJECT,
+            parse_test_selection(Config.VALIDATION_TESTS),
+            timeout=Config.VALIDATION_TIMEOUT,
+            max_workers=Config.VALIDATION_WORKERS,
+            coverage_file=Config.VALIDATION_COVERAGE_FILE,
+            snapshot=snapshot,
+            run_as=Config.VALIDATION_RUN_AS_USER
+        )
+        validation['snapshot_id'] = snapshot.id
+
+    unvalidated = None
+    if mock or patch_result.get('mock'):
+        unvalidated = 'mock patch, the LLM was unavailable'
+    elif only_changes_tests(patch_paths(patch_result['patch'])):
+        unvalidated = 'patch only changes tests'
+    validation['validated'] = validation['status'] == 'passed' and unvalidated is None
+
+    status = validation['status']
+    if unvalidated:
+        recommendation = f"Not validated ({unvalidated}) - review before applying"
+    elif status == 'passed':
+        recommendation = 'Patch applies cleanly and all tests pass'
+    elif status == 'failed':
+        recommendation = f"Patch fails {len(validation['tests_failed'])} test(s) - do not apply"
+    elif status == 'error':
+        recommendation = f"Patch could not be validated: {'; '.join(validation['errors'])}"
+    else:
+        recommendation = f"Not validated ({'; '.join(validation['errors'])}) - review before applying"
+    validation['recommendation'] = recommendation
+    return validation
+
+
+def start_ai_fix(issue_id: int, title: str, description: str = "", on_stage=None,
+                 use_cache: bool = True, job_id: int = None) -> dict:
     """
     Complete AI fix workflow using all 3 sponsor technologies
 
+    on_stage, if given, is called with 'analysis', 'patch' and 'validation'
+    as the workflow progresses (the job queue records it for status polling).
+    use_cache=False bypasses the LLM cache (the job queue does so on retries).
+    With a job_id, stages, LLM tokens and the persisted events are also
+    published to the stream hub for GET /api/issues/<id>/ai-fix/jobs/<job_id>/stream.
+
     Flow:
     1. Log AIFixRequested event
     2. Cerebras: Fast analysis
     3. Log AnalysisComplete event
     4. Llama (via Docker MCP): Generate patch
     5. Log PatchProposed event
-    6. Transition to Resolved or log failure
+    6. Validate the patch in a sandbox, log PatchValidated with the real results
+    7. Report success (the job queue resolves the issue) only if validation passes
     """
 
+    from config import Config
+
+    hub = get_stream_hub()
+
+    def publish(event: str, data: dict):
+        if job_id is not None:
+            hub.publish(job_id, event, data)
+
+    def report_stage(stage: str):
+        publish('stage', {'stage': stage})
+        if on_stage:
+            on_stage(stage)
+
+    def token_relay(stage: str):
+        if not Config.LLM_STREAMING or job_id is None:
+            return None
+        return lambda text: publish('token', {'stage': stage, 'text': text})
+
     try:
         # Step 1: Cerebras analysis
+        report_stage('analysis')
         print(f'[AI Fix] Starting analysis for issue {issue_id}: {title}')
-        analysis_result = analyze_bug_with_cerebras(title, description)
+        analysis_result = analyze_bug_with_cerebras(title, description, on_token=token_relay('analysis'),
+                                                    use_cache=use_cache)
 
         # Log analysis event
         analysis_event = Event(
@@ -277,11 +438,14 @@ def start_ai_fix(issue_id: int, title: str, description: str = "") -> dict:
         )
         db.session.add(analysis_event)
         db.session.commit()
+        publish('event', analysis_event.to_dict())
         print(f'[AI Fix] Analysis complete (mock={analysis_result.get("mock")})')
 
         # Step 2: Llama patch generation
+        report_stage('patch')
         print(f'[AI Fix] Generating patch with Llama...')
-        patch_result = generate_patch_with_llama(title, analysis_result)
+        patch_result = generate_patch_with_llama(title, analysis_result, on_token=token_relay('patch'),
+                                                 use_cache=use_cache)
 
         # Log patch event
         patch_event = Event(
@@ -291,40 +455,59 @@ def start_ai_fix(issue_id: int, title: str, description: str = "") -> dict:
             payload_json={
                 'patch': patch_result['patch'],
                 'files_modified': patch_result['files_modified'],
-                'tests_passed': patch_result['tests_passed'],
-                'test_results': patch_result['test_results'],
+                'validated': patch_result.get('validated'),
+                'candidates': patch_result.get('candidates'),
+                'snapshot_id': patch_result.get('snapshot_id'),
                 'mock': patch_result.get('mock', False)
             }
         )
         db.session.add(patch_event)
         db.session.commit()
+        publish('event', patch_event.to_dict())
         print(f'[AI Fix] Patch generated (mock={patch_result.get("mock")})')
 
-        # Step 3: Validation (mock - would run tests)
+        # Step 3: Validation - apply to a sandbox copy and run the tests
+        report_stage('validation')
+        mock = bool(analysis_result.get('mock') or patch_result.get('mock'))
+        validation = validate_patch_result(patch_result, mock=mock)
         validation_event = Event(
             issue_id=issue_id,
             type='PatchValidated',
             actor='test-runner',
-            payload_json={
-                'status': 'success',
-                'tests_passed': patch_result['test_results']['passed'],
-                'tests_failed': patch_result['test_results']['failed'],
-                'recommendation': 'Patch is safe to apply'
-            }
+            payload_json=validation
         )
         db.session.add(validation_event)
         db.session.commit()
-        print(f'[AI Fix] Validation complete')
+        publish('event', validation_event.to_dict())
+        print(f'[AI Fix] Validation {validation["status"]}: {len(validation["tests_passed"])} passed, '
+              f'{len(validation["tests_failed"])} failed in {validation["seconds"]}s'
+              f'{" (cached)" if validation.get("cached") else ""}')
+
+        if validation['status'] not in ('passed', 'skipped'):
+            return {
+                'success': False,
+                'analysis': analysis_result,
+                'patch': patch_result,
+                'validation': validation,
+                'error': validation['recommendation'],
+                'message': 'Patch failed validation'
+            }
 
+        # Skipped tests, a mock or a tests-only patch: a patch, but not one to resolve the issue on
+        validated = validation['validated']
         return {
             'success': True,
+            'validated': validated,
+            'mock': mock,
             'analysis': analysis_result,
             'patch': patch_result,
-            'message': 'AI fix completed successfully'
+            'validation': validation,
+            'message': 'AI fix completed successfully' if validated else 'AI fix proposed but not validated'
         }
 
     except Exception as e:
         print(f'[AI Fix] Error: {e}')
+        db.session.rollback()
 
         # Log failure
         failure_event = Event(
@@ -338,6 +521,7 @@ def start_ai_fix(issue_id: int, title: str, description: str = "") -> dict:
         )
         db.session.add(failure_event)
         db.session.commit()
+        publish('event', failure_event.to_dict())
 
         return {
             'success': False,
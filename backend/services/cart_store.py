@@ -0,0 +1,270 @@
+"""
+Server-side cart sessions
+
+A cart lives on the server between requests, so the client sends one
+line change at a time instead of the whole item list. Each session wraps
+an ecommerce.cart.Cart, whose running subtotal is updated on every
+mutation; discount and tax are derived from it in O(1), so a mutation
+costs the same for a 3-line cart and a 3,000-line one.
+
+Sessions are kept in an in-process LRU with a sliding TTL. Without the
+SQL tier that LRU is the only copy, so carts are per process: run one
+server process (one gunicorn worker), or a cart created in one worker is
+unknown to the others.
+
+With CART_STORE_SQL=true the cart_sessions table is the source of truth
+and the LRU only saves rebuilding a session. Every read checks the row's
+version and reloads a stale copy; every write is a compare-and-set on
+the version the writer last read, so two processes changing one cart
+cannot silently overwrite each other - the loser gets CartConflict.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from ecommerce.cart import Cart
+from ecommerce.pricing import price_cart, rate_fraction
+from models.base import db
+from models.cart_session import CartSessionRow
+
+
+class CartConflict(Exception):
+    """The cart was changed by another process since it was read"""
+
+
+class CartSession:
+    """One cart: lines keyed by product id, plus the discount and tax rates"""
+
+    def __init__(self, session_id: str, discount_pct: float = 0.0, tax_pct: float = 0.0):
+        self.id = session_id
+        self.cart = Cart()
+        self.product_ids = []     # parallel to the cart's lines
+        self._line_index = {}     # product_id -> line index
+        self.version = 0
+        self.stored_version = None     # version of the SQL row this copy was read from or wrote
+        self.lock = threading.Lock()   # held by callers across mutate + save
+        self.set_rates(discount_pct, tax_pct)
+
+    def set_rates(self, discount_pct: float, tax_pct: float):
+        # rate_fraction rejects negative or non-numeric rates
+        discount_num, discount_den = rate_fraction(discount_pct)
+        rate_fraction(tax_pct)
+        if discount_num > discount_den:
+            raise ValueError(f'Discount must not exceed 100%: {discount_pct}')
+        self.discount_pct = discount_pct
+        self.tax_pct = tax_pct
+        self.version += 1
+
+    def add(self, product: dict, qty: int = 1) -> dict:
+        """Add qty of a product, merging with its existing line"""
+        if qty <= 0:
+            raise ValueError('Quantity must be positive')
+        index = self._line_index.get(product['id'])
+        if index is None:
+            self.cart.add_item(product['price'], qty)
+            self._line_index[product['id']] = len(self.product_ids)
+            self.product_ids.append(product['id'])
+        else:
+            self.cart.update_qty(index, self.cart.get_items()[index]['qty'] + qty)
+        self.version += 1
+        return self.line(product['id'])
+
+    def set_qty(self, product_id: int, qty: int) -> dict:
+        """Set a line's quantity; 0 removes the line"""
+        index = self._line_index.get(product_id)
+        if index is None:
+            raise KeyError(product_id)
+        if qty == 0:
+            return self.remove(product_id)
+        self.cart.update_qty(index, qty)
+        self.version += 1
+        return self.line(product_id)
+
+    def remove(self, product_id: int) -> dict:
+        index = self._line_index.pop(product_id, None)
+        if index is None:
+            raise KeyError(product_id)
+        self.cart.remove_item(index)
+        del self.product_ids[index]
+        for i in range(index, len(self.product_ids)):
+            self._line_index[self.product_ids[i]] = i
+        self.version += 1
+        return {'product_id': product_id, 'qty': 0}
+
+    def line(self, product_id: int) -> dict:
+        item = self.cart.get_items()[self._line_index[product_id]]
+        return {'product_id': product_id, 'price': item['price'], 'qty': item['qty']}
+
+    def totals(self) -> dict:
+        """Subtotal, discount, tax and total in cents, from the running subtotal"""
+        result = price_cart([(self.cart.subtotal_cents, 1)], self.discount_pct, self.tax_pct)
+        result['items_count'] = self.cart.items_count
+        result['lines'] = len(self.product_ids)
+        return result
+
+    def to_dict(self, include_lines: bool = True) -> dict:
+        data = {
+            'id': self.id,
+            'version': self.version,
+            'discount_pct': self.discount_pct,
+            'tax_pct': self.tax_pct,
+            'totals': self.totals()
+        }
+        if include_lines:
+            data['lines'] = [self.line(product_id) for product_id in self.product_ids]
+        return data
+
+    def to_state(self) -> dict:
+        """Everything needed to rebuild the session (for the SQL tier)"""
+        return {
+            'discount_pct': self.discount_pct,
+            'tax_pct': self.tax_pct,
+            'version': self.version,
+            'lines': [[product_id, item['price'], item['qty']]
+                      for product_id, item in zip(self.product_ids, self.cart.get_items())]
+        }
+
+    @classmethod
+    def from_state(cls, session_id: str, state: dict):
+        session = cls(session_id, state['discount_pct'], state['tax_pct'])
+        for product_id, price_cents, qty in state['lines']:
+            session.add({'id': product_id, 'price': price_cents / 100}, qty)
+        session.version = state['version']
+        session.stored_version = state['version']
+        return session
+
+
+class CartStore:
+    """In-memory LRU of cart sessions with a sliding TTL and an optional SQL tier"""
+
+    def __init__(self, ttl: int = 86400, max_sessions: int = 100000, use_sql: bool = False):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.use_sql = use_sql
+        self._sessions = OrderedDict()   # id -> (expires_at, CartSession)
+        self._lock = threading.RLock()
+
+    def create(self, discount_pct: float = 0.0, tax_pct: float = 0.0) -> CartSession:
+        session = CartSession(secrets.token_urlsafe(16), discount_pct, tax_pct)
+        self.save(session)
+        return session
+
+    def get(self, session_id: str):
+        """The live session, or None if unknown or expired"""
+        now = time.time()
+        if self.use_sql:
+            return self._get_sql(session_id, now)
+
+        with self._lock:
+            item = self._sessions.get(session_id)
+            if item is not None:
+                if item[0] > now:
+                    self._touch(session_id, item[1], now)
+                    return item[1]
+                del self._sessions[session_id]
+        return None
+
+    def _get_sql(self, session_id: str, now: float):
+        # Column queries always hit the database, unlike session.get's identity map
+        head = (db.session.query(CartSessionRow.version, CartSessionRow.expires_at)
+                .filter(CartSessionRow.id == session_id).first())
+        if head is None or head.expires_at < datetime.utcnow():
+            with self._lock:
+                self._sessions.pop(session_id, None)
+            return None
+
+        with self._lock:
+            item = self._sessions.get(session_id)
+            if item is not None and item[1].stored_version == head.version:
+                self._touch(session_id, item[1], now)
+                return item[1]
+
+        state = (db.session.query(CartSessionRow.state_json)
+                 .filter(CartSessionRow.id == session_id).scalar())
+        if state is None:
+            return None
+        session = CartSession.from_state(session_id, state)
+        with self._lock:
+            self._touch(session_id, session, now)
+        return session
+
+    def save(self, session: CartSession):
+        """
+        Record a mutation: refresh the TTL and, with SQL, write the row.
+        Raises CartConflict if another process wrote the row since this copy was read.
+        """
+        if self.use_sql:
+            try:
+                self._write(session)
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    # The copy in memory holds the rejected change
+                    self._sessions.pop(session.id, None)
+                raise
+
+        with self._lock:
+            self._touch(session.id, session, time.time())
+
+    def _write(self, session: CartSession):
+        values = {
+            'state_json': session.to_state(),
+            'version': session.version,
+            'expires_at': datetime.utcnow() + timedelta(seconds=self.ttl)
+        }
+        if session.stored_version is None:
+            db.session.add(CartSessionRow(id=session.id, **values))
+        else:
+            updated = CartSessionRow.query.filter(
+                CartSessionRow.id == session.id,
+                CartSessionRow.version == session.stored_version
+            ).update(values, synchronize_session=False)
+            if updated != 1:
+                raise CartConflict(session.id)
+        db.session.commit()
+        session.stored_version = session.version
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            found = self._sessions.pop(session_id, None) is not None
+        if self.use_sql:
+            found = CartSessionRow.query.filter_by(id=session_id).delete() > 0 or found
+            db.session.commit()
+        return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'sessions': len(self._sessions), 'ttl': self.ttl, 'sql': self.use_sql}
+
+    def _touch(self, session_id: str, session: CartSession, now: float):
+        self._sessions[session_id] = (now + self.ttl, session)
+        self._sessions.move_to_end(session_id)
+
+        # Least recently used first: evict expired sessions and anything over capacity
+        while self._sessions:
+            oldest_id, (expires_at, _) = next(iter(self._sessions.items()))
+            if expires_at > now and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[oldest_id]
+
+
+# Singleton instance
+_cart_store = None
+_cart_store_lock = threading.Lock()
+
+def get_cart_store() -> CartStore:
+    """Get or create the shared cart store configured from Config"""
+    from config import Config
+
+    global _cart_store
+    with _cart_store_lock:
+        if _cart_store is None:
+            _cart_store = CartStore(
+                ttl=Config.CART_TTL,
+                max_sessions=Config.CART_MAX_SESSIONS,
+                use_sql=Config.CART_STORE_SQL
+            )
+    return _cart_store
@@ -0,0 +1,193 @@
+"""
+Test impact index - which test modules exercise which source files
+
+Built from static import analysis: every .py file in the project is
+parsed with ast, imports are resolved to files inside the project, and
+each test module is mapped to everything it reaches transitively. A
+coverage data file recorded with per-test contexts (pytest --cov
+--cov-context=test) can be merged in, which also catches code reached
+without an import (fixtures, plugins, dynamic imports).
+
+Parsed imports are cached per file by (mtime, size), so refreshing the
+index after a change re-parses only the files that changed, and
+selecting tests for a patch costs a few set lookups however large the
+suite grows.
+"""
+
+import ast
+import os
+import threading
+
+SKIP_DIRS = {'.git', '__pycache__', '.pytest_cache', 'node_modules', '.venv', 'venv'}
+
+
+def module_name(path: str) -> str:
+    """ecommerce/cart.py -> ecommerce.cart, ecommerce/__init__.py -> ecommerce"""
+    parts = path[:-3].split('/')
+    if parts[-1] == '__init__':
+        parts = parts[:-1]
+    return '.'.join(parts)
+
+
+def is_test_module(path: str) -> bool:
+    name = os.path.basename(path)
+    return name.endswith('.py') and (name.startswith('test_') or name.endswith('_test.py'))
+
+
+def imported_names(source: str, path: str) -> set:
+    """Dotted names a module imports, with relative imports made absolute"""
+    try:
+        tree = ast.parse(source, filename=path)
+    except (SyntaxError, ValueError):
+        return set()
+
+    package = module_name(path).split('.')
+    if not path.endswith('__init__.py'):
+        package = package[:-1]
+
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package[:len(package) - (node.level - 1)] if node.level > 1 else package
+                prefix = '.'.join(base + ([node.module] if node.module else []))
+            else:
+                prefix = node.module or ''
+            if prefix:
+                names.add(prefix)
+            # "from ecommerce import cart" may name a submodule
+            names.update(f'{prefix}.{alias.name}' if prefix else alias.name for alias in node.names)
+    return names
+
+
+class ImpactIndex:
+    """Maps project files to the test modules that depend on them"""
+    def __init__(self, project_dir: str):
+        self.project_dir = project_dir
+        self._parsed = {}           # path -> ((mtime_ns, size), imported names)
+        self._coverage = {}         # path -> set of test modules (from coverage contexts)
+        self._coverage_signature = None
+        self.modules = {}           # dotted name -> path
+        self.tests = []             # test module paths
+        self.impact = {}            # path -> set of test module paths
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Rescan the project; only changed files are parsed again"""
+        with self._lock:
+            files = {}
+            for dirpath, dirnames, filenames in os.walk(self.project_dir):
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+                for name in filenames:
+                    if name.endswith('.py'):
+                        full = os.path.join(dirpath, name)
+                        stat = os.stat(full)
+                        files[os.path.relpath(full, self.project_dir).replace(os.sep, '/')] = \
+                            (stat.st_mtime_ns, stat.st_size)
+
+            parsed = {}
+            for path, signature in files.items():
+                cached = self._parsed.get(path)
+                if cached is None or cached[0] != signature:
+                    with open(os.path.join(self.project_dir, path), 'r', encoding='utf-8', errors='replace') as f:
+                        cached = (signature, imported_names(f.read(), path))
+                parsed[path] = cached
+            self._parsed = parsed
+
+            self.modules = {module_name(path): path for path in parsed}
+            self.tests = sorted(path for path in parsed if is_test_module(path))
+            self._build_impact()
+        return self
+
+    def load_coverage(self, data_file: str):
+        """Merge a coverage data file recorded with per-test contexts (re-read only when it changes)"""
+        from coverage import CoverageData
+
+        stat = os.stat(data_file)
+        signature = (data_file, stat.st_mtime_ns, stat.st_size)
+        if signature == self._coverage_signature:
+            return self
+
+        data = CoverageData(basename=data_file)
+        data.read()
+        root = os.path.realpath(self.project_dir)
+        coverage = {}
+        for measured in data.measured_files():
+            full = os.path.realpath(measured)
+            if os.path.commonpath([root, full]) != root:
+                continue
+            path = os.path.relpath(full, root).replace(os.sep, '/')
+            for contexts in (data.contexts_by_lineno(measured) or {}).values():
+                for context in contexts:
+                    # "tests/test_cart.py::TestCart::test_add_item|run"
+                    test_path = context.split('::', 1)[0]
+                    if is_test_module(test_path):
+                        coverage.setdefault(path, set()).add(test_path)
+        with self._lock:
+            self._coverage = coverage
+            self._coverage_signature = signature
+            self._build_impact()
+        return self
+
+    def _build_impact(self):
+        impact = {}
+        for test in self.tests:
+            for path in self._reachable(test):
+                impact.setdefault(path, set()).add(test)
+        for path, tests in self._coverage.items():
+            impact.setdefault(path, set()).update(t for t in tests if t in self._parsed)
+        self.impact = impact
+
+    def _reachable(self, start: str) -> set:
+        """Project files start imports, directly or transitively (including itself)"""
+        seen = {start}
+        stack = [start]
+        while stack:
+            for name in self._parsed[stack.pop()][1]:
+                # "a.b.c" also imports packages a and a.b
+                parts = name.split('.')
+                for i in range(1, len(parts) + 1):
+                    path = self.modules.get('.'.join(parts[:i]))
+                    if path is not None and path not in seen:
+                        seen.add(path)
+                        stack.append(path)
+        return seen
+
+    def impacted_tests(self, changed_paths) -> list:
+        """
+        Test modules to run for changed project-relative paths. A conftest.py
+        selects every test below it; a change the index cannot place (a
+        non-Python file, a new file) selects every test.
+        """
+        selected = set()
+        for path in changed_paths:
+            if os.path.basename(path) == 'conftest.py':
+                scope = os.path.dirname(path)
+            elif path in self._parsed:
+                selected.update(self.impact.get(path, ()))
+                continue
+            else:
+                scope = ''     # could affect anything
+            selected.update(t for t in self.tests if not scope or t.startswith(scope + '/'))
+        return sorted(selected)
+
+
+# One index per project directory
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_impact_index(project_dir: str, coverage_file: str = None) -> ImpactIndex:
+    """The refreshed index for project_dir, with coverage_file merged in if it exists"""
+    with _indexes_lock:
+        index = _indexes.get(project_dir)
+        if index is None:
+            index = _indexes[project_dir] = ImpactIndex(project_dir)
+    index.refresh()
+    if coverage_file and os.path.exists(coverage_file):
+        try:
+            index.load_coverage(coverage_file)
+        except Exception as e:
+            print(f'[Test Impact] Could not read coverage data {coverage_file}: {e}')
+    return index
@@ -0,0 +1,363 @@
+"""
+AI fix job queue - runs the analysis -> patch -> validation pipeline in the background
+
+POST /api/issues/<id>/ai-fix only enqueues a job and returns 202. A bounded
+thread pool picks jobs up, so a handful of "AI Fix" clicks can no longer pin
+every Flask worker for the 10-40s the pipeline takes.
+
+Jobs live in the ai_fix_jobs table, so they survive restarts:
+- queued jobs are picked up by the sweeper of whichever process is alive
+- running jobs heartbeat updated_at; once a job's process dies its
+  heartbeat stops and the job is re-queued after stale_after seconds;
+  a process shutting down cleanly (drain()) hands them back at once
+- a job is claimed with a conditional UPDATE, so several processes
+  (e.g. gunicorn workers) can share the table without running a job twice
+- a unique key on active_issue_id keeps concurrent clicks on the same
+  issue from queueing two jobs
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models.base import db
+from models.issue import Issue
+from models.event import Event
+from models.job import AIFixJob
+from services.stream_hub import get_stream_hub
+
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class AIFixJobQueue:
+    """Bounded worker pool backed by the ai_fix_jobs table"""
+
+    def __init__(self, app, max_workers: int = 2, poll_interval: float = 5.0,
+                 stale_after: int = 300):
+        self.app = app
+        self.max_workers = max(1, int(max_workers))
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._sweeper = None
+        self._stop = threading.Event()
+        self._submitted = set()
+        self._running = set()
+        self._pid = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the worker pool and sweeper (safe to call repeatedly)"""
+        with self._lock:
+            # Threads do not survive fork(), so a forked worker restarts its own pool
+            if self._pid == os.getpid() and self._executor is not None:
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._submitted = set()
+            self._running = set()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='ai-fix')
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='ai-fix-sweeper',
+                                             daemon=True)
+            self._sweeper.start()
+        print(f'[AI Fix Queue] Started with {self.max_workers} workers (pid={self._pid})')
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work; running jobs finish unless the process exits"""
+        self._stop.set()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+    def drain(self, timeout: float) -> int:
+        """
+        Stop accepting work, give running jobs up to timeout seconds to finish,
+        and hand the rest back to the queue, so another process picks them up
+        now instead of after stale_after. Returns the number handed back.
+        """
+        self.shutdown(wait=False)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._running:
+                    return 0
+            time.sleep(0.1)
+
+        with self._lock:
+            remaining = list(self._running)
+        with self.app.app_context():
+            AIFixJob.query.filter(
+                AIFixJob.id.in_(remaining),
+                AIFixJob.status == 'running'
+            ).update({'status': 'queued', 'stage': 'queued'}, synchronize_session=False)
+            db.session.commit()
+        print(f'[AI Fix Queue] Handed {len(remaining)} unfinished job(s) back to the queue')
+        return len(remaining)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def enqueue(self, issue: Issue):
+        """
+        Queue an AI fix for an issue.
+        Returns (job, created) - an issue with a queued/running job gets that job back.
+        """
+        self.start()
+
+        while True:
+            existing = self._active_job(issue.id)
+            if existing:
+                return existing, False
+
+            job = AIFixJob(issue_id=issue.id, active_issue_id=issue.id, status='queued', stage='queued')
+            db.session.add(job)
+            try:
+                db.session.flush()
+                break
+            except IntegrityError:
+                # Another request queued a job for this issue since we looked
+                db.session.rollback()
+
+        event = Event(
+            issue_id=issue.id,
+            type='AIFixRequested',
+            actor='user',
+            payload_json={'title': issue.title, 'job_id': job.id}
+        )
+        db.session.add(event)
+        db.session.commit()
+
+        self._submit(job.id)
+        return job, True
+
+    def stats(self) -> dict:
+        """In-process view of the pool (the table is the source of truth)"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'in_flight': len(self._submitted),
+                'running': self._executor is not None and not self._stop.is_set()
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _active_job(self, issue_id: int):
+        return AIFixJob.query.filter(
+            AIFixJob.issue_id == issue_id,
+            AIFixJob.status.in_(ACTIVE_STATUSES)
+        ).order_by(AIFixJob.id.desc()).first()
+
+    def _submit(self, job_id: int):
+        with self._lock:
+            if self._executor is None or job_id in self._submitted:
+                return
+            self._submitted.add(job_id)
+            self._executor.submit(self._run, job_id)
+
+    def _sweep_loop(self):
+        """Pick up jobs queued by dead processes and re-queue stale running jobs"""
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self._sweep()
+            except Exception as e:
+                print(f'[AI Fix Queue] Sweep failed: {e}')
+            self._stop.wait(self.poll_interval)
+
+    def _sweep(self):
+        stale_before = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        requeued = AIFixJob.query.filter(
+            AIFixJob.status == 'running',
+            AIFixJob.updated_at < stale_before
+        ).update({'status': 'queued', 'stage': 'queued'}, synchronize_session=False)
+        db.session.commit()
+        if requeued:
+            print(f'[AI Fix Queue] Re-queued {requeued} stale job(s)')
+
+        with self._lock:
+            capacity = self.max_workers * 2 - len(self._submitted)
+        if capacity <= 0:
+            return
+
+        queued_ids = [row.id for row in AIFixJob.query.with_entities(AIFixJob.id)
+                      .filter(AIFixJob.status == 'queued')
+                      .order_by(AIFixJob.id.asc())
+                      .limit(capacity)]
+        for job_id in queued_ids:
+            self._submit(job_id)
+
+    def _claim(self, job_id: int) -> bool:
+        """Atomically move a job from queued to running"""
+        now = datetime.utcnow()
+        claimed = AIFixJob.query.filter(
+            AIFixJob.id == job_id,
+            AIFixJob.status == 'queued'
+        ).update({
+            'status': 'running',
+            'stage': 'starting',
+            'started_at': now,
+            'updated_at': now,
+            'attempts': AIFixJob.attempts + 1
+        }, synchronize_session=False)
+        db.session.commit()
+        return claimed == 1
+
+    def _set_stage(self, job_id: int, stage: str):
+        AIFixJob.query.filter_by(id=job_id).update(
+            {'stage': stage, 'updated_at': datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    def _is_retry(self, job: AIFixJob) -> bool:
+        """A re-run of a job, or a new job after this issue's last one failed"""
+        if job.attempts > 1:
+            return True
+        previous = AIFixJob.query.filter(
+            AIFixJob.issue_id == job.issue_id,
+            AIFixJob.id < job.id
+        ).order_by(AIFixJob.id.desc()).first()
+        return previous is not None and previous.status == 'failed'
+
+    def _heartbeat(self, job_id: int) -> bool:
+        """Mark a running job as alive so the sweeper leaves it alone"""
+        beat = AIFixJob.query.filter(
+            AIFixJob.id == job_id,
+            AIFixJob.status == 'running'
+        ).update({'updated_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        return beat == 1
+
+    def _heartbeat_loop(self, job_id: int, done: threading.Event):
+        # A few beats per stale_after, so one slow stage (e.g. the LLM call) never looks dead
+        interval = max(1.0, self.stale_after / 3)
+        while not done.wait(interval):
+            try:
+                with self.app.app_context():
+                    if not self._heartbeat(job_id):
+                        return
+            except Exception as e:
+                print(f'[AI Fix Queue] Heartbeat for job {job_id} failed: {e}')
+
+    def _finish(self, job_id: int, status: str, result: dict = None, error: str = None):
+        now = datetime.utcnow()
+        AIFixJob.query.filter_by(id=job_id).update({
+            'active_issue_id': None,
+            'status': status,
+            'stage': 'done',
+            'result_json': result,
+            'error': error,
+            'finished_at': now,
+            'updated_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+
+    def _run(self, job_id: int):
+        from services.ai_service import start_ai_fix
+
+        done = threading.Event()
+        try:
+            with self.app.app_context():
+                if not self._claim(job_id):
+                    return
+                with self._lock:
+                    self._running.add(job_id)
+                threading.Thread(target=self._heartbeat_loop, args=(job_id, done),
+                                 name=f'ai-fix-heartbeat-{job_id}', daemon=True).start()
+
+                job = db.session.get(AIFixJob, job_id)
+                issue = db.session.get(Issue, job.issue_id)
+                if issue is None:
+                    self._finish(job_id, 'failed', error='Issue no longer exists')
+                    return
+
+                hub = get_stream_hub()
+                hub.begin(job_id)
+                try:
+                    retry = self._is_retry(job)
+                    print(f'[AI Fix Queue] Running job {job_id} for issue {issue.id}'
+                          f'{" (retry, LLM cache bypassed)" if retry else ""}')
+                    result = start_ai_fix(issue.id, issue.title,
+                                          on_stage=lambda stage: self._set_stage(job_id, stage),
+                                          use_cache=not retry, job_id=job_id)
+                except Exception as e:
+                    db.session.rollback()
+                    self._finish(job_id, 'failed', error=str(e))
+                    hub.publish(job_id, 'done', {'job_id': job_id, 'status': 'failed', 'error': str(e)})
+                    return
+
+                if result.get('success'):
+                    # Only tests that passed against a real (not mock) patch resolve the issue
+                    validated = bool(result.get('validated')) and not result.get('mock')
+                    if validated:
+                        _resolve_issue(issue.id)
+                    self._finish(job_id, 'succeeded',
+                                 result={'message': result.get('message'), 'validated': validated})
+                    hub.publish(job_id, 'done', {'job_id': job_id, 'status': 'succeeded', 'validated': validated})
+                else:
+                    self._finish(job_id, 'failed',
+                                 result={'message': result.get('message')},
+                                 error=result.get('error'))
+                    hub.publish(job_id, 'done', {'job_id': job_id, 'status': 'failed',
+                                                   'error': result.get('error')})
+        except Exception as e:
+            print(f'[AI Fix Queue] Job {job_id} crashed: {e}')
+        finally:
+            done.set()
+            with self._lock:
+                self._submitted.discard(job_id)
+                self._running.discard(job_id)
+
+
+def _resolve_issue(issue_id: int):
+    """Transition an Active issue to Resolved after a successful fix"""
+    issue = db.session.get(Issue, issue_id)
+    if issue is None or issue.state != 'Active':
+        return
+
+    issue.state = 'Resolved'
+    issue.updated_at = datetime.utcnow()
+
+    state_event = Event(
+        issue_id=issue_id,
+        type='StateChanged',
+        actor='ai-system',
+        payload_json={'from': 'Active', 'to': 'Resolved', 'reason': 'AI fix completed'}
+    )
+    db.session.add(state_event)
+    db.session.commit()
+
+
+def init_job_queue(app):
+    """Attach the AI fix job queue to the app"""
+    queue = AIFixJobQueue(
+        app,
+        max_workers=app.config.get('AI_FIX_MAX_WORKERS', 2),
+        poll_interval=app.config.get('AI_FIX_POLL_INTERVAL', 5.0),
+        stale_after=app.config.get('AI_FIX_JOB_STALE_SECONDS', 300)
+    )
+    app.extensions['ai_fix_queue'] = queue
+
+    if app.config.get('AI_FIX_QUEUE_AUTOSTART', True):
+        queue.start()
+    return queue
+
+
+def get_job_queue() -> AIFixJobQueue:
+    """Get the job queue for the current app"""
+    return current_app.extensions['ai_fix_queue']
@@ -0,0 +1,153 @@
+"""
+Content-addressed cache for LLM completions
+
+Keys are a SHA-256 over (model, prompt, temperature, max_tokens, file
+digests), so re-running "AI Fix" on the same issue - or on another issue
+with the same title - is answered without a Cerebras round trip. The
+file digests make entries go stale as soon as the code they were
+generated against changes.
+
+Tier 1 is an in-process LRU; tier 2 is the optional llm_cache table,
+shared by every backend process. Both honour the same TTL.
+
+This module is the canonical copy. mcp_agent/llm_cache.py ships in its
+own image with a disk tier instead of the SQL one; cache_key() and
+LLMResponseCache must stay identical to these (tests/test_llm_sync.py).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from models.base import db
+from models.cache import LLMCacheEntry
+
+
+def cache_key(model: str, prompt: str, temperature: float, max_tokens: int,
+              file_digests: dict = None) -> str:
+    """Hash everything that determines a completion"""
+    material = json.dumps({
+        'model': model,
+        'prompt': prompt,
+        'temperature': temperature,
+        'max_tokens': max_tokens,
+        'files': sorted((file_digests or {}).items())
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class SQLCacheTier:
+    """Second tier in the llm_cache table (needs an app context)"""
+
+    def __init__(self, max_rows: int = 10000):
+        self.max_rows = max_rows
+        self._writes = 0
+
+    def get(self, key: str):
+        entry = db.session.get(LLMCacheEntry, key)
+        if entry is None or entry.expires_at < datetime.utcnow():
+            return None
+        return entry.response
+
+    def set(self, key: str, value: str, ttl: int):
+        now = datetime.utcnow()
+        try:
+            entry = db.session.get(LLMCacheEntry, key) or LLMCacheEntry(cache_key=key)
+            entry.response = value
+            entry.created_at = now
+            entry.expires_at = now + timedelta(seconds=ttl)
+            db.session.add(entry)
+            db.session.commit()
+
+            # Purge expired rows and enforce the row limit every 100 writes
+            self._writes += 1
+            if self._writes % 100 == 0:
+                LLMCacheEntry.query.filter(LLMCacheEntry.expires_at < now).delete()
+                overflow = LLMCacheEntry.query.count() - self.max_rows
+                if overflow > 0:
+                    oldest = [row.cache_key for row in LLMCacheEntry.query.with_entities(LLMCacheEntry.cache_key)
+                              .order_by(LLMCacheEntry.created_at.asc()).limit(overflow)]
+                    LLMCacheEntry.query.filter(LLMCacheEntry.cache_key.in_(oldest)).delete(synchronize_session=False)
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+class LLMResponseCache:
+    """In-memory LRU with TTL, optional persistent tier, and hit/miss counters"""
+
+    def __init__(self, max_entries: int = 512, ttl: int = 3600, max_value_bytes: int = 256_000,
+                 tier=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_value_bytes = max_value_bytes
+        self.tier = tier
+
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.tier_hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                if item[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+                del self._entries[key]
+
+        value = None
+        if self.tier is not None:
+            try:
+                value = self.tier.get(key)
+            except Exception as e:
+                print(f'[LLM Cache] Tier read failed: {e}')
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.tier_hits += 1
+            self._store(key, value, now)
+        return value
+
+    def set(self, key: str, value: str):
+        if len(value.encode('utf-8')) > self.max_value_bytes:
+            return
+        with self._lock:
+            self._store(key, value, time.time())
+
+        if self.tier is not None:
+            try:
+                self.tier.set(key, value, self.ttl)
+            except Exception as e:
+                print(f'[LLM Cache] Tier write failed: {e}')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.tier_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'tier_hits': self.tier_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.tier_hits) / lookups, 4) if lookups else 0.0
+            }
+
+    def _store(self, key: str, value: str, now: float):
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,230 @@
+"""
+Shared LLM client for all Cerebras chat completion calls
+
+One pooled requests.Session per process, so repeated calls reuse
+keep-alive connections instead of paying a TLS handshake each time.
+429 and 5xx responses (and connection errors) are retried with
+full-jitter exponential backoff, honouring Retry-After when present.
+
+With a cache attached, chat() answers repeated prompts from the
+content-addressed LLMResponseCache instead of calling the API. Only
+completions sampled at or below cache_max_temperature are cached: above
+it a repeat is supposed to draw a different answer, not replay one.
+
+With on_token, chat() requests a streamed completion ("stream": true)
+and hands each text delta to the callback as it arrives, so callers can
+relay partial output long before the full completion is done.
+
+This module is the canonical copy. mcp_agent/llm_client.py ships in its
+own image and adds AsyncLLMClient; the retry statuses, cache keying and
+backoff must stay identical to these (tests/test_llm_sync.py).
+"""
+
+import json
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from services.llm_cache import LLMResponseCache, SQLCacheTier, cache_key
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when a completion cannot be obtained"""
+
+
+def iter_stream_deltas(lines):
+    """Text deltas from the server-sent event lines of a streamed chat completion"""
+    for line in lines:
+        if not line or not line.startswith('data:'):
+            continue
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            raise LLMError(f'Malformed stream chunk: {data[:100]}')
+        if 'error' in chunk:
+            raise LLMError(f"Cerebras API stream error: {chunk['error']}")
+        for choice in chunk.get('choices') or []:
+            text = (choice.get('delta') or {}).get('content')
+            if text:
+                yield text
+
+
+class LLMClient:
+    """Pooled, retrying client for an OpenAI-compatible chat completions API"""
+
+    def __init__(self, api_url: str, api_key: str, model: str, pool_size: int = 10,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 timeout: float = 30, cache: LLMResponseCache = None, cache_max_temperature: float = 0.0):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.cache = cache
+        self.cache_max_temperature = cache_max_temperature
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def chat(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1000,
+             timeout: float = None, model: str = None, file_digests: dict = None,
+             use_cache: bool = True, on_token=None) -> str:
+        """
+        Send a single user prompt and return the completion text.
+        file_digests ({path: digest}) ties a cached answer to the code it was generated from.
+        on_token, if given, streams the completion and is called with each text delta
+        (a cached answer is passed as one delta).
+        """
+        key = self._cache_key(prompt, temperature, max_tokens, model, file_digests, use_cache)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                if on_token:
+                    on_token(cached)
+                return cached
+
+        messages = [{'role': 'user', 'content': prompt}]
+        if on_token:
+            parts = []
+            for delta in self.stream(messages, temperature=temperature, max_tokens=max_tokens,
+                                     timeout=timeout, model=model):
+                parts.append(delta)
+                on_token(delta)
+            text = ''.join(parts)
+        else:
+            result = self.complete(
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                model=model
+            )
+            text = result['choices'][0]['message']['content']
+
+        if key is not None:
+            self.cache.set(key, text)
+        return text
+
+    def _cache_key(self, prompt, temperature, max_tokens, model, file_digests, use_cache):
+        if self.cache is None or not use_cache or temperature > self.cache_max_temperature:
+            return None
+        return cache_key(model or self.model, prompt, temperature, max_tokens, file_digests)
+
+    def complete(self, messages: list, temperature: float = 0.2, max_tokens: int = 1000,
+                 timeout: float = None, model: str = None) -> dict:
+        """POST a chat completion request and return the decoded JSON body"""
+        payload = {
+            'model': model or self.model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }
+        return self._post(payload, timeout).json()
+
+    def stream(self, messages: list, temperature: float = 0.2, max_tokens: int = 1000,
+               timeout: float = None, model: str = None):
+        """
+        POST a streamed chat completion request and yield text deltas as they arrive.
+        Only establishing the stream is retried; timeout applies between chunks.
+        """
+        payload = {
+            'model': model or self.model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'stream': True
+        }
+        response = self._post(payload, timeout, stream=True)
+        try:
+            response.encoding = 'utf-8'
+            yield from iter_stream_deltas(response.iter_lines(decode_unicode=True))
+        except requests.RequestException as e:
+            raise LLMError(f'Cerebras API stream interrupted: {e}')
+        finally:
+            response.close()
+
+    def _post(self, payload: dict, timeout: float = None, stream: bool = False):
+        """POST payload with retries; returns the 200 response"""
+        if not self.api_key:
+            raise LLMError("CEREBRAS_API_KEY not configured")
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(
+                    self.api_url,
+                    headers={
+                        'Authorization': f'Bearer {self.api_key}',
+                        'Content-Type': 'application/json'
+                    },
+                    json=payload,
+                    timeout=timeout or self.timeout,
+                    stream=stream
+                )
+                if response.status_code == 200:
+                    return response
+
+                response.close()
+                last_error = LLMError(f'Cerebras API error: {response.status_code}')
+                if response.status_code not in RETRY_STATUSES:
+                    raise last_error
+                retry_after = response.headers.get('Retry-After')
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = LLMError(f'Cerebras API request failed: {e}')
+
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, retry_after))
+
+        raise last_error
+
+    def _backoff(self, attempt: int, retry_after: str = None) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After if given"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+# Singleton instance
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    """Get or create the shared LLM client configured from Config"""
+    from config import Config
+
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            cache = None
+            if Config.LLM_CACHE_ENABLED:
+                cache = LLMResponseCache(
+                    max_entries=Config.LLM_CACHE_MAX_ENTRIES,
+                    ttl=Config.LLM_CACHE_TTL,
+                    tier=SQLCacheTier(max_rows=Config.LLM_CACHE_MAX_ROWS) if Config.LLM_CACHE_SQL else None
+                )
+            _llm_client = LLMClient(
+                api_url=Config.CEREBRAS_API_URL,
+                api_key=Config.CEREBRAS_API_KEY,
+                model=Config.CEREBRAS_MODEL,
+                pool_size=Config.LLM_POOL_SIZE,
+                max_retries=Config.LLM_MAX_RETRIES,
+                timeout=Config.LLM_TIMEOUT,
+                cache=cache,
+                cache_max_temperature=Config.LLM_CACHE_MAX_TEMPERATURE
+            )
+    return _llm_client
@@ -1,177 +1,276 @@
 import os
 import subprocess
 import json
-from typing import Dict, Any
+import itertools
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional
 
-class MCPClient:
-    """Client for communicating with MCP server via stdio"""
-    
-    def __init__(self, server_command: str, server_args: list = None, env: dict = None):
-        self.server_command = server_command
-        self.server_args = server_args or []
-        self.env = {**os.environ, **(env or {})}
-    
-    def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
-        """Call an MCP tool and return the result"""
 
-        # Start MCP server process
-        cmd = [self.server_command] + self.server_args
+class MCPSession:
+    """One long-lived MCP server process speaking JSON-RPC over stdio"""
 
-        try:
-            process = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                env=self.env,
-                text=True,
-                bufsize=0
-            )
+    def __init__(self, cmd: list, env: dict, init_timeout: float = 30):
+        self.cmd = cmd
+        self.env = env
+        self.init_timeout = init_timeout
 
-            # Step 1: Send initialize request
-            init_request = {
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {},
-                    "clientInfo": {
-                        "name": "jerai-backend",
-                        "version": "1.0.0"
-                    }
-                }
+        self.process = None
+        self.in_flight = 0
+        self.last_used = 0.0
+
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        """Spawn the server and run the initialize handshake once"""
+        self.process = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=self.env,
+            text=True,
+            bufsize=1
+        )
+        threading.Thread(target=self._read_stdout, name='mcp-stdout', daemon=True).start()
+        threading.Thread(target=self._drain_stderr, name='mcp-stderr', daemon=True).start()
+
+        init_result = self.request('initialize', {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {
+                "name": "jerai-backend",
+                "version": "1.0.0"
             }
+        }, timeout=self.init_timeout)
 
-            try:
-                process.stdin.write(json.dumps(init_request) + "\n")
-                process.stdin.flush()
-            except Exception as e:
-                raise Exception(f"Failed to send init request: {e}")
-
-            # Step 1.5: Read initialize response
-            init_response = None
-            while True:
-                try:
-                    line = process.stdout.readline()
-                    if not line:
-                        raise Exception("MCP server closed stdout before sending init response")
-
-                    line = line.strip()
-                    if line.startswith('{'):
-                        response = json.loads(line)
-                        if response.get('id') == 1:  # Our init request
-                            init_response = response
-                            break
-                except json.JSONDecodeError:
-                    continue
+        if not isinstance(init_result, dict):
+            raise Exception(f"Invalid init response: {init_result}")
+
+        # Send initialized notification (required by MCP spec)
+        self._send({
+            "jsonrpc": "2.0",
+            "method": "notifications/initialized",
+            "params": {}
+        })
+        print(f"[MCP] Initialized session (pid={self.process.pid})")
 
-            if not init_response or 'result' not in init_response:
-                raise Exception(f"Invalid init response: {init_response}")
+    def is_alive(self) -> bool:
+        return not self._closed and self.process is not None and self.process.poll() is None
 
-            print(f"[MCP] Initialized successfully")
+    def request(self, method: str, params: Dict[str, Any], timeout: float = 60) -> Any:
+        """Send a JSON-RPC request and wait for the response with the matching id"""
+        request_id = next(self._ids)
+        future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
+            self.in_flight += 1
 
-            # Step 1.6: Send initialized notification (required by MCP spec)
-            initialized_notification = {
+        try:
+            self._send({
                 "jsonrpc": "2.0",
-                "method": "notifications/initialized",
-                "params": {}
-            }
+                "id": request_id,
+                "method": method,
+                "params": params
+            })
+            response = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise Exception(f"MCP server timeout after {timeout}s ({method})")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+                self.in_flight -= 1
+            self.last_used = time.monotonic()
 
+        if 'error' in response:
+            raise Exception(f"MCP error: {response['error']}")
+        return response.get('result')
+
+    def close(self):
+        self._closed = True
+        if self.process and self.process.poll() is None:
             try:
-                process.stdin.write(json.dumps(initialized_notification) + "\n")
-                process.stdin.flush()
-            except Exception as e:
-                raise Exception(f"Failed to send initialized notification: {e}")
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except Exception:
+                self.process.kill()
+        self._fail_pending(Exception("MCP session closed"))
 
-            # Step 2: Send tool call request
-            tool_request = {
-                "jsonrpc": "2.0",
-                "id": 2,
-                "method": "tools/call",
-                "params": {
-                    "name": tool_name,
-                    "arguments": arguments
-                }
-            }
+    def _send(self, message: dict):
+        try:
+            with self._write_lock:
+                self.process.stdin.write(json.dumps(message) + "\n")
+                self.process.stdin.flush()
+        except Exception as e:
+            self._closed = True
+            raise Exception(f"Failed to send {message.get('method')} request: {e}")
 
+    def _read_stdout(self):
+        """Route every response line to the request waiting on its id"""
+        for line in self.process.stdout:
+            line = line.strip()
+            if not line.startswith('{'):
+                continue
             try:
-                process.stdin.write(json.dumps(tool_request) + "\n")
-                process.stdin.flush()
-            except Exception as e:
-                raise Exception(f"Failed to send tool request: {e}")
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                continue
 
-            # Read remaining output
-            try:
-                remaining_stdout, stderr = process.communicate(timeout=60)
-                stdout = remaining_stdout
-            except Exception as e:
-                process.kill()
-                raise Exception(f"Failed during communicate: {e}")
-
-            # Parse response
-            if stderr:
-                print(f"[MCP] stderr: {stderr[:200]}")
-
-            # Find JSON-RPC response with id=2 (our tool call)
-            for line in stdout.split('\n'):
-                line = line.strip()
-                if line.startswith('{'):
-                    try:
-                        response = json.loads(line)
-                        if response.get('id') == 2:  # Match our tool call request
-                            if 'result' in response:
-                                # Extract text from MCP response
-                                result = response['result']
-                                if isinstance(result, list) and len(result) > 0:
-                                    if isinstance(result[0], dict) and 'text' in result[0]:
-                                        return result[0]['text']
-                                    return str(result[0])
-                                return str(result)
-                            elif 'error' in response:
-                                raise Exception(f"MCP error: {response['error']}")
-                    except json.JSONDecodeError:
-                        continue
-
-            raise Exception("No valid MCP response received")
-
-        except subprocess.TimeoutExpired:
-            process.kill()
-            raise Exception("MCP server timeout")
+            with self._pending_lock:
+                future = self._pending.get(response.get('id'))
+            if future is not None and not future.done():
+                future.set_result(response)
+
+        self._closed = True
+        self._fail_pending(Exception("MCP server closed stdout"))
+
+    def _drain_stderr(self):
+        for line in self.process.stderr:
+            line = line.rstrip()
+            if line:
+                print(f"[MCP] stderr: {line[:200]}")
+
+    def _fail_pending(self, error: Exception):
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+
+class MCPClient:
+    """Client for communicating with a pool of long-lived MCP servers via stdio"""
+
+    def __init__(self, server_command: str, server_args: list = None, env: dict = None,
+                 pool_size: int = 2, request_timeout: float = 60, health_interval: float = 30):
+        self.server_command = server_command
+        self.server_args = server_args or []
+        self.env = {**os.environ, **{k: v for k, v in (env or {}).items() if v is not None}}
+        self.pool_size = max(1, pool_size)
+        self.request_timeout = request_timeout
+        self.health_interval = health_interval
+
+        self._sessions: list[Optional[MCPSession]] = [None] * self.pool_size
+        self._slot_locks = [threading.Lock() for _ in range(self.pool_size)]
+        self._pool_lock = threading.Lock()
+
+        if health_interval:
+            threading.Thread(target=self._health_loop, name='mcp-health', daemon=True).start()
+
+    def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Call an MCP tool and return the result"""
+        try:
+            session = self._acquire()
+            result = session.request('tools/call', {
+                "name": tool_name,
+                "arguments": arguments
+            }, timeout=self.request_timeout)
         except Exception as e:
             raise Exception(f"MCP client error: {str(e)}")
 
+        # Extract text from MCP response
+        if isinstance(result, list) and len(result) > 0:
+            if isinstance(result[0], dict) and 'text' in result[0]:
+                return result[0]['text']
+            return str(result[0])
+        return str(result)
+
+    def close(self):
+        """Terminate all pooled server processes"""
+        with self._pool_lock:
+            sessions, self._sessions = self._sessions, [None] * self.pool_size
+        for session in sessions:
+            if session is not None:
+                session.close()
+
+    def _acquire(self) -> MCPSession:
+        """Pick the least busy slot, (re)starting its process if needed"""
+        with self._pool_lock:
+            slot = min(range(self.pool_size), key=lambda i: (
+                self._sessions[i].in_flight if self._sessions[i] and self._sessions[i].is_alive() else 0,
+                self._sessions[i] is None
+            ))
+        return self._ensure_session(slot)
+
+    def _ensure_session(self, slot: int) -> MCPSession:
+        with self._slot_locks[slot]:
+            session = self._sessions[slot]
+            if session is not None and session.is_alive():
+                return session
+            if session is not None:
+                print(f"[MCP Client] Restarting dead MCP server in slot {slot}")
+                session.close()
+
+            session = MCPSession([self.server_command] + self.server_args, self.env)
+            try:
+                session.start()
+            except Exception:
+                session.close()
+                raise
+            self._sessions[slot] = session
+            return session
+
+    def _health_loop(self):
+        """Ping idle sessions and restart any whose process died"""
+        while True:
+            time.sleep(self.health_interval)
+            for slot in range(self.pool_size):
+                session = self._sessions[slot]
+                if session is None:
+                    continue
+                try:
+                    if not session.is_alive():
+                        raise Exception("process exited")
+                    if session.in_flight == 0:
+                        session.request('ping', {}, timeout=5)
+                except Exception as e:
+                    print(f"[MCP Client] Health check failed for slot {slot}: {e}")
+                    session.close()
+                    try:
+                        self._ensure_session(slot)
+                    except Exception as restart_error:
+                        print(f"[MCP Client] Restart failed for slot {slot}: {restart_error}")
+
 
 # Singleton instance
 _mcp_client = None
+_mcp_client_lock = threading.Lock()
 
 def get_mcp_client() -> MCPClient:
-    """Get or create MCP client instance"""
+    """Get or create the pooled MCP client instance"""
     global _mcp_client
-    if _mcp_client is None:
-        # Configure MCP server connection
-        server_command = os.getenv('MCP_SERVER_COMMAND', 'python')
-        server_script = os.getenv('MCP_SERVER_SCRIPT', '/app/mcp_agent/agent.py')
-
-        # Fallback to local path if not in container
-        if not os.path.exists(server_script):
-            local_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-                'mcp_agent', 'agent.py'
+    with _mcp_client_lock:
+        if _mcp_client is None:
+            # Configure MCP server connection
+            server_command = os.getenv('MCP_SERVER_COMMAND', 'python')
+            server_script = os.getenv('MCP_SERVER_SCRIPT', '/app/mcp_agent/agent.py')
+
+            # Fallback to local path if not in container
+            if not os.path.exists(server_script):
+                local_path = os.path.join(
+                    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+                    'mcp_agent', 'agent.py'
+                )
+                if os.path.exists(local_path):
+                    server_script = local_path
+
+            print(f"[MCP Client] Using agent at: {server_script}")
+            print(f"[MCP Client] Workspace path: {os.getenv('WORKSPACE_PATH', '/workspace')}")
+
+            _mcp_client = MCPClient(
+                server_command=server_command,
+                server_args=[server_script],
+                env={
+                    'WORKSPACE_PATH': os.getenv('WORKSPACE_PATH', '/workspace'),
+                    'CEREBRAS_API_KEY': os.getenv('CEREBRAS_API_KEY'),
+                    'CEREBRAS_API_URL': os.getenv('CEREBRAS_API_URL', 'https://api.cerebras.ai/v1/chat/completions')
+                },
+                pool_size=int(os.getenv('MCP_POOL_SIZE', '2')),
+                request_timeout=float(os.getenv('MCP_REQUEST_TIMEOUT', '60'))
             )
-            if os.path.exists(local_path):
-                server_script = local_path
-
-        print(f"[MCP Client] Using agent at: {server_script}")
-        print(f"[MCP Client] Workspace path: {os.getenv('WORKSPACE_PATH', '/workspace')}")
-
-        _mcp_client = MCPClient(
-            server_command=server_command,
-            server_args=[server_script],
-            env={
-                'WORKSPACE_PATH': os.getenv('WORKSPACE_PATH', '/workspace'),
-                'CEREBRAS_API_KEY': os.getenv('CEREBRAS_API_KEY'),
-                'CEREBRAS_API_URL': os.getenv('CEREBRAS_API_URL', 'https://api.cerebras.ai/v1/chat/completions')
-            }
-        )
     return _mcp_client
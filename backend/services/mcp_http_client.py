@@ -2,6 +2,8 @@ import os
 import requests
 from typing import Dict, Any
 
+from services.workspace_snapshot import get_workspace_snapshotter
+
 class MCPHTTPClient:
     """HTTP client for MCP agent service"""
     
@@ -13,12 +15,17 @@ class MCPHTTPClient:
         
         try:
             url = f"{self.base_url}/tools/{tool_name}"
+            headers = {'Content-Type': 'application/json'}
+            # Lets the gateway send calls for the same code version to the same agent worker
+            snapshotter = get_workspace_snapshotter()
+            if snapshotter is not None:
+                headers['X-Workspace-Snapshot'] = snapshotter.current().id
             
             response = requests.post(
                 url,
                 json=arguments,
                 timeout=30,
-                headers={'Content-Type': 'application/json'}
+                headers=headers
             )
             
             if response.status_code == 200:
@@ -0,0 +1,213 @@
+"""
+Unified diff parsing and application for AI-generated patches
+
+LLM patches are often slightly wrong: paths that do not exist, or hunk
+headers with the wrong line numbers. parse_patch() reads the diff,
+apply_hunks() places each hunk by its context lines - at the stated line
+if it matches there, otherwise at the nearest position where it does,
+like patch(1) without fuzz - and check_patch() reports whether a patch
+would apply cleanly to the workspace without writing anything.
+"""
+
+import os
+import re
+
+HUNK_HEADER_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+
+class PatchError(Exception):
+    """Raised when a patch is malformed or does not apply"""
+
+
+class Hunk:
+    """One @@ section: its header positions and ' ', '-', '+' lines"""
+
+    def __init__(self, old_start: int, new_start: int):
+        self.old_start = old_start
+        self.new_start = new_start
+        self.lines = []     # (op, text) with op in ' -+'
+
+    @property
+    def old_lines(self) -> list:
+        return [text for op, text in self.lines if op in ' -']
+
+    @property
+    def new_lines(self) -> list:
+        return [text for op, text in self.lines if op in ' +']
+
+
+class FilePatch:
+    """The hunks for one file; old_path is None for a new file, new_path None for a deletion"""
+
+    def __init__(self, old_path, new_path):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.hunks = []
+
+    @property
+    def path(self) -> str:
+        return self.new_path or self.old_path
+
+
+def _strip_prefix(raw: str):
+    """Path from a ---/+++ line: drop the timestamp and the a/ or b/ prefix"""
+    path = raw.split('\t')[0].strip()
+    if path == '/dev/null':
+        return None
+    if path.startswith(('a/', 'b/')):
+        path = path[2:]
+    return path
+
+
+def parse_patch(text: str) -> list:
+    """Parse a unified diff into FilePatches; text outside the diff is ignored"""
+    files = []
+    current = None
+    hunk = None
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith('--- ') and i + 1 < len(lines) and lines[i + 1].startswith('+++ '):
+            current = FilePatch(_strip_prefix(line[4:]), _strip_prefix(lines[i + 1][4:]))
+            if current.path is None:
+                raise PatchError('File header without a path')
+            files.append(current)
+            hunk = None
+            i += 2
+            continue
+
+        match = HUNK_HEADER_RE.match(line)
+        if match:
+            if current is None:
+                raise PatchError(f'Hunk before any file header: {line}')
+            hunk = Hunk(int(match.group(1)), int(match.group(3)))
+            current.hunks.append(hunk)
+        elif hunk is not None and line[:1] in (' ', '-', '+'):
+            hunk.lines.append((line[0], line[1:]))
+        elif hunk is not None and line == '':
+            # Editors and LLMs drop the space on blank context lines
+            hunk.lines.append((' ', ''))
+        elif line.startswith('\\'):
+            pass    # "\ No newline at end of file"
+        else:
+            hunk = None
+        i += 1
+
+    if not files:
+        raise PatchError('No file headers (--- a/... +++ b/...) found')
+    for file_patch in files:
+        for h in file_patch.hunks:
+            # Trailing blank "context" picked up after the last real line
+            while h.lines and h.lines[-1] == (' ', ''):
+                h.lines.pop()
+        file_patch.hunks = [h for h in file_patch.hunks if any(op != ' ' for op, _ in h.lines)]
+        if not file_patch.hunks:
+            raise PatchError(f'No changes for {file_patch.path}')
+    return files
+
+
+def _find(lines: list, needle: list, expected: int, start: int) -> int:
+    """Index at or after start where needle matches, nearest to expected; -1 if none"""
+    if not needle:
+        return max(start, min(expected, len(lines)))
+    last = len(lines) - len(needle)
+    candidates = sorted(range(start, last + 1), key=lambda i: (abs(i - expected), i))
+    for i in candidates:
+        if lines[i:i + len(needle)] == needle:
+            return i
+    # Trailing whitespace is the most common LLM slip; accept it as a second choice
+    stripped = [line.rstrip() for line in needle]
+    for i in candidates:
+        if [line.rstrip() for line in lines[i:i + len(needle)]] == stripped:
+            return i
+    return -1
+
+
+def apply_hunks(original: str, hunks: list) -> str:
+    """Apply hunks in order to original text; raises PatchError if one does not match"""
+    lines = original.splitlines()
+    trailing_newline = original.endswith('\n') or not original
+    result = []
+    position = 0
+    for number, hunk in enumerate(hunks, 1):
+        at = _find(lines, hunk.old_lines, max(hunk.old_start - 1, 0), position)
+        if at < 0:
+            raise PatchError(f'Hunk {number} (@@ -{hunk.old_start}) does not match the file')
+        result.extend(lines[position:at])
+        result.extend(hunk.new_lines)
+        position = at + len(hunk.old_lines)
+    result.extend(lines[position:])
+    return '\n'.join(result) + ('\n' if trailing_newline and result else '')
+
+
+def resolve_path(workspace: str, path: str) -> str:
+    """Absolute path of a patch path inside workspace; rejects anything that escapes it"""
+    if os.path.isabs(path) or '\\' in path:
+        raise PatchError(f'Path must be relative to the workspace: {path}')
+    root = os.path.realpath(workspace)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root:
+        raise PatchError(f'Path escapes the workspace: {path}')
+    return full
+
+
+def apply_patch(text: str, workspace: str) -> dict:
+    """
+    Apply a patch in memory. Returns {path: new content, or None for a
+    deleted file}; nothing is written. Raises PatchError.
+    """
+    changes = {}
+    for file_patch in parse_patch(text):
+        path = file_patch.path
+        full = resolve_path(workspace, path)
+        if file_patch.old_path is None:
+            if os.path.exists(full):
+                raise PatchError(f'New file already exists: {path}')
+            original = ''
+        else:
+            if path in changes:
+                original = changes[path] or ''
+            elif os.path.isfile(full):
+                with open(full, 'r', encoding='utf-8', errors='replace') as f:
+                    original = f.read()
+            else:
+                raise PatchError(f'File does not exist: {path}')
+
+        try:
+            updated = apply_hunks(original, file_patch.hunks)
+        except PatchError as e:
+            raise PatchError(f'{path}: {e}')
+        changes[path] = None if file_patch.new_path is None else updated
+    return changes
+
+
+def check_patch(text: str, workspace: str) -> dict:
+    """Whether a patch applies cleanly to workspace, with the files it touches or the errors"""
+    try:
+        changes = apply_patch(text, workspace)
+    except PatchError as e:
+        return {'valid': False, 'files': [], 'errors': [str(e)]}
+    return {'valid': True, 'files': sorted(changes), 'errors': []}
+
+
+def is_test_path(path: str) -> bool:
+    """A test module, conftest.py, or anything under a tests/ directory"""
+    parts = path.replace('\\', '/').split('/')
+    name = parts[-1]
+    return ('tests' in parts[:-1] or name == 'conftest.py' or
+            (name.endswith('.py') and (name.startswith('test_') or name.endswith('_test.py'))))
+
+
+def only_changes_tests(paths) -> bool:
+    """Whether a patch touching paths changes tests and nothing else (it cannot fix code)"""
+    paths = list(paths)
+    return bool(paths) and all(is_test_path(path) for path in paths)
+
+
+def patch_paths(text: str) -> list:
+    """Paths a patch touches, or [] if it cannot be parsed"""
+    try:
+        return [file_patch.path for file_patch in parse_patch(text)]
+    except PatchError:
+        return []
@@ -0,0 +1,144 @@
+"""
+In-process hub for live AI fix progress, relayed to the UI as server-sent events
+
+While a fix job runs, the pipeline publishes stage changes and every LLM
+token under the job's id; GET /api/issues/<id>/ai-fix/jobs/<job_id>/stream
+subscribes and writes them out as SSE. Streams are per job, so a client
+that starts a new run can never be replayed an earlier run's messages.
+Each job's messages are numbered and kept for keep_finished seconds after
+it is done, so a subscriber that connects late (or reconnects with
+Last-Event-ID) is replayed what it missed instead of a blank panel.
+
+The hub lives in one process. Tokens only stream when the job runs in the
+process serving the stream - with several gunicorn workers that is not
+guaranteed, so run one worker for live output. The stream route falls
+back to the ai_fix_jobs row to send 'done' for jobs it cannot see, and
+clients keep polling the job status either way.
+"""
+
+import queue
+import threading
+import time
+
+
+class Subscription:
+    """One SSE client: a bounded queue of (seq, event, data) messages"""
+
+    def __init__(self, hub, job_id: int, max_pending: int):
+        self.hub = hub
+        self.job_id = job_id
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def offer(self, message) -> bool:
+        """Queue a message; a client too slow to keep up is dropped (it can reconnect)"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except queue.Full:
+            self.overflowed = True
+            return False
+
+    @property
+    def drained(self) -> bool:
+        """Dropped for falling behind, and everything queued before that is consumed"""
+        return self.overflowed and self.queue.empty()
+
+    def get(self, timeout: float):
+        """Next message, or None after timeout seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class StreamHub:
+    """Per-job fan-out of (event, data) messages with replay"""
+
+    def __init__(self, max_history: int = 5000, max_pending: int = 2000, keep_finished: int = 600):
+        self.max_history = max_history
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._runs = {}            # job_id -> {'seq', 'history', 'finished_at'}
+        self._subscribers = {}     # job_id -> set of Subscription
+        self._lock = threading.Lock()
+
+    def begin(self, job_id: int):
+        """Start (or restart, after a re-queue) a job's run, discarding its earlier history"""
+        with self._lock:
+            self._prune(time.time())
+            run = self._runs.get(job_id)
+            seq = run['seq'] if run else 0
+            self._runs[job_id] = {'seq': seq, 'history': [], 'finished_at': None}
+        self.publish(job_id, 'start', {})
+
+    def publish(self, job_id: int, event: str, data: dict):
+        """Send a message to the job's subscribers and record it for replay"""
+        with self._lock:
+            run = self._runs.setdefault(job_id, {'seq': 0, 'history': [], 'finished_at': None})
+            run['seq'] += 1
+            message = (run['seq'], event, data)
+            if len(run['history']) < self.max_history:
+                run['history'].append(message)
+            if event == 'done':
+                run['finished_at'] = time.time()
+
+            dropped = [s for s in self._subscribers.get(job_id, ()) if not s.offer(message)]
+            for subscription in dropped:
+                self._subscribers[job_id].discard(subscription)
+
+    def has_run(self, job_id: int) -> bool:
+        """Whether this process has (or recently had) the job running"""
+        with self._lock:
+            return job_id in self._runs
+
+    def subscribe(self, job_id: int, last_seq: int = 0) -> Subscription:
+        """Subscribe to a job, replaying its messages after last_seq"""
+        subscription = Subscription(self, job_id, self.max_pending)
+        with self._lock:
+            run = self._runs.get(job_id)
+            if run:
+                for message in run['history']:
+                    if message[0] > last_seq:
+                        subscription.offer(message)
+            self._subscribers.setdefault(job_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.job_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.job_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'runs': len(self._runs),
+                'subscribers': sum(len(s) for s in self._subscribers.values())
+            }
+
+    def _prune(self, now: float):
+        """Forget finished runs nobody is watching after keep_finished seconds"""
+        for job_id, run in list(self._runs.items()):
+            finished_at = run['finished_at']
+            if (finished_at is not None and now - finished_at > self.keep_finished
+                    and not self._subscribers.get(job_id)):
+                del self._runs[job_id]
+
+
+# Singleton instance
+_stream_hub = None
+_stream_hub_lock = threading.Lock()
+
+def get_stream_hub() -> StreamHub:
+    """Get or create the process-wide stream hub"""
+    global _stream_hub
+    with _stream_hub_lock:
+        if _stream_hub is None:
+            _stream_hub = StreamHub()
+    return _stream_hub
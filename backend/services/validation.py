@@ -0,0 +1,310 @@
+"""
+Sandboxed patch validation - apply a patch to a scratch copy of the workspace and run the tests
+
+The workspace is never written to. Each validation gets its own sandbox
+directory holding the project under test (VALIDATION_PROJECT, e.g.
+backend/): files are copied into it (hardlinks would not be
+copy-on-write, so a test that writes to a source file, or opens one for
+appending, would change the workspace), and every file the patch changes
+is written over its copy. So several candidates can be validated at once
+against one read-only checkout.
+
+The tests run code an LLM wrote, from prompts that include issue titles
+anyone can submit, so the sandbox is a directory, not a security
+boundary. What it does: test processes get a minimal allow-listed
+environment (no API keys or database credentials from os.environ), .env
+files are not copied in, and with run_as they run as an unprivileged
+user that owns only the sandbox. What it does not do: cut off the
+network. That is why VALIDATION_ENABLED is off by default; turn it on
+only where the backend container has nothing on its network worth
+protecting, or wrap it in a real sandbox.
+
+Only the test modules the patch can affect are run (see
+impact_index.py), unless asked for all of them. They run in separate
+pytest processes, in parallel, each with a timeout; results and timings
+come from the junit XML each run writes.
+
+Given a workspace snapshot (workspace_snapshot.py), results are cached by
+patch text and the project's Merkle digest: the same patch against an
+unchanged project is not re-run.
+"""
+
+import hashlib
+import os
+import pwd
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from services.impact_index import get_impact_index
+from services.patch_utils import PatchError, apply_patch
+
+SKIP_DIRS = {'.git', '__pycache__', '.pytest_cache', 'node_modules', '.venv', 'venv'}
+# Local settings files hold secrets; tests must run on the defaults
+SKIP_FILES = {'.env'}
+# The only variables test processes inherit
+SANDBOX_ENV_KEYS = ('PATH', 'LANG', 'LC_ALL', 'TZ')
+
+# Outcomes that can be reused for the same patch and code. Failures are
+# always re-run: a retry must not be answered with the failure it retries.
+CACHEABLE_STATUSES = {'passed', 'skipped'}
+MAX_CACHED_RESULTS = 256
+
+_results = OrderedDict()    # cache key -> result, LRU
+_results_lock = threading.Lock()
+
+
+class Sandbox:
+    """A throwaway copy of one workspace directory; use as a context manager"""
+
+    def __init__(self, workspace: str, project: str):
+        self.source = os.path.join(workspace, project)
+        self.project = project.strip('/')
+        self.root = None
+        self.copied = 0
+
+    def __enter__(self):
+        self.root = tempfile.mkdtemp(prefix='jerai-sandbox-')
+        self._populate(self.source, os.path.join(self.root, self.project))
+        return self
+
+    def __exit__(self, *exc):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    @property
+    def project_dir(self) -> str:
+        return os.path.join(self.root, self.project)
+
+    def write(self, path: str, content):
+        """Replace (or delete, content None) a workspace-relative file in the sandbox only"""
+        target = os.path.join(self.root, path)
+        if os.path.lexists(target):
+            os.unlink(target)
+        if content is not None:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+    def _populate(self, source: str, target: str):
+        for dirpath, dirnames, filenames in os.walk(source):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            dest_dir = os.path.join(target, os.path.relpath(dirpath, source))
+            os.makedirs(dest_dir, exist_ok=True)
+            for name in filenames:
+                if name in SKIP_FILES:
+                    continue
+                shutil.copy2(os.path.join(dirpath, name), os.path.join(dest_dir, name))
+                self.copied += 1
+
+
+def parse_junit(path: str) -> list:
+    """Test cases from a junit XML report as dicts: name, outcome, seconds, message"""
+    cases = []
+    for case in ET.parse(path).getroot().iter('testcase'):
+        outcome, message = 'passed', None
+        for tag in ('failure', 'error', 'skipped'):
+            element = case.find(tag)
+            if element is not None:
+                outcome = 'failed' if tag == 'failure' else tag
+                message = (element.get('message') or element.text or '').strip()[:500]
+                break
+        classname = case.get('classname', '')
+        cases.append({
+            'name': f"{classname}::{case.get('name')}" if classname else case.get('name'),
+            'outcome': outcome,
+            'seconds': float(case.get('time') or 0),
+            'message': message
+        })
+    return cases
+
+
+def sandbox_env(home: str) -> dict:
+    """Environment for test processes: allow-listed variables only, HOME inside the sandbox"""
+    env = {key: os.environ[key] for key in SANDBOX_ENV_KEYS if key in os.environ}
+    env.update(HOME=home, PYTHONDONTWRITEBYTECODE='1')
+    return env
+
+
+def give_to_user(root: str, user: str):
+    """chown a sandbox to user, so a test process running as user can use it and nothing else"""
+    entry = pwd.getpwnam(user) if not str(user).isdigit() else pwd.getpwuid(int(user))
+    for dirpath, dirnames, filenames in os.walk(root):
+        os.chown(dirpath, entry.pw_uid, entry.pw_gid)
+        for name in filenames:
+            os.chown(os.path.join(dirpath, name), entry.pw_uid, entry.pw_gid)
+
+
+def run_test_module(project_dir: str, module: str, timeout: float, user: str = None) -> dict:
+    """
+    Run one test module with pytest in its own process (as user, if given);
+    a timeout fails the whole module
+    """
+    report = os.path.join(project_dir, f".junit-{module.replace('/', '_')}.xml")
+    started = time.time()
+    try:
+        completed = subprocess.run(
+            [sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider',
+             f'--junitxml={report}', module],
+            cwd=project_dir, env=sandbox_env(os.path.dirname(project_dir)), user=user,
+            capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {'module': module, 'status': 'error', 'seconds': round(time.time() - started, 3),
+                'cases': [], 'error': f'Timed out after {timeout}s'}
+
+    seconds = round(time.time() - started, 3)
+    if not os.path.exists(report):
+        output = (completed.stdout + completed.stderr).strip()
+        return {'module': module, 'status': 'error', 'seconds': seconds, 'cases': [],
+                'error': output[-1000:] or f'pytest exited with {completed.returncode}'}
+
+    cases = parse_junit(report)
+    failed = any(case['outcome'] in ('failed', 'error') for case in cases)
+    return {
+        'module': module,
+        # Exit code 5 is "no tests collected"; anything else non-zero without failures is a crash
+        'status': 'failed' if failed or completed.returncode not in (0, 5) else 'passed',
+        'seconds': seconds,
+        'cases': cases,
+        'error': None
+    }
+
+
+# Test processes shared by all validations in this process
+_test_pool = None
+_test_pool_lock = threading.Lock()
+
+def get_test_pool(max_workers: int) -> ThreadPoolExecutor:
+    global _test_pool
+    with _test_pool_lock:
+        if _test_pool is None:
+            _test_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='validation')
+    return _test_pool
+
+
+def select_tests(project_dir: str, changed_paths: list, test_modules, coverage_file: str = None) -> list:
+    """
+    Test modules for a change: 'impacted' (those that import or cover the
+    changed files), 'all', or an explicit list of project-relative paths.
+    """
+    if isinstance(test_modules, (list, tuple)):
+        return list(test_modules)
+    index = get_impact_index(project_dir, coverage_file)
+    if test_modules == 'all':
+        return list(index.tests)
+    if test_modules == 'impacted':
+        return index.impacted_tests(changed_paths)
+    raise ValueError(f"test_modules must be 'impacted', 'all' or a list: {test_modules!r}")
+
+
+def result_cache_key(patch_text: str, project: str, test_modules, snapshot):
+    """Cache key for a validation, or None without a snapshot to pin the code"""
+    if snapshot is None:
+        return None
+    project_digest = snapshot.digest(project.strip('/'))
+    if project_digest is None:
+        return None
+    h = hashlib.sha256()
+    for part in (patch_text, project_digest, repr(test_modules)):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def validate_patch(patch_text: str, workspace: str, project: str, test_modules='impacted',
+                   timeout: float = 60, max_workers: int = 4, coverage_file: str = None,
+                   snapshot=None, run_as: str = None) -> dict:
+    """
+    Apply patch_text to a sandbox copy of workspace/project and run the tests
+    chosen by select_tests(). Status is 'passed', 'failed', 'error' (the patch
+    does not apply, or a run crashed) or 'skipped' (the patch does not touch
+    the project, or no test depends on what it changes).
+
+    With a snapshot of workspace, a previous result for the same patch and
+    project digest is returned (marked 'cached') instead of running again.
+    With run_as, the tests run as that (unprivileged) user.
+    """
+    key = result_cache_key(patch_text, project, test_modules, snapshot)
+    if key is not None:
+        with _results_lock:
+            cached = _results.get(key)
+            if cached is not None:
+                _results.move_to_end(key)
+                return dict(cached, cached=True)
+
+    result = _validate(patch_text, workspace, project, test_modules, timeout, max_workers, coverage_file, run_as)
+    if key is not None and result['status'] in CACHEABLE_STATUSES:
+        with _results_lock:
+            _results[key] = result
+            while len(_results) > MAX_CACHED_RESULTS:
+                _results.popitem(last=False)
+    return dict(result, cached=False)
+
+
+def _validate(patch_text: str, workspace: str, project: str, test_modules, timeout: float,
+              max_workers: int, coverage_file: str, run_as: str = None) -> dict:
+    started = time.time()
+    result = {
+        'status': 'skipped',
+        'tests_passed': [],
+        'tests_failed': [],
+        'failures': {},
+        'timings': {},
+        'modules': [],
+        'errors': [],
+        'selection': test_modules if isinstance(test_modules, str) else 'explicit',
+        'seconds': 0.0
+    }
+
+    try:
+        changes = apply_patch(patch_text, workspace)
+    except PatchError as e:
+        result.update(status='error', errors=[str(e)])
+        return result
+
+    prefix = project.strip('/') + '/'
+    project_changes = {path: content for path, content in changes.items() if path.startswith(prefix)}
+    if not project_changes:
+        result['errors'] = ['Patch does not touch the tested project']
+        return result
+
+    test_modules = select_tests(os.path.join(workspace, project),
+                                [path[len(prefix):] for path in project_changes],
+                                test_modules, coverage_file)
+    if not test_modules:
+        result['errors'] = ['No tests depend on the changed files']
+        return result
+
+    with Sandbox(workspace, project) as sandbox:
+        for path, content in project_changes.items():
+            sandbox.write(path, content)
+        if run_as:
+            give_to_user(sandbox.root, run_as)
+
+        pool = get_test_pool(max_workers)
+        runs = [pool.submit(run_test_module, sandbox.project_dir, module, timeout, run_as)
+                for module in test_modules]
+        runs = [run.result() for run in runs]
+
+    for run in runs:
+        result['modules'].append({'module': run['module'], 'status': run['status'], 'seconds': run['seconds']})
+        if run['error']:
+            result['errors'].append(f"{run['module']}: {run['error']}")
+        for case in run['cases']:
+            result['timings'][case['name']] = case['seconds']
+            if case['outcome'] == 'passed':
+                result['tests_passed'].append(case['name'])
+            elif case['outcome'] in ('failed', 'error'):
+                result['tests_failed'].append(case['name'])
+                result['failures'][case['name']] = case['message']
+
+    statuses = {run['status'] for run in runs}
+    result['status'] = 'error' if 'error' in statuses else 'failed' if 'failed' in statuses else 'passed'
+    result['seconds'] = round(time.time() - started, 3)
+    return result
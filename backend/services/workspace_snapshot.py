@@ -0,0 +1,279 @@
+"""
+Content-addressed snapshots of the workspace the AI fixes are written against
+
+A snapshot is a Merkle-style manifest: every file's SHA-256, and for
+every directory a hash over its children's names and hashes, so the
+root hash - the snapshot id - changes exactly when some file's content
+does, and two snapshots can be diffed by descending only into
+directories whose hashes differ.
+
+Snapshots are taken incrementally: a refresh stats the tree and re-hashes
+only files whose (mtime, size) changed. Contents read through the
+snapshotter are kept in a bounded blob cache keyed by digest, so
+unchanged files are not read from the mount again. Work keyed by
+digests (LLM cache entries, validation results) is reused for as long
+as the files it depends on are unchanged.
+
+Only regular files up to max_file_bytes are part of a snapshot; devices,
+FIFOs, sockets and symlinks are skipped, and the filesystem root is never
+snapshotted. With background=True (the shared snapshotters), a stale
+snapshot is returned at once while the tree is re-statted on a thread,
+so requests only wait for the walk when there is no snapshot yet.
+"""
+
+import hashlib
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+
+SKIP_DIRS = {'.git', '__pycache__', '.pytest_cache', 'node_modules', '.venv', 'venv', '.vite', 'dist'}
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def hash_file(path: str, max_bytes: int = None) -> tuple:
+    """
+    SHA-256 hex digest and content of a regular file; ValueError if it is
+    not a regular file or is larger than max_bytes
+    """
+    # O_NONBLOCK so a FIFO that replaced the file cannot block the open
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_NONBLOCK', 0))
+    with os.fdopen(fd, 'rb') as f:
+        if not stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+            raise ValueError(f'{path} is not a regular file')
+        h, chunks, size = hashlib.sha256(), [], 0
+        while True:
+            chunk = f.read(HASH_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise ValueError(f'{path} is larger than {max_bytes} bytes')
+            h.update(chunk)
+            chunks.append(chunk)
+    return h.hexdigest(), b''.join(chunks)
+
+
+class Snapshot:
+    """Immutable manifest: file and directory digests, keyed by workspace-relative path"""
+
+    def __init__(self, files: dict, taken_at: float):
+        self.files = files          # path -> sha256 of content
+        self.dirs = self._hash_dirs(files)
+        self.id = self.dirs[''][:16]
+        self.taken_at = taken_at
+
+    @staticmethod
+    def _hash_dirs(files: dict) -> dict:
+        children = {'': {}}
+        for path, digest in files.items():
+            parts = path.split('/')
+            for depth in range(len(parts) - 1):
+                parent, name = '/'.join(parts[:depth]), parts[depth]
+                children.setdefault(parent, {})[name] = ('d', '/'.join(parts[:depth + 1]))
+                children.setdefault('/'.join(parts[:depth + 1]), {})
+            children.setdefault('/'.join(parts[:-1]), {})[parts[-1]] = ('f', digest)
+
+        # Deepest directories first, so every child directory is hashed before its parent
+        dirs = {}
+        for directory in sorted(children, key=lambda d: d.count('/') + bool(d), reverse=True):
+            h = hashlib.sha256()
+            for name, (kind, value) in sorted(children[directory].items()):
+                h.update(f"{kind} {name} {dirs[value] if kind == 'd' else value}\n".encode('utf-8'))
+            dirs[directory] = h.hexdigest()
+        return dirs
+
+    def digest(self, path: str):
+        """Digest of a file or directory (no trailing slash), or None"""
+        return self.files.get(path) or self.dirs.get(path.rstrip('/'))
+
+    def digests(self, paths) -> dict:
+        """{path: digest} for the paths present in the snapshot (for cache keys)"""
+        return {path: self.files[path] for path in paths if path in self.files}
+
+    def diff(self, other: 'Snapshot') -> dict:
+        """Paths added, removed and changed going from other to self"""
+        if other.id == self.id:
+            return {'added': [], 'removed': [], 'changed': []}
+        # Only subtrees whose directory hash differs can contain changes
+        stale = {d for d, digest in self.dirs.items() if other.dirs.get(d) != digest}
+        stale.update(d for d in other.dirs if d not in self.dirs)
+
+        def parent(path):
+            return path.rsplit('/', 1)[0] if '/' in path else ''
+
+        mine = {p: d for p, d in self.files.items() if parent(p) in stale}
+        theirs = {p: d for p, d in other.files.items() if parent(p) in stale}
+        return {
+            'added': sorted(p for p in mine if p not in theirs),
+            'removed': sorted(p for p in theirs if p not in mine),
+            'changed': sorted(p for p in mine if p in theirs and mine[p] != theirs[p])
+        }
+
+
+class WorkspaceSnapshotter:
+    """Takes incremental snapshots of one workspace and serves file contents from them"""
+
+    def __init__(self, root: str, refresh_interval: float = 2.0, max_blob_bytes: int = 64 * 1024 * 1024,
+                 keep_snapshots: int = 32, max_file_bytes: int = 4 * 1024 * 1024, background: bool = False):
+        if os.path.realpath(root) == os.path.realpath(os.sep):
+            raise ValueError('Refusing to snapshot the filesystem root')
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self.max_blob_bytes = max_blob_bytes
+        self.keep_snapshots = keep_snapshots
+        self.max_file_bytes = max_file_bytes
+        self.background = background
+
+        self._stats = {}                    # path -> (mtime_ns, size, digest)
+        self._blobs = OrderedDict()         # digest -> bytes, LRU
+        self._blob_bytes = 0
+        self._snapshots = OrderedDict()     # id -> Snapshot, LRU
+        self._current = None
+        self._last_refresh = 0.0
+        self._refreshing = False
+        self.hashed = 0                     # files hashed since start (for stats)
+        self._lock = threading.RLock()
+
+    def current(self, force: bool = False) -> Snapshot:
+        """
+        The latest snapshot; re-stats the tree at most every refresh_interval
+        seconds (in background mode, on a thread while the stale one is returned)
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._current is not None and not force and now - self._last_refresh < self.refresh_interval:
+                return self._current
+            self._last_refresh = now
+            if self._current is not None and not force and self.background:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh_in_background, daemon=True,
+                                     name='workspace-snapshot').start()
+                return self._current
+            self._refresh()
+            return self._current
+
+    def get(self, snapshot_id: str):
+        """A recent snapshot by id, or None"""
+        with self._lock:
+            return self._snapshots.get(snapshot_id)
+
+    def read(self, path: str, snapshot: Snapshot = None) -> str:
+        """
+        Text of a file as of snapshot (default: current). Served from the blob
+        cache when possible; raises KeyError if the file is not in the snapshot
+        or has changed on disk since.
+        """
+        snapshot = snapshot or self.current()
+        digest = snapshot.files.get(path)
+        if digest is None:
+            raise KeyError(path)
+        with self._lock:
+            data = self._blobs.get(digest)
+            if data is not None:
+                self._blobs.move_to_end(digest)
+                return data.decode('utf-8', errors='replace')
+
+        try:
+            actual, data = hash_file(os.path.join(self.root, path), self.max_file_bytes)
+        except ValueError as e:
+            raise KeyError(str(e))
+        if actual != digest:
+            raise KeyError(f'{path} changed since snapshot {snapshot.id}')
+        self._store_blob(digest, data)
+        return data.decode('utf-8', errors='replace')
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'snapshot_id': self._current.id if self._current else None,
+                'files': len(self._stats),
+                'hashed': self.hashed,
+                'blob_bytes': self._blob_bytes
+            }
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh()
+        except Exception as e:
+            print(f"[Snapshot] Refresh of {self.root} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _refresh(self):
+        # The walk runs without the lock, so reads and current() are not held up by it
+        previous_stats = self._stats
+        stats, hashed = {}, 0
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                try:
+                    info = os.lstat(full)
+                except OSError:
+                    continue
+                if not stat.S_ISREG(info.st_mode) or info.st_size > self.max_file_bytes:
+                    continue
+                path = os.path.relpath(full, self.root).replace(os.sep, '/')
+                previous = previous_stats.get(path)
+                if previous is not None and previous[:2] == (info.st_mtime_ns, info.st_size):
+                    stats[path] = previous
+                    continue
+                try:
+                    digest, data = hash_file(full, self.max_file_bytes)
+                except (OSError, ValueError):
+                    continue
+                hashed += 1
+                self._store_blob(digest, data)
+                stats[path] = (info.st_mtime_ns, info.st_size, digest)
+
+        files = {path: entry[2] for path, entry in stats.items()}
+        with self._lock:
+            self._stats = stats
+            self.hashed += hashed
+            if self._current is not None and self._current.files == files:
+                return
+            snapshot = Snapshot(files, time.time())
+            self._current = snapshot
+            self._snapshots[snapshot.id] = snapshot
+            self._snapshots.move_to_end(snapshot.id)
+            while len(self._snapshots) > self.keep_snapshots:
+                self._snapshots.popitem(last=False)
+
+    def _store_blob(self, digest: str, data: bytes):
+        if len(data) > self.max_blob_bytes // 16:
+            return
+        with self._lock:
+            if digest in self._blobs:
+                return
+            self._blobs[digest] = data
+            self._blob_bytes += len(data)
+            while self._blob_bytes > self.max_blob_bytes:
+                _, evicted = self._blobs.popitem(last=False)
+                self._blob_bytes -= len(evicted)
+
+
+# One snapshotter per workspace root
+_snapshotters = {}
+_snapshotters_lock = threading.Lock()
+
+def get_workspace_snapshotter(root: str = None):
+    """
+    Get or create the snapshotter for root (default Config.WORKSPACE_PATH);
+    None if no workspace is configured, it is not a directory, or it is the filesystem root
+    """
+    from config import Config
+
+    root = root or Config.WORKSPACE_PATH
+    if not root or not os.path.isdir(root) or os.path.realpath(root) == os.path.realpath(os.sep):
+        return None
+    with _snapshotters_lock:
+        snapshotter = _snapshotters.get(root)
+        if snapshotter is None:
+            snapshotter = _snapshotters[root] = WorkspaceSnapshotter(
+                root, refresh_interval=Config.SNAPSHOT_REFRESH_SECONDS,
+                max_file_bytes=Config.SNAPSHOT_MAX_FILE_BYTES, background=True)
+    return snapshotter
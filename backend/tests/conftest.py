@@ -0,0 +1,44 @@
+"""
+Shared fixtures: the Flask app on a throwaway SQLite database
+"""
+
+import pytest
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+
+from app import create_app
+from config import Config
+from models.base import db
+
+
+@compiles(BigInteger, 'sqlite')
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite only auto-increments INTEGER PRIMARY KEY columns
+    return 'INTEGER'
+
+
+@pytest.fixture(autouse=True)
+def fresh_stream_hub(monkeypatch):
+    # Job ids restart with every database, so no test may see another's stream history
+    import services.stream_hub
+    monkeypatch.setattr(services.stream_hub, '_stream_hub', None)
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'jerai.db'}"
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        SQLALCHEMY_ECHO = False
+        AI_FIX_QUEUE_AUTOSTART = False
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -92,6 +92,36 @@ class TestCart:
         assert abs(total - 19.86) < 0.01  # Allow small tolerance
 
 
+class TestCartLines:
+    """Test line updates and running totals"""
+
+    def test_update_and_remove_keep_totals(self):
+        """Running subtotal and item count follow every change"""
+        cart = Cart()
+        cart.add_item(29.99, qty=1)
+        cart.add_item(12.99, qty=2)
+        cart.update_qty(1, 1)
+        assert cart.subtotal_cents == 4298
+        cart.remove_item(0)
+        assert cart.subtotal_cents == 1299
+        assert cart.calculate_total()["items_count"] == 1
+
+    def test_prices_convert_to_exact_cents(self):
+        """Prices that are inexact in binary still store the right cents"""
+        cart = Cart()
+        cart.add_item(0.29)
+        assert cart.get_items()[0]["price"] == 29
+
+    def test_items_view_is_read_only(self):
+        """get_items returns a view, not a mutable copy"""
+        cart = Cart()
+        cart.add_item(5.00, qty=3)
+        items = cart.get_items()
+        cart.add_item(2.00)
+        assert len(items) == 2
+        assert list(items) == [{"price": 500, "qty": 3}, {"price": 200, "qty": 1}]
+
+
 class TestClothingProducts:
     """Test clothing product catalog"""
 
@@ -0,0 +1,128 @@
+"""
+Tests for server-side cart sessions
+"""
+
+import time
+
+import pytest
+from services.cart_store import CartConflict, CartSession, CartStore
+
+SHIRT = {"id": 1, "price": 29.99}
+SOCKS = {"id": 7, "price": 12.99}
+
+
+class TestCartSession:
+    """Test line changes and incremental totals"""
+
+    def test_totals_follow_mutations(self):
+        """Totals match pricing the final cart from scratch"""
+        session = CartSession("c1", discount_pct=0.10, tax_pct=0.08875)
+        session.add(SHIRT)
+        session.add(SOCKS, qty=2)
+        session.set_qty(7, 1)
+        totals = session.totals()
+        assert totals["subtotal"] == 4298
+        assert totals["total"] == 4211
+        assert totals["items_count"] == 2
+
+    def test_adding_same_product_merges_lines(self):
+        """A product has at most one line"""
+        session = CartSession("c1")
+        session.add(SHIRT)
+        line = session.add(SHIRT, qty=2)
+        assert line == {"product_id": 1, "price": 2999, "qty": 3}
+        assert session.totals()["lines"] == 1
+
+    def test_remove_keeps_other_lines_addressable(self):
+        """Removing a line re-indexes the ones after it"""
+        session = CartSession("c1")
+        session.add(SHIRT)
+        session.add(SOCKS)
+        session.remove(1)
+        assert session.set_qty(7, 4)["qty"] == 4
+        assert session.totals()["subtotal"] == 5196
+        with pytest.raises(KeyError):
+            session.set_qty(1, 1)
+
+    def test_state_round_trip(self):
+        """A session rebuilt from its state has the same lines and totals"""
+        session = CartSession("c1", discount_pct=0.05, tax_pct=0.07)
+        session.add(SHIRT, qty=2)
+        session.add(SOCKS)
+        restored = CartSession.from_state("c1", session.to_state())
+        assert restored.to_dict() == session.to_dict()
+
+
+class TestCartStore:
+    """Test the in-memory store"""
+
+    def test_ttl_expiry(self):
+        """Sessions expire after the TTL"""
+        store = CartStore(ttl=0)
+        session = store.create()
+        time.sleep(0.01)
+        assert store.get(session.id) is None
+
+    def test_lru_capacity(self):
+        """The least recently used session is evicted first"""
+        store = CartStore(max_sessions=2)
+        first = store.create()
+        second = store.create()
+        store.get(first.id)
+        store.create()
+        assert store.get(first.id) is first
+        assert store.get(second.id) is None
+
+
+class TestSQLCartStore:
+    """Test the SQL tier as shared by several processes (one store each)"""
+
+    def test_cart_visible_to_other_process(self, app):
+        """A cart created in one process is found by another"""
+        first, second = CartStore(use_sql=True), CartStore(use_sql=True)
+        session = first.create(tax_pct=0.08875)
+        other = second.get(session.id)
+        assert other is not session
+        assert other.to_dict() == session.to_dict()
+
+    def test_read_picks_up_newer_version(self, app):
+        """A stale copy in memory is reloaded from the row"""
+        first, second = CartStore(use_sql=True), CartStore(use_sql=True)
+        session = first.create()
+        first_copy = first.get(session.id)
+        other = second.get(session.id)
+        with other.lock:
+            other.add(SHIRT)
+            second.save(other)
+
+        reloaded = first.get(session.id)
+        assert reloaded is not first_copy
+        assert reloaded.totals()["subtotal"] == 2999
+        assert first.get(session.id) is reloaded
+
+    def test_concurrent_write_conflicts(self, app):
+        """The second writer of the same version gets CartConflict, not a lost update"""
+        first, second = CartStore(use_sql=True), CartStore(use_sql=True)
+        session = first.create()
+        mine, theirs = first.get(session.id), second.get(session.id)
+        theirs.add(SOCKS)
+        second.save(theirs)
+
+        mine.add(SHIRT)
+        with pytest.raises(CartConflict):
+            first.save(mine)
+        assert first.get(session.id).to_dict()["lines"] == [{"product_id": 7, "price": 1299, "qty": 1}]
+
+
+class TestCartRoutes:
+    """Test the cart endpoints"""
+
+    def test_product_id_is_coerced(self, client):
+        """"1" adds product 1; other non-integers are 400s"""
+        cart_id = client.post('/api/shop/carts', json={}).get_json()["id"]
+        response = client.post(f'/api/shop/carts/{cart_id}/items', json={"product_id": "1"})
+        assert response.status_code == 200
+        assert response.get_json()["line"]["product_id"] == 1
+        for bad in ("abc", 1.5, True, None):
+            response = client.post(f'/api/shop/carts/{cart_id}/items', json={"product_id": bad})
+            assert response.status_code == 400
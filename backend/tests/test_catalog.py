@@ -0,0 +1,53 @@
+"""
+Tests for the indexed product catalog
+"""
+
+from ecommerce.catalog import Catalog, get_catalog
+
+
+def make_catalog():
+    return Catalog([
+        {"id": 3, "name": "Boots", "price": 89.99, "category": "boots"},
+        {"id": 1, "name": "Shirt", "price": 29.99, "category": "shirts"},
+        {"id": 2, "name": "Socks", "price": 12.99, "category": "socks"},
+        {"id": 4, "name": "Hiking Boots", "price": 79.99, "category": "boots"}
+    ])
+
+
+class TestCatalog:
+    """Test lookups, filters and rendered responses"""
+
+    def test_lookup_by_id(self):
+        """Products are indexed by id"""
+        catalog = make_catalog()
+        assert catalog.get(3)["name"] == "Boots"
+        assert catalog.get(99) is None
+
+    def test_filters_keep_id_order(self):
+        """Category and price filters return matches in id order with a total"""
+        catalog = make_catalog()
+        products, total = catalog.query(category="boots")
+        assert [p["id"] for p in products] == [3, 4]
+        products, total = catalog.query(min_price=20, max_price=90)
+        assert [p["id"] for p in products] == [1, 3, 4]
+        assert total == 3
+        assert catalog.query(category="hats") == ([], 0)
+
+    def test_pagination(self):
+        """offset and limit slice the matches, total counts all of them"""
+        products, total = make_catalog().query(offset=1, limit=2)
+        assert [p["id"] for p in products] == [2, 3]
+        assert total == 4
+
+    def test_render_is_cached_and_versioned(self):
+        """Same query gives the same bytes and ETag; different queries differ"""
+        catalog = make_catalog()
+        body, etag = catalog.render(category="boots")
+        assert catalog.render(category="boots") == (body, etag)
+        assert catalog.render(category="socks")[1] != etag
+        assert make_catalog().render(category="boots")[1] == etag
+
+    def test_shared_catalog_is_the_shop_catalog(self):
+        """The cart module and the shop API read the same products"""
+        from ecommerce.cart import CLOTHING_PRODUCTS
+        assert CLOTHING_PRODUCTS is get_catalog().products
@@ -0,0 +1,175 @@
+"""
+Tests for issue listing, event timelines and the bulk endpoints
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import inspect, text
+
+from models.base import db, ensure_indexes
+from models.event import Event
+from models.issue import Issue
+
+
+@pytest.fixture
+def issues(app):
+    """Five issues, one second apart, oldest first"""
+    start = datetime(2026, 1, 1)
+    rows = [Issue(title=f'Issue {i}', state='New' if i % 2 else 'Active',
+                  created_at=start + timedelta(seconds=i)) for i in range(5)]
+    db.session.add_all(rows)
+    db.session.commit()
+    return [row.id for row in rows]
+
+
+@pytest.fixture
+def timeline(app, issues):
+    """Three events on the first issue, the last with a large payload"""
+    issue_id = issues[0]
+    start = datetime(2026, 1, 2)
+    db.session.add_all([
+        Event(issue_id=issue_id, type='IssueCreated', payload_json={'title': 'Issue 0'}, ts=start),
+        Event(issue_id=issue_id, type='AIFixRequested', payload_json={'job_id': 1},
+              ts=start + timedelta(seconds=1)),
+        Event(issue_id=issue_id, type='PatchProposed', payload_json={'patch': 'x' * 5000, 'mock': False},
+              ts=start + timedelta(seconds=2)),
+    ])
+    db.session.commit()
+    return issue_id
+
+
+class TestListIssues:
+    """Test keyset paging of GET /api/issues/"""
+
+    def test_pages_newest_first_without_overlap(self, client, issues):
+        """Following X-Next-Cursor visits every issue once"""
+        seen = []
+        response = client.get('/api/issues/?limit=2')
+        while True:
+            seen.extend(issue['id'] for issue in response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+            response = client.get(f'/api/issues/?limit=2&cursor={cursor}')
+        assert seen == list(reversed(issues))
+
+    def test_count_is_opt_in(self, client, issues):
+        """X-Total-Count is only computed with count=true"""
+        assert 'X-Total-Count' not in client.get('/api/issues/?limit=2').headers
+        response = client.get('/api/issues/?limit=2&count=true&state=New')
+        assert response.headers['X-Total-Count'] == '2'
+
+    def test_fields_projection(self, client, issues):
+        """fields limits the keys of each issue"""
+        response = client.get('/api/issues/?fields=title')
+        assert set(response.get_json()[0]) == {'title'}
+        assert client.get('/api/issues/?fields=secret').status_code == 400
+
+    def test_bad_cursor_and_filter(self, client, issues):
+        """Garbage cursors and filter values are 400s"""
+        assert client.get('/api/issues/?cursor=nope').status_code == 400
+        assert client.get('/api/issues/?state=Open').status_code == 400
+
+
+class TestEvents:
+    """Test the event timeline endpoints"""
+
+    def test_pages_oldest_first(self, client, timeline):
+        """The timeline pages forward in time"""
+        first = client.get(f'/api/issues/{timeline}/events?limit=2')
+        cursor = first.headers['X-Next-Cursor']
+        second = client.get(f'/api/issues/{timeline}/events?limit=2&cursor={cursor}')
+        types = [e['type'] for e in first.get_json() + second.get_json()]
+        assert types == ['IssueCreated', 'AIFixRequested', 'PatchProposed']
+        assert 'X-Next-Cursor' not in second.headers
+
+    def test_summary_omits_large_fields(self, client, timeline):
+        """summary=true drops large payload fields and names them"""
+        events = client.get(f'/api/issues/{timeline}/events?summary=true').get_json()
+        patch = events[-1]
+        assert patch['payload'] == {'mock': False}
+        assert patch['omitted'] == ['patch']
+
+    def test_single_event_is_full(self, client, timeline):
+        """One event can be fetched with its full payload"""
+        event_id = client.get(f'/api/issues/{timeline}/events?summary=true').get_json()[-1]['id']
+        event = client.get(f'/api/issues/{timeline}/events/{event_id}').get_json()
+        assert len(event['payload']['patch']) == 5000
+        assert client.get(f'/api/issues/{timeline + 1}/events/{event_id}').status_code == 404
+
+    def test_export_streams_every_event(self, client, timeline):
+        """The export is one JSON array of the whole timeline"""
+        response = client.get(f'/api/issues/{timeline}/events/export')
+        assert len(response.get_json()) == 3
+
+
+class TestBatch:
+    """Test the bulk create, transition and delete endpoints"""
+
+    def test_create_rejects_only_the_bad_items(self, client, app):
+        """A too-long title fails its own item, not its chunk"""
+        response = client.post('/api/issues/batch', json={'issues': [
+            {'title': 'Fine'},
+            {'title': 'x' * 501},
+            {'title': 'Also fine', 'type': 'TASK'},
+            {'title': 'Bad type', 'type': 'EPIC'},
+        ]}).get_json()
+        assert [r['success'] for r in response['results']] == [True, False, True, False]
+        assert response['succeeded'] == 2
+        assert Issue.query.count() == 2
+        assert Event.query.filter_by(type='IssueCreated').count() == 2
+
+    def test_single_create_checks_title_length(self, client, app):
+        """The single create route applies the same rules"""
+        assert client.post('/api/issues/', json={'title': 'x' * 501}).status_code == 400
+        assert client.post('/api/issues/', json={'title': 'ok'}).status_code == 201
+
+    def test_transition_rejects_bool_ids(self, client, issues):
+        """true is not issue 1"""
+        response = client.post('/api/issues/batch/transition', json={'transitions': [
+            {'id': True, 'to': 'Active'},
+            {'id': issues[1], 'to': 'Active'},
+            {'id': issues[0], 'to': 'Closed'},
+        ]}).get_json()
+        assert [r['success'] for r in response['results']] == [False, True, False]
+        assert db.session.get(Issue, issues[1]).state == 'Active'
+
+    def test_delete_reports_missing_and_bool_ids(self, client, issues, timeline):
+        """Existing issues go with their events; others are reported"""
+        response = client.post('/api/issues/batch/delete',
+                               json={'ids': [issues[0], 999999, True]}).get_json()
+        assert [r['success'] for r in response['results']] == [True, False, False]
+        assert Issue.query.count() == 4
+        assert Event.query.filter_by(issue_id=issues[0]).count() == 0
+
+    def test_empty_batch_is_400(self, client, app):
+        """A batch must have items"""
+        assert client.post('/api/issues/batch', json={'issues': []}).status_code == 400
+
+
+class TestIndexes:
+    """Test the keyset indexes reach a database created before they existed"""
+
+    def index_columns(self, table):
+        return {tuple(index['column_names']) for index in inspect(db.engine).get_indexes(table)}
+
+    def test_missing_indexes_are_created(self, app):
+        """Dropped keyset indexes come back; the rest are left alone"""
+        db.session.execute(text('DROP INDEX idx_created_at_id'))
+        db.session.execute(text('DROP INDEX idx_issue_id_ts'))
+        db.session.commit()
+
+        ensure_indexes()
+        assert ('created_at', 'id') in self.index_columns('issues')
+        assert ('issue_id', 'ts') in self.index_columns('events')
+
+    def test_same_columns_under_another_name_count(self, app):
+        """An index from the SQL schema with a different name is not duplicated"""
+        db.session.execute(text('DROP INDEX idx_issue_id_ts'))
+        db.session.execute(text('CREATE INDEX idx_issue_ts_legacy ON events (issue_id, ts)'))
+        db.session.commit()
+
+        ensure_indexes()
+        names = [index['name'] for index in inspect(db.engine).get_indexes('events')]
+        assert 'idx_issue_ts_legacy' in names and 'idx_issue_id_ts' not in names
@@ -0,0 +1,192 @@
+"""
+Tests for the AI fix job queue (claiming, re-queueing and duplicate enqueues)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from models.base import db
+from models.issue import Issue
+from models.job import AIFixJob
+from services.job_queue import get_job_queue
+
+
+@pytest.fixture
+def queue(app, monkeypatch):
+    queue = get_job_queue()
+    # Keep the pipeline out of these tests; only the table is exercised
+    monkeypatch.setattr(queue, 'start', lambda: None)
+    monkeypatch.setattr(queue, '_submit', lambda job_id: None)
+    return queue
+
+
+@pytest.fixture
+def issue(app):
+    issue = Issue(title='Cart total is wrong', state='Active')
+    db.session.add(issue)
+    db.session.commit()
+    return issue
+
+
+class TestEnqueue:
+    """Test that an issue has at most one active job"""
+
+    def test_second_enqueue_returns_active_job(self, queue, issue):
+        """Clicking AI Fix twice queues one job"""
+        job, created = queue.enqueue(issue)
+        again, created_again = queue.enqueue(issue)
+        assert created and not created_again
+        assert again.id == job.id
+        assert AIFixJob.query.count() == 1
+
+    def test_concurrent_enqueue_loses_on_unique_key(self, queue, issue, monkeypatch):
+        """A request that missed the other's job in its lookup gets that job back"""
+        job, _ = queue.enqueue(issue)
+        lookups = iter([None])
+        original = queue._active_job
+        monkeypatch.setattr(queue, '_active_job', lambda issue_id: next(lookups, None) or original(issue_id))
+
+        again, created = queue.enqueue(issue)
+        assert not created
+        assert again.id == job.id
+        assert AIFixJob.query.count() == 1
+
+    def test_finished_job_allows_a_new_one(self, queue, issue):
+        """Once a job finishes the issue can be fixed again"""
+        job, _ = queue.enqueue(issue)
+        queue._finish(job.id, 'failed', error='boom')
+        again, created = queue.enqueue(issue)
+        assert created
+        assert again.id != job.id
+
+
+class TestClaim:
+    """Test moving jobs from queued to running"""
+
+    def test_job_is_claimed_once(self, queue, issue):
+        """Only the first claim of a queued job wins"""
+        job, _ = queue.enqueue(issue)
+        assert queue._claim(job.id)
+        assert not queue._claim(job.id)
+
+        db.session.expire_all()
+        job = db.session.get(AIFixJob, job.id)
+        assert job.status == 'running'
+        assert job.attempts == 1
+        assert job.active_issue_id == issue.id
+
+
+class TestSweep:
+    """Test re-queueing of running jobs whose process went away"""
+
+    def _running_job(self, queue, issue, last_seen):
+        job, _ = queue.enqueue(issue)
+        queue._claim(job.id)
+        AIFixJob.query.filter_by(id=job.id).update({'updated_at': last_seen}, synchronize_session=False)
+        db.session.commit()
+        return job.id
+
+    def test_stale_job_is_requeued(self, queue, issue):
+        """A running job with no recent heartbeat goes back to queued"""
+        job_id = self._running_job(queue, issue, datetime.utcnow() - timedelta(seconds=queue.stale_after + 60))
+        queue._sweep()
+        db.session.expire_all()
+        job = db.session.get(AIFixJob, job_id)
+        assert job.status == 'queued'
+        assert job.active_issue_id == issue.id
+
+    def test_heartbeat_keeps_long_stage_running(self, queue, issue):
+        """A job stuck in one slow stage is not re-queued while it heartbeats"""
+        job_id = self._running_job(queue, issue, datetime.utcnow() - timedelta(seconds=queue.stale_after + 60))
+        assert queue._heartbeat(job_id)
+        queue._sweep()
+        db.session.expire_all()
+        assert db.session.get(AIFixJob, job_id).status == 'running'
+
+    def test_heartbeat_stops_after_finish(self, queue, issue):
+        """A finished job no longer heartbeats"""
+        job_id = self._running_job(queue, issue, datetime.utcnow())
+        queue._finish(job_id, 'succeeded')
+        assert not queue._heartbeat(job_id)
+
+
+class TestRetry:
+    """Test that retries do not replay cached answers"""
+
+    def test_first_run_may_use_cache(self, queue, issue):
+        """A first job on an issue is not a retry"""
+        job, _ = queue.enqueue(issue)
+        queue._claim(job.id)
+        assert not queue._is_retry(db.session.get(AIFixJob, job.id))
+
+    def test_job_after_failure_is_retry(self, queue, issue):
+        """Running AI fix again after a failure bypasses the cache"""
+        failed, _ = queue.enqueue(issue)
+        queue._finish(failed.id, 'failed', error='Patch failed validation')
+        job, _ = queue.enqueue(issue)
+        queue._claim(job.id)
+        assert queue._is_retry(db.session.get(AIFixJob, job.id))
+
+    def test_requeued_job_is_retry(self, queue, issue):
+        """A job claimed a second time is a retry"""
+        job, _ = queue.enqueue(issue)
+        queue._claim(job.id)
+        AIFixJob.query.filter_by(id=job.id).update({'status': 'queued'}, synchronize_session=False)
+        queue._claim(job.id)
+        db.session.expire_all()
+        assert queue._is_retry(db.session.get(AIFixJob, job.id))
+
+
+class TestRun:
+    """Test what a finished job does to its issue"""
+
+    def _run(self, queue, issue, monkeypatch, result):
+        import services.ai_service
+        monkeypatch.setattr(services.ai_service, 'start_ai_fix', lambda *args, **kwargs: result)
+        job, _ = queue.enqueue(issue)
+        queue._run(job.id)
+        db.session.expire_all()
+        return db.session.get(AIFixJob, job.id), db.session.get(Issue, issue.id)
+
+    def test_validated_fix_resolves_the_issue(self, queue, issue, monkeypatch):
+        """A patch whose tests passed resolves the issue"""
+        job, issue = self._run(queue, issue, monkeypatch,
+                               {'success': True, 'validated': True, 'message': 'AI fix completed successfully'})
+        assert job.status == 'succeeded'
+        assert job.result_json['validated'] is True
+        assert issue.state == 'Resolved'
+
+    def test_unvalidated_fix_leaves_the_issue_active(self, queue, issue, monkeypatch):
+        """A patch no tests ran against is recorded but does not resolve the issue"""
+        job, issue = self._run(queue, issue, monkeypatch,
+                               {'success': True, 'validated': False, 'message': 'AI fix proposed but not validated'})
+        assert job.status == 'succeeded'
+        assert job.result_json['validated'] is False
+        assert issue.state == 'Active'
+
+    def test_mock_fix_never_resolves(self, queue, issue, monkeypatch):
+        """A mock patch leaves the issue Active even if it claims to be validated"""
+        job, issue = self._run(queue, issue, monkeypatch,
+                               {'success': True, 'validated': True, 'mock': True, 'message': 'AI fix'})
+        assert job.result_json['validated'] is False
+        assert issue.state == 'Active'
+
+
+class TestDrain:
+    """Test handing jobs back when a process exits"""
+
+    def test_unfinished_job_is_handed_back(self, queue, issue):
+        """A job still running when the drain times out is queued again at once"""
+        job, _ = queue.enqueue(issue)
+        queue._claim(job.id)
+        queue._running.add(job.id)
+        assert queue.drain(timeout=0) == 1
+        db.session.expire_all()
+        job = db.session.get(AIFixJob, job.id)
+        assert job.status == 'queued'
+        assert job.active_issue_id == issue.id
+
+    def test_nothing_running_hands_back_nothing(self, queue, issue):
+        """An idle queue drains immediately"""
+        queue.enqueue(issue)
+        assert queue.drain(timeout=5) == 0
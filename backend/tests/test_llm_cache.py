@@ -0,0 +1,90 @@
+"""
+Tests for the content-addressed LLM response cache
+"""
+
+import time
+from services.llm_cache import LLMResponseCache, cache_key
+from services.llm_client import LLMClient
+
+
+class TestCacheKey:
+    """Test what the cache key depends on"""
+
+    def test_same_inputs_same_key(self):
+        """Identical requests map to the same entry"""
+        assert cache_key('m', 'prompt', 0.2, 100) == cache_key('m', 'prompt', 0.2, 100)
+
+    def test_any_input_changes_key(self):
+        """Model, prompt, sampling params and file digests all matter"""
+        base = cache_key('m', 'prompt', 0.2, 100, {'a.py': '1'})
+        assert base != cache_key('m2', 'prompt', 0.2, 100, {'a.py': '1'})
+        assert base != cache_key('m', 'prompt!', 0.2, 100, {'a.py': '1'})
+        assert base != cache_key('m', 'prompt', 0.3, 100, {'a.py': '1'})
+        assert base != cache_key('m', 'prompt', 0.2, 200, {'a.py': '1'})
+        assert base != cache_key('m', 'prompt', 0.2, 100, {'a.py': '2'})
+
+
+class TestLLMResponseCache:
+    """Test LRU, TTL and counters"""
+
+    def test_hit_and_miss_counters(self):
+        """Lookups are counted"""
+        cache = LLMResponseCache()
+        assert cache.get('k') is None
+        cache.set('k', 'v')
+        assert cache.get('k') == 'v'
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    def test_lru_eviction(self):
+        """Least recently used entry goes first"""
+        cache = LLMResponseCache(max_entries=2)
+        cache.set('a', '1')
+        cache.set('b', '2')
+        cache.get('a')
+        cache.set('c', '3')
+        assert cache.get('a') == '1'
+        assert cache.get('b') is None
+        assert cache.get('c') == '3'
+
+    def test_ttl_expiry(self):
+        """Expired entries are misses"""
+        cache = LLMResponseCache(ttl=0)
+        cache.set('k', 'v')
+        time.sleep(0.01)
+        assert cache.get('k') is None
+
+    def test_oversized_values_not_cached(self):
+        """Values above the size limit are skipped"""
+        cache = LLMResponseCache(max_value_bytes=10)
+        cache.set('k', 'x' * 11)
+        assert cache.get('k') is None
+
+
+class TestClientCaching:
+    """Test which completions the client caches"""
+
+    def _client(self, **kwargs):
+        return LLMClient('http://llm.invalid', 'key', 'model', cache=LLMResponseCache(), **kwargs)
+
+    def test_greedy_completions_cached(self):
+        """Temperature 0 completions are cached"""
+        assert self._client()._cache_key('p', 0.0, 100, None, None, True) is not None
+
+    def test_sampled_completions_not_cached(self):
+        """Completions sampled above the limit always go to the API"""
+        client = self._client()
+        assert client._cache_key('p', 0.2, 100, None, None, True) is None
+        assert self._client(cache_max_temperature=0.5)._cache_key('p', 0.2, 100, None, None, True) is not None
+
+    def test_use_cache_false_bypasses(self):
+        """A retry can skip the cache"""
+        assert self._client()._cache_key('p', 0.0, 100, None, None, False) is None
+
+    def test_first_patch_candidate_is_cached(self):
+        """The first patch candidate is greedy, so repeated fixes can be answered from the cache"""
+        from services.ai_service import candidate_temperature
+
+        assert self._client()._cache_key('p', candidate_temperature(0), 100, None, None, True) is not None
+        assert self._client()._cache_key('p', candidate_temperature(1), 100, None, None, True) is None
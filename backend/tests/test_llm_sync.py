@@ -0,0 +1,51 @@
+"""
+Tests that the agent's copies of the LLM cache and client match the backend's
+
+mcp_agent/ is built into its own image, so it cannot import from the
+backend; the parts both sides share are compared as source instead.
+"""
+
+import ast
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SHARED = {
+    'llm_cache.py': ['cache_key', 'LLMResponseCache'],
+    'llm_client.py': ['RETRY_STATUSES', 'LLMError', 'LLMClient._cache_key', 'LLMClient._backoff'],
+}
+
+
+def definitions(path: str) -> dict:
+    """Source of every top-level definition and method, without docstrings, by dotted name"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+
+    found = {}
+
+    def visit(nodes, prefix=''):
+        for node in nodes:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                found[prefix + node.name] = ast.dump(node)
+                if isinstance(node, ast.ClassDef):
+                    visit(node.body, f'{prefix}{node.name}.')
+            elif isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        found[prefix + target.id] = ast.dump(node.value)
+
+    visit(tree.body)
+    return found
+
+
+@pytest.mark.parametrize('module', sorted(SHARED))
+def test_agent_copy_matches_backend(module):
+    """Shared definitions are identical in backend/services and mcp_agent"""
+    agent_path = os.path.join(ROOT, 'mcp_agent', module)
+    if not os.path.exists(agent_path):
+        pytest.skip('mcp_agent is not in this checkout')
+    backend = definitions(os.path.join(ROOT, 'backend', 'services', module))
+    agent = definitions(agent_path)
+    for name in SHARED[module]:
+        assert backend[name] == agent[name], f'{name} differs between backend/services/{module} and mcp_agent/{module}'
@@ -0,0 +1,125 @@
+"""
+Tests for unified diff parsing and application
+"""
+
+import os
+
+import pytest
+from services.patch_utils import (PatchError, apply_hunks, apply_patch, check_patch, only_changes_tests,
+                                 parse_patch, patch_paths)
+
+ORIGINAL = """def total(items):
+    subtotal = sum(i['price'] for i in items)
+    return subtotal
+
+
+def count(items):
+    return len(items)
+"""
+
+PATCH = """Here is the fix:
+```diff
+--- a/shop/cart.py
++++ b/shop/cart.py
+@@ -1,3 +1,3 @@
+ def total(items):
+-    subtotal = sum(i['price'] for i in items)
++    subtotal = sum(i['price'] * i['qty'] for i in items)
+     return subtotal
+```
+"""
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / 'shop').mkdir()
+    (tmp_path / 'shop' / 'cart.py').write_text(ORIGINAL)
+    return str(tmp_path)
+
+
+class TestParsePatch:
+    """Test reading diffs out of LLM output"""
+
+    def test_parses_files_and_hunks(self):
+        """Paths lose their a/ b/ prefix; text around the diff is ignored"""
+        files = parse_patch(PATCH)
+        assert len(files) == 1
+        assert files[0].path == 'shop/cart.py'
+        assert [op for op, _ in files[0].hunks[0].lines] == [' ', '-', '+', ' ']
+
+    def test_no_diff_raises(self):
+        """Prose without file headers is not a patch"""
+        with pytest.raises(PatchError):
+            parse_patch('Use Decimal for money.')
+
+
+class TestApplyHunks:
+    """Test placing hunks by their context"""
+
+    def test_wrong_line_numbers_are_tolerated(self):
+        """A hunk is placed where its context matches, not where the header says"""
+        hunk = parse_patch("""--- a/f.py
++++ b/f.py
+@@ -40,2 +40,2 @@
+ def count(items):
+-    return len(items)
++    return sum(i['qty'] for i in items)
+""")[0].hunks
+        assert apply_hunks(ORIGINAL, hunk).endswith("    return sum(i['qty'] for i in items)\n")
+
+    def test_mismatched_context_raises(self):
+        """Context that is not in the file fails"""
+        hunk = parse_patch("""--- a/f.py
++++ b/f.py
+@@ -1,2 +1,2 @@
+ def price(items):
+-    pass
++    return 0
+""")[0].hunks
+        with pytest.raises(PatchError):
+            apply_hunks(ORIGINAL, hunk)
+
+
+class TestCheckPatch:
+    """Test validation against a workspace"""
+
+    def test_valid_patch(self, workspace):
+        """A patch for an existing file with matching context is valid"""
+        result = check_patch(PATCH, workspace)
+        assert result == {'valid': True, 'files': ['shop/cart.py'], 'errors': []}
+        assert "i['qty']" in apply_patch(PATCH, workspace)['shop/cart.py']
+
+    def test_hallucinated_path(self, workspace):
+        """A file that does not exist makes the patch invalid"""
+        result = check_patch(PATCH.replace('shop/cart.py', 'src/cart.py'), workspace)
+        assert not result['valid']
+        assert 'does not exist' in result['errors'][0]
+
+    def test_path_escaping_workspace(self, workspace):
+        """Paths may not leave the workspace"""
+        result = check_patch(PATCH.replace('shop/cart.py', '../cart.py'), workspace)
+        assert not result['valid']
+
+    def test_fallback_patch_applies_to_this_repo(self):
+        """The mock patch served without an LLM still matches the current code"""
+        from services.ai_service import MOCK_PATCH
+
+        repo = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        result = check_patch(MOCK_PATCH, repo)
+        assert result == {'valid': True, 'files': ['backend/ecommerce/cart.py'], 'errors': []}
+
+
+class TestTestOnlyPatches:
+    """Test spotting patches that change tests and nothing else"""
+
+    def test_test_paths(self):
+        """Test modules, conftest.py and anything under tests/ are tests"""
+        assert only_changes_tests(['backend/tests/test_cart.py', 'backend/conftest.py'])
+        assert only_changes_tests(['backend/tests/helpers.py'])
+        assert not only_changes_tests(['backend/tests/test_cart.py', 'backend/ecommerce/cart.py'])
+        assert not only_changes_tests([])
+
+    def test_patch_paths(self):
+        """Paths come from the diff itself, no workspace needed"""
+        assert patch_paths(PATCH) == ['shop/cart.py']
+        assert patch_paths('not a patch') == []
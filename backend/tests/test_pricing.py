@@ -0,0 +1,95 @@
+"""
+Tests for exact integer-cents pricing
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import pytest
+from ecommerce.pricing import div_half_up, price_cart, price_carts, rate_fraction, to_cents
+
+
+def decimal_total(lines, discount_pct, tax_pct):
+    """Reference: the same steps with Decimal, rounded half-up to the cent"""
+    subtotal = Decimal(sum(price * qty for price, qty in lines))
+    discount = (subtotal * Decimal(str(discount_pct))).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+    tax = ((subtotal - discount) * Decimal(str(tax_pct))).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+    return int(subtotal - discount + tax)
+
+
+class TestRounding:
+    """Test the exact conversions and rounding"""
+
+    def test_rate_fraction_is_exact(self):
+        """0.08875 is 71/800, not the nearest binary float"""
+        assert rate_fraction(0.08875) == (71, 800)
+
+    def test_to_cents(self):
+        """Dollar prices convert to exact cents"""
+        assert to_cents(29.99) == 2999
+        assert to_cents(12.99) == 1299
+        assert to_cents(1.005) == 101
+
+    def test_div_half_up(self):
+        """Halves round up, everything else to nearest"""
+        assert div_half_up(5, 10) == 1
+        assert div_half_up(4, 10) == 0
+        assert div_half_up(15, 10) == 2
+
+
+class TestPriceCart:
+    """Test pricing a single cart"""
+
+    def test_shirt_and_socks(self):
+        """$29.99 + $12.99, 10% off, 8.875% tax"""
+        result = price_cart([(2999, 1), (1299, 1)], discount_pct=0.10, tax_pct=0.08875)
+        assert result['subtotal'] == 4298
+        assert result['discount'] == 430
+        assert result['tax'] == 343
+        assert result['total'] == 4211
+
+    def test_matches_decimal(self):
+        """Every step agrees with the Decimal reference"""
+        lines = [(1999, 3), (1, 7), (4999, 2)]
+        for discount in (0, 0.05, 0.1, 0.125, 0.333):
+            for tax in (0, 0.0625, 0.07, 0.08875):
+                assert price_cart(lines, discount, tax)['total'] == decimal_total(lines, discount, tax)
+
+    def test_rejects_discount_over_100_percent(self):
+        """A discount above 100% is an error"""
+        with pytest.raises(ValueError):
+            price_cart([(100, 1)], discount_pct=1.5)
+
+
+class TestPriceCarts:
+    """Test batch pricing"""
+
+    def test_batch_matches_single(self):
+        """Batch results equal pricing each cart on its own, including empty carts"""
+        carts = [
+            ([(2999, 1), (1299, 1)], 0.10, 0.08875),
+            ([], 0.10, 0.08875),
+            ([(500, 3), (200, 2)], 0.05, 0.10),
+            ([(1, 1)], 0, 0.5)
+        ]
+        price_cents = [price for lines, _, _ in carts for price, _ in lines]
+        qty = [q for lines, _, _ in carts for _, q in lines]
+        offsets = [0]
+        for lines, _, _ in carts:
+            offsets.append(offsets[-1] + len(lines))
+
+        result = price_carts(price_cents, qty, offsets, [c[1] for c in carts], [c[2] for c in carts])
+
+        for i, cart in enumerate(carts):
+            single = price_cart(*cart)
+            for name in ('subtotal', 'discount', 'tax', 'total', 'items_count'):
+                assert result[name][i] == single[name]
+
+    def test_large_amounts_stay_exact(self):
+        """Amounts that would overflow int64 fall back to exact Python ints"""
+        result = price_carts([10 ** 15], [1000], [0, 1], [0.5], [0.08875])
+        assert result['total'][0] == decimal_total([(10 ** 15, 1000)], 0.5, 0.08875)
+
+    def test_rejects_bad_offsets(self):
+        """Offsets must cover the lines exactly"""
+        with pytest.raises(ValueError):
+            price_carts([100, 200], [1, 1], [0, 1], [0], [0])
@@ -0,0 +1,115 @@
+"""
+Tests for streamed completions and the AI fix stream hub
+"""
+
+import pytest
+from services.llm_client import LLMError, iter_stream_deltas
+from services.stream_hub import StreamHub
+
+
+class TestStreamDeltas:
+    """Test parsing of streamed chat completion chunks"""
+
+    def test_yields_content_deltas(self):
+        """Only non-empty content deltas come out, in order"""
+        lines = [
+            'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+            '',
+            'data: {"choices": [{"delta": {"content": "Float "}}]}',
+            ': comment',
+            'data: {"choices": [{"delta": {"content": "rounding"}}]}',
+            'data: [DONE]',
+            'data: {"choices": [{"delta": {"content": "ignored"}}]}'
+        ]
+        assert list(iter_stream_deltas(lines)) == ['Float ', 'rounding']
+
+    def test_error_chunk_raises(self):
+        """An error object in the stream is an LLMError"""
+        with pytest.raises(LLMError):
+            list(iter_stream_deltas(['data: {"error": {"message": "overloaded"}}']))
+
+
+class TestStreamHub:
+    """Test fan-out, replay and slow subscribers"""
+
+    def test_subscriber_receives_published_messages(self):
+        """Messages reach subscribers of the same issue only"""
+        hub = StreamHub()
+        hub.begin(1)
+        sub = hub.subscribe(1)
+        other = hub.subscribe(2)
+        hub.publish(1, 'token', {'text': 'a'})
+        assert sub.get(0.1)[1] == 'start'
+        assert sub.get(0.1)[1:] == ('token', {'text': 'a'})
+        assert other.get(0.01) is None
+
+    def test_late_subscriber_replays_from_last_seq(self):
+        """A reconnecting client gets what it missed after Last-Event-ID"""
+        hub = StreamHub()
+        hub.begin(1)
+        for text in 'abc':
+            hub.publish(1, 'token', {'text': text})
+        sub = hub.subscribe(1, last_seq=2)
+        assert [sub.get(0.1)[2]['text'] for _ in range(2)] == ['b', 'c']
+        assert sub.get(0.01) is None
+
+    def test_jobs_do_not_share_history(self):
+        """A new job's stream never replays an earlier job of the same issue"""
+        hub = StreamHub()
+        hub.begin(1)
+        hub.publish(1, 'done', {'status': 'failed'})
+        sub = hub.subscribe(2)
+        hub.begin(2)
+        assert sub.get(0.1)[1] == 'start'
+        assert sub.get(0.01) is None
+
+    def test_requeued_job_replaces_history(self):
+        """Only the job's latest run is replayed"""
+        hub = StreamHub()
+        hub.begin(1)
+        hub.publish(1, 'done', {'status': 'succeeded'})
+        hub.begin(1)
+        sub = hub.subscribe(1)
+        assert sub.get(0.1)[1] == 'start'
+        assert sub.get(0.01) is None
+
+    def test_slow_subscriber_is_dropped(self):
+        """A full queue drops the subscriber instead of blocking the publisher"""
+        hub = StreamHub(max_pending=2)
+        sub = hub.subscribe(1)
+        for text in 'abc':
+            hub.publish(1, 'token', {'text': text})
+        assert hub.stats()['subscribers'] == 0
+        sub.get(0.01)
+        sub.get(0.01)
+        assert sub.drained
+
+
+class TestStreamRoute:
+    """Test GET /api/issues/<id>/ai-fix/jobs/<job_id>/stream"""
+
+    def _job(self, status):
+        from models.base import db
+        from models.issue import Issue
+        from models.job import AIFixJob
+
+        issue = Issue(title='Cart total is wrong', state='Active')
+        db.session.add(issue)
+        db.session.flush()
+        job = AIFixJob(issue_id=issue.id, status=status, stage='done', error='Patch failed validation')
+        db.session.add(job)
+        db.session.commit()
+        return issue.id, job.id
+
+    def test_job_finished_elsewhere_gets_done(self, client):
+        """A job this process never ran is closed from the table"""
+        issue_id, job_id = self._job('failed')
+        response = client.get(f'/api/issues/{issue_id}/ai-fix/jobs/{job_id}/stream')
+        body = response.get_data(as_text=True)
+        assert 'event: done' in body
+        assert '"status": "failed"' in body
+
+    def test_job_of_other_issue_is_404(self, client):
+        """The job must belong to the issue"""
+        issue_id, job_id = self._job('succeeded')
+        assert client.get(f'/api/issues/{issue_id + 1}/ai-fix/jobs/{job_id}/stream').status_code == 404
@@ -0,0 +1,139 @@
+"""
+Tests for sandboxed patch validation
+"""
+
+import os
+
+import pytest
+from services.impact_index import ImpactIndex
+from services.validation import Sandbox, sandbox_env, validate_patch
+from services.workspace_snapshot import WorkspaceSnapshotter
+
+MODULE = "def double(x):\n    return x + x\n"
+TESTS = "from calc import double\n\n\ndef test_double():\n    assert double(2) == 4\n"
+
+
+def make_patch(old, new):
+    return f"""--- a/proj/calc.py
++++ b/proj/calc.py
+@@ -1,2 +1,2 @@
+ def double(x):
+-    return {old}
++    return {new}
+"""
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    project = tmp_path / 'proj'
+    (project / 'tests').mkdir(parents=True)
+    (project / 'calc.py').write_text(MODULE)
+    (project / 'tests' / 'test_calc.py').write_text(TESTS)
+    return tmp_path
+
+
+class TestSandbox:
+    """Test the scratch copy"""
+
+    def test_writes_do_not_reach_the_workspace(self, workspace):
+        """Patched files and files written in place by tests stay in the sandbox"""
+        with Sandbox(str(workspace), 'proj') as sandbox:
+            sandbox.write('proj/calc.py', 'changed\n')
+            with open(os.path.join(sandbox.project_dir, 'tests', 'test_calc.py'), 'a') as f:
+                f.write('# appended by a test\n')
+            assert (workspace / 'proj' / 'calc.py').read_text() == MODULE
+            assert (workspace / 'proj' / 'tests' / 'test_calc.py').read_text() == TESTS
+            assert sandbox.copied == 2
+
+    def test_env_files_are_not_copied(self, workspace):
+        """Local settings files with secrets stay out of the sandbox"""
+        (workspace / 'proj' / '.env').write_text('CEREBRAS_API_KEY=secret\n')
+        with Sandbox(str(workspace), 'proj') as sandbox:
+            assert not os.path.exists(os.path.join(sandbox.project_dir, '.env'))
+
+    def test_tests_get_an_allow_listed_env(self, monkeypatch, tmp_path):
+        """Credentials in the backend's environment do not reach test processes"""
+        monkeypatch.setenv('CEREBRAS_API_KEY', 'secret')
+        monkeypatch.setenv('MYSQL_PASSWORD', 'secret')
+        env = sandbox_env(str(tmp_path))
+        assert 'CEREBRAS_API_KEY' not in env and 'MYSQL_PASSWORD' not in env
+        assert env['HOME'] == str(tmp_path)
+        assert env['PATH'] == os.environ['PATH']
+
+
+class TestValidatePatch:
+    """Test validation outcomes"""
+
+    def test_passing_patch(self, workspace):
+        """A correct patch passes with real test names and timings"""
+        result = validate_patch(make_patch('x + x', '2 * x'), str(workspace), 'proj', ['tests/test_calc.py'])
+        assert result['status'] == 'passed'
+        assert result['tests_passed'] == ['tests.test_calc::test_double']
+        assert 'tests.test_calc::test_double' in result['timings']
+        assert (workspace / 'proj' / 'calc.py').read_text() == MODULE
+
+    def test_failing_patch(self, workspace):
+        """A patch that breaks a test fails, with the assertion message"""
+        result = validate_patch(make_patch('x + x', 'x * x * x'), str(workspace), 'proj', ['tests/test_calc.py'])
+        assert result['status'] == 'failed'
+        assert result['tests_failed'] == ['tests.test_calc::test_double']
+        assert 'assert' in result['failures']['tests.test_calc::test_double']
+
+    def test_patch_that_does_not_apply(self, workspace):
+        """Mismatched context is an error before any test runs"""
+        result = validate_patch(make_patch('x - x', '2 * x'), str(workspace), 'proj', ['tests/test_calc.py'])
+        assert result['status'] == 'error'
+        assert result['modules'] == []
+
+    def test_result_cached_per_snapshot(self, workspace):
+        """The same patch against an unchanged project reuses the result"""
+        snapshotter = WorkspaceSnapshotter(str(workspace), refresh_interval=0)
+        patch = make_patch('x + x', '2 * x')
+        args = (patch, str(workspace), 'proj', ['tests/test_calc.py'])
+
+        first = validate_patch(*args, snapshot=snapshotter.current())
+        second = validate_patch(*args, snapshot=snapshotter.current())
+        assert (first['cached'], second['cached']) == (False, True)
+        assert second['tests_passed'] == first['tests_passed']
+
+        (workspace / 'proj' / 'helpers.py').write_text('')
+        assert validate_patch(*args, snapshot=snapshotter.current())['cached'] is False
+
+
+class TestImpactIndex:
+    """Test mapping changed files to the tests that depend on them"""
+
+    @pytest.fixture
+    def project(self, tmp_path):
+        (tmp_path / 'shop').mkdir()
+        (tmp_path / 'tests').mkdir()
+        (tmp_path / 'shop' / '__init__.py').write_text('')
+        (tmp_path / 'shop' / 'money.py').write_text('def cents(x):\n    return x\n')
+        (tmp_path / 'shop' / 'cart.py').write_text('from .money import cents\n')
+        (tmp_path / 'shop' / 'admin.py').write_text('')
+        (tmp_path / 'tests' / 'test_cart.py').write_text('from shop import cart\n')
+        (tmp_path / 'tests' / 'test_money.py').write_text('import shop.money\n')
+        return ImpactIndex(str(tmp_path)).refresh()
+
+    def test_transitive_and_relative_imports(self, project):
+        """A module's tests include those importing it through other modules"""
+        assert project.impacted_tests(['shop/money.py']) == ['tests/test_cart.py', 'tests/test_money.py']
+        assert project.impacted_tests(['shop/cart.py']) == ['tests/test_cart.py']
+
+    def test_untested_module_selects_nothing(self, project):
+        """No test reaches admin.py"""
+        assert project.impacted_tests(['shop/admin.py']) == []
+
+    def test_unknown_files_select_everything(self, project):
+        """Data files and new files could affect any test"""
+        assert project.impacted_tests(['shop/products.json']) == project.tests
+
+    def test_refresh_sees_new_imports(self, project):
+        """Changed files are re-parsed on refresh"""
+        admin = project.project_dir + '/shop/admin.py'
+        with open(admin, 'w') as f:
+            f.write('from shop import cart  # now imports cart\n')
+        with open(project.project_dir + '/tests/test_admin.py', 'w') as f:
+            f.write('import shop.admin\n')
+        project.refresh()
+        assert project.impacted_tests(['shop/cart.py']) == ['tests/test_admin.py', 'tests/test_cart.py']
@@ -0,0 +1,154 @@
+"""
+Tests for workspace snapshots
+"""
+
+import os
+import time
+
+import pytest
+from services.workspace_snapshot import WorkspaceSnapshotter
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / 'app').mkdir()
+    (tmp_path / 'app' / 'cart.py').write_text('total = 1\n')
+    (tmp_path / 'app' / 'money.py').write_text('cents = 100\n')
+    (tmp_path / 'README.md').write_text('readme\n')
+    return tmp_path
+
+
+def touch(path, text):
+    """Write and move the mtime forward so the change is seen even on coarse clocks"""
+    path.write_text(text)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class TestSnapshot:
+    """Test manifests, ids and diffs"""
+
+    def test_id_follows_content(self, workspace):
+        """Same content keeps the snapshot; changed content gives a new id"""
+        snapshotter = WorkspaceSnapshotter(str(workspace), refresh_interval=0)
+        first = snapshotter.current()
+        assert snapshotter.current() is first
+
+        touch(workspace / 'app' / 'cart.py', 'total = 2\n')
+        second = snapshotter.current()
+        assert second.id != first.id
+        assert second.digest('README.md') == first.digest('README.md')
+        assert second.digest('app') != first.digest('app')
+        assert snapshotter.get(first.id) is first
+
+    def test_diff(self, workspace):
+        """Added, removed and changed files between two snapshots"""
+        snapshotter = WorkspaceSnapshotter(str(workspace), refresh_interval=0)
+        before = snapshotter.current()
+        touch(workspace / 'app' / 'cart.py', 'total = 2\n')
+        (workspace / 'app' / 'money.py').unlink()
+        (workspace / 'app' / 'tax.py').write_text('rate = 0\n')
+
+        diff = snapshotter.current().diff(before)
+        assert diff == {'added': ['app/tax.py'], 'removed': ['app/money.py'], 'changed': ['app/cart.py']}
+
+    def test_only_changed_files_are_rehashed(self, workspace):
+        """A refresh hashes only files whose mtime or size moved"""
+        snapshotter = WorkspaceSnapshotter(str(workspace), refresh_interval=0)
+        snapshotter.current()
+        assert snapshotter.hashed == 3
+
+        touch(workspace / 'app' / 'cart.py', 'total = 2\n')
+        snapshotter.current()
+        assert snapshotter.hashed == 4
+
+    def test_read_pins_the_snapshot(self, workspace):
+        """Reads are served as of the snapshot and refuse content that has since changed"""
+        snapshotter = WorkspaceSnapshotter(str(workspace), refresh_interval=0, max_blob_bytes=0)
+        snapshot = snapshotter.current()
+        assert snapshotter.read('app/cart.py', snapshot) == 'total = 1\n'
+
+        touch(workspace / 'app' / 'cart.py', 'total = 2\n')
+        with pytest.raises(KeyError):
+            snapshotter.read('app/cart.py', snapshot)
+        assert snapshotter.read('app/cart.py') == 'total = 2\n'
+
+    def test_only_regular_files_within_the_size_cap(self, workspace):
+        """FIFOs, symlinks and oversized files are left out instead of read"""
+        os.mkfifo(workspace / 'app' / 'pipe')
+        os.symlink('/dev/zero', workspace / 'app' / 'zero')
+        (workspace / 'big.bin').write_bytes(b'x' * 2048)
+        snapshotter = WorkspaceSnapshotter(str(workspace), refresh_interval=0, max_file_bytes=1024)
+        assert sorted(snapshotter.current().files) == ['README.md', 'app/cart.py', 'app/money.py']
+
+    def test_background_refresh_returns_the_stale_snapshot(self, workspace):
+        """In background mode a stale snapshot is served while the tree is re-statted"""
+        snapshotter = WorkspaceSnapshotter(str(workspace), refresh_interval=0, background=True)
+        first = snapshotter.current()
+        touch(workspace / 'app' / 'cart.py', 'total = 2\n')
+        assert snapshotter.current() is first
+
+        deadline = time.monotonic() + 5
+        while snapshotter.current().id == first.id and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert snapshotter.current().id != first.id
+
+    def test_refuses_the_filesystem_root(self):
+        """The filesystem root is never walked"""
+        from services.workspace_snapshot import get_workspace_snapshotter
+
+        with pytest.raises(ValueError):
+            WorkspaceSnapshotter('/')
+        assert get_workspace_snapshotter('/') is None
+
+
+class TestNoWorkspace:
+    """Test behavior when no workspace is configured"""
+
+    def test_no_snapshotter_without_a_workspace(self, tmp_path, monkeypatch):
+        """Unset or missing WORKSPACE_PATH gives no snapshotter instead of snapshotting elsewhere"""
+        from config import Config
+        from services.workspace_snapshot import get_workspace_snapshotter
+
+        monkeypatch.setattr(Config, 'WORKSPACE_PATH', None)
+        assert get_workspace_snapshotter() is None
+        assert get_workspace_snapshotter(str(tmp_path / 'missing')) is None
+
+    def test_validation_skipped_with_reason(self, monkeypatch):
+        """Validation reports why it was skipped"""
+        from config import Config
+        from services.ai_service import validate_patch_result
+
+        monkeypatch.setattr(Config, 'WORKSPACE_PATH', None)
+        monkeypatch.setattr(Config, 'VALIDATION_ENABLED', True)
+        validation = validate_patch_result({'patch': ''})
+        assert validation['status'] == 'skipped'
+        assert 'WORKSPACE_PATH' in validation['errors'][0]
+        assert validation['recommendation'].startswith('Not validated')
+
+    def test_validation_skipped_without_the_project(self, workspace, monkeypatch):
+        """A workspace without VALIDATION_PROJECT is skipped, not validated"""
+        from config import Config
+        from services.ai_service import validate_patch_result
+
+        monkeypatch.setattr(Config, 'WORKSPACE_PATH', str(workspace))
+        monkeypatch.setattr(Config, 'VALIDATION_ENABLED', True)
+        monkeypatch.setattr(Config, 'VALIDATION_PROJECT', 'backend')
+        validation = validate_patch_result({'patch': ''})
+        assert validation['status'] == 'skipped'
+        assert 'backend/' in validation['errors'][0]
+
+    def test_mock_or_tests_only_patch_is_never_validated(self, monkeypatch):
+        """A mock patch, or one that only edits tests, is not validated whatever the tests say"""
+        from config import Config
+        from services.ai_service import MOCK_PATCH, validate_patch_result
+
+        monkeypatch.setattr(Config, 'VALIDATION_ENABLED', False)
+        validation = validate_patch_result({'patch': MOCK_PATCH, 'mock': True})
+        assert validation['validated'] is False
+        assert 'mock' in validation['recommendation']
+
+        tests_only = MOCK_PATCH.replace('ecommerce/cart.py', 'tests/test_cart.py')
+        validation = validate_patch_result({'patch': tests_only}, mock=False)
+        assert validation['validated'] is False
+        assert 'only changes tests' in validation['recommendation']
@@ -0,0 +1,20 @@
+"""
+WSGI entry point for production serving
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is built once here (in the gunicorn master when preloading) with
+the AI fix queue stopped: its threads would not survive fork(), so
+gunicorn.conf.py starts a queue in each worker after it forks.
+"""
+
+from app import create_app
+from config import Config
+
+
+class WSGIConfig(Config):
+    """Config with the job queue started per worker, not at import"""
+    AI_FIX_QUEUE_AUTOSTART = False
+
+
+app = create_app(WSGIConfig)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Request throughput of a running backend on the issues and shop endpoints
+
+    python benchmark_serving.py --url http://localhost:8000 --concurrency 16 --duration 20
+
+Each client thread keeps one connection open and sends GETs back to
+back; the report gives requests per second and latency percentiles per
+endpoint. Run it once against the dev server (python app.py) and once
+against gunicorn (gunicorn -c gunicorn.conf.py wsgi:app) to compare.
+See docs/serving-benchmark.md.
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+ENDPOINTS = [
+    '/api/issues/',
+    '/api/issues/?limit=20',
+    '/api/shop/products',
+    '/api/shop/products/1',
+]
+
+
+def client_loop(base, paths: list, stop_at: float, results: dict, lock: threading.Lock, offset: int):
+    connection = None
+    latencies = {path: [] for path in paths}
+    errors = 0
+    i = offset
+    while time.monotonic() < stop_at:
+        path = paths[i % len(paths)]
+        i += 1
+        if connection is None:
+            connection = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=30)
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+            else:
+                latencies[path].append(time.perf_counter() - started)
+            if response.getheader('Connection', '').lower() == 'close':
+                connection.close()
+                connection = None
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = None
+
+    with lock:
+        for path, values in latencies.items():
+            results['latencies'][path].extend(values)
+        results['errors'] += errors
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--endpoint', action='append', help='Path to request (repeatable); default: issues and shop')
+    args = parser.parse_args()
+
+    base = urlsplit(args.url)
+    paths = args.endpoint or ENDPOINTS
+
+    def run(seconds):
+        results = {'latencies': {path: [] for path in paths}, 'errors': 0}
+        lock = threading.Lock()
+        stop_at = time.monotonic() + seconds
+        threads = [threading.Thread(target=client_loop, args=(base, paths, stop_at, results, lock, n))
+                   for n in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    run(args.warmup)
+    started = time.monotonic()
+    results = run(args.duration)
+    elapsed = time.monotonic() - started
+
+    total = sum(len(v) for v in results['latencies'].values())
+    print(f"{args.url}  concurrency={args.concurrency}  duration={elapsed:.1f}s")
+    print(f"{'endpoint':<28} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for path, values in results['latencies'].items():
+        print(f"{path:<28} {len(values) / elapsed:>8.1f} {percentile(values, 0.5) * 1000:>8.1f} "
+              f"{percentile(values, 0.99) * 1000:>8.1f}")
+    print(f"{'total':<28} {total / elapsed:>8.1f}   errors={results['errors']}")
+
+
+if __name__ == '__main__':
+    main()
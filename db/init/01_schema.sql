@@ -14,7 +14,12 @@ CREATE TABLE IF NOT EXISTS issues (
   created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   INDEX idx_state (state),
-  INDEX idx_created_at (created_at)
+  INDEX idx_created_at (created_at),
+  -- Keyset pagination: (created_at, id) newest first, optionally within one filter
+  INDEX idx_created_at_id (created_at, id),
+  INDEX idx_state_created_at_id (state, created_at, id),
+  INDEX idx_type_created_at_id (type, created_at, id),
+  INDEX idx_created_by_created_at_id (created_by, created_at, id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Events table (audit trail for all actions)
@@ -29,5 +34,63 @@ CREATE TABLE IF NOT EXISTS events (
   FOREIGN KEY (issue_id) REFERENCES issues(id) ON DELETE CASCADE,
   INDEX idx_issue_id (issue_id),
   INDEX idx_type (type),
-  INDEX idx_ts (ts)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
\ No newline at end of file
+  INDEX idx_ts (ts),
+  -- Timeline pagination by (ts, id); InnoDB appends the primary key to every secondary index
+  INDEX idx_issue_id_ts (issue_id, ts)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- AI fix jobs (background queue for the analysis -> patch -> validation pipeline)
+-- Persisted so queued/running jobs survive backend restarts
+CREATE TABLE IF NOT EXISTS ai_fix_jobs (
+  id BIGINT PRIMARY KEY AUTO_INCREMENT,
+  issue_id BIGINT NOT NULL,
+  -- issue_id while queued or running, NULL once finished: at most one active job per issue
+  active_issue_id BIGINT NULL,
+  status ENUM('queued','running','succeeded','failed') NOT NULL DEFAULT 'queued',
+  stage VARCHAR(32) NULL,
+  attempts INT NOT NULL DEFAULT 0,
+  error TEXT NULL,
+  result_json JSON NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  started_at TIMESTAMP NULL,
+  finished_at TIMESTAMP NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  FOREIGN KEY (issue_id) REFERENCES issues(id) ON DELETE CASCADE,
+  UNIQUE KEY uq_active_issue_id (active_issue_id),
+  INDEX idx_issue_id (issue_id),
+  INDEX idx_status (status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- LLM response cache (optional second tier behind the in-process LRU)
+-- cache_key is a SHA-256 over model, prompt, sampling params and file digests
+CREATE TABLE IF NOT EXISTS llm_cache (
+  cache_key CHAR(64) PRIMARY KEY,
+  response MEDIUMTEXT NOT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  expires_at TIMESTAMP NOT NULL,
+  INDEX idx_created_at (created_at),
+  INDEX idx_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Product catalog (used with CATALOG_SOURCE=db; otherwise backend/ecommerce/products.json)
+CREATE TABLE IF NOT EXISTS products (
+  id BIGINT PRIMARY KEY,
+  name VARCHAR(255) NOT NULL,
+  price DECIMAL(10,2) NOT NULL,
+  description TEXT NULL,
+  category VARCHAR(64) NOT NULL,
+  image VARCHAR(1024) NULL,
+  INDEX idx_category (category),
+  INDEX idx_price (price)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Server-side cart sessions (used with CART_STORE_SQL=true; otherwise in memory only)
+CREATE TABLE IF NOT EXISTS cart_sessions (
+  id VARCHAR(32) PRIMARY KEY,
+  state_json JSON NOT NULL,
+  -- Compare-and-set token for writers (mirrors state_json.version)
+  version INT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  expires_at TIMESTAMP NOT NULL,
+  INDEX idx_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
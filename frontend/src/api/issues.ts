@@ -22,13 +22,28 @@ export interface Event {
   actor: string;
   payload: any;
   ts: string;
+  omitted?: string[];  // payload fields left out of a summary page (see getEvent)
 }
 
-// Get all issues
-export async function getIssues(): Promise<Issue[]> {
-  const response = await fetch(`${API_BASE}/api/issues/`);
+// Get one page of issues (newest first); pass nextCursor back to get the next page
+export async function getIssuesPage(
+  params: { cursor?: string; limit?: number; state?: string; type?: string; count?: boolean } = {}
+): Promise<{ issues: Issue[]; nextCursor: string | null; total: number | null }> {
+  const query = new URLSearchParams();
+  if (params.cursor) query.set('cursor', params.cursor);
+  if (params.limit) query.set('limit', String(params.limit));
+  if (params.state) query.set('state', params.state);
+  if (params.type) query.set('type', params.type);
+  if (params.count) query.set('count', 'true');
+
+  const response = await fetch(`${API_BASE}/api/issues/?${query}`);
   if (!response.ok) throw new Error('Failed to fetch issues');
-  return response.json();
+  const total = response.headers.get('X-Total-Count');
+  return {
+    issues: await response.json(),
+    nextCursor: response.headers.get('X-Next-Cursor'),
+    total: total === null ? null : Number(total)
+  };
 }
 
 // Get single issue
@@ -60,20 +75,97 @@ export async function transition(issueId: number, toState: string): Promise<Issu
   return response.json();
 }
 
-// Trigger AI fix
-export async function aiFix(issueId: number): Promise<any> {
+export interface AIFixJob {
+  id: number;
+  issue_id: number;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  stage: string | null;
+  attempts: number;
+  error: string | null;
+  result: any;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+  updated_at: string;
+}
+
+// Get AI fix job status
+export async function getAIFixJob(issueId: number, jobId: number): Promise<AIFixJob> {
+  const response = await fetch(`${API_BASE}/api/issues/${issueId}/ai-fix/jobs/${jobId}`);
+  if (!response.ok) throw new Error('Failed to fetch AI fix job');
+  return response.json();
+}
+
+// Queue an AI fix; returns the job (the one already running, if there is one)
+export async function queueAIFix(issueId: number): Promise<AIFixJob> {
   const response = await fetch(`${API_BASE}/api/issues/${issueId}/ai-fix`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' }
   });
   if (!response.ok) throw new Error('Failed to trigger AI fix');
-  return response.json();
+  return (await response.json()).job;
 }
 
-// Get events for issue
-export async function getEvents(issueId: number): Promise<Event[]> {
-  const response = await fetch(`${API_BASE}/api/issues/${issueId}/events`);
+// Poll a job until it finishes
+export async function waitForAIFix(issueId: number, job: AIFixJob, pollMs: number = 1500): Promise<AIFixJob> {
+  while (job.status === 'queued' || job.status === 'running') {
+    await new Promise(resolve => setTimeout(resolve, pollMs));
+    job = await getAIFixJob(issueId, job.id);
+  }
+  if (job.status === 'failed') throw new Error(job.error || 'AI fix failed');
+  return job;
+}
+
+// Trigger AI fix - queues a background job and polls until it finishes
+export async function aiFix(issueId: number, pollMs: number = 1500): Promise<AIFixJob> {
+  return waitForAIFix(issueId, await queueAIFix(issueId), pollMs);
+}
+
+export interface AIFixStreamHandlers {
+  onStage?: (stage: string) => void;
+  onToken?: (stage: string, text: string) => void;
+  onEvent?: (event: Event) => void;
+  onDone?: (status: string) => void;
+}
+
+// Follow one job's live progress (server-sent events); returns a function that stops listening
+export function streamAIFix(issueId: number, jobId: number, handlers: AIFixStreamHandlers): () => void {
+  const source = new EventSource(`${API_BASE}/api/issues/${issueId}/ai-fix/jobs/${jobId}/stream`);
+  source.addEventListener('stage', e => handlers.onStage?.(JSON.parse((e as MessageEvent).data).stage));
+  source.addEventListener('token', e => {
+    const data = JSON.parse((e as MessageEvent).data);
+    handlers.onToken?.(data.stage, data.text);
+  });
+  source.addEventListener('event', e => handlers.onEvent?.(JSON.parse((e as MessageEvent).data)));
+  source.addEventListener('done', e => {
+    source.close();
+    handlers.onDone?.(JSON.parse((e as MessageEvent).data).status);
+  });
+  return () => source.close();
+}
+
+// Get one page of an issue's timeline (oldest first); summary leaves out large payload fields
+export async function getEventsPage(
+  issueId: number,
+  params: { cursor?: string; limit?: number; summary?: boolean } = {}
+): Promise<{ events: Event[]; nextCursor: string | null }> {
+  const query = new URLSearchParams();
+  if (params.cursor) query.set('cursor', params.cursor);
+  if (params.limit) query.set('limit', String(params.limit));
+  if (params.summary) query.set('summary', 'true');
+
+  const response = await fetch(`${API_BASE}/api/issues/${issueId}/events?${query}`);
   if (!response.ok) throw new Error('Failed to fetch events');
+  return {
+    events: await response.json(),
+    nextCursor: response.headers.get('X-Next-Cursor')
+  };
+}
+
+// Get one event with its full payload
+export async function getEvent(issueId: number, eventId: number): Promise<Event> {
+  const response = await fetch(`${API_BASE}/api/issues/${issueId}/events/${eventId}`);
+  if (!response.ok) throw new Error('Failed to fetch event');
   return response.json();
 }
 
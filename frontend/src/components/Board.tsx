@@ -1,12 +1,17 @@
 // Kanban board component with columns for each issue state
 
 import { useState, useEffect } from 'react';
-import { getIssues, createIssue, type Issue } from '../api/issues';
+import { getIssuesPage, createIssue, type Issue } from '../api/issues';
 import IssueCard from './IssueCard';
 import EventTrail from './EventTrail';
 
+const PAGE_SIZE = 100;
+
 export default function Board() {
   const [issues, setIssues] = useState<Issue[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [total, setTotal] = useState<number | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [showCreateForm, setShowCreateForm] = useState(false);
   const [newIssueTitle, setNewIssueTitle] = useState('');
@@ -16,11 +21,14 @@ export default function Board() {
     loadIssues();
   }, []);
 
+  // First page only (with the total); older issues come from loadMore
   async function loadIssues() {
     try {
       setLoading(true);
-      const data = await getIssues();
-      setIssues(data);
+      const page = await getIssuesPage({ limit: PAGE_SIZE, count: true });
+      setIssues(page.issues);
+      setNextCursor(page.nextCursor);
+      setTotal(page.total);
     } catch (error) {
       console.error('Failed to load issues:', error);
     } finally {
@@ -28,6 +36,20 @@ export default function Board() {
     }
   }
 
+  async function loadMore() {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await getIssuesPage({ cursor: nextCursor, limit: PAGE_SIZE });
+      setIssues(prev => [...prev, ...page.issues]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to load more issues:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   async function handleCreateIssue(e: React.FormEvent) {
     e.preventDefault();
     if (!newIssueTitle.trim()) return;
@@ -142,6 +164,14 @@ export default function Board() {
           );
         })}
       </div>
+
+      {nextCursor && (
+        <div className="load-more">
+          <button className="btn-secondary" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : `Load more (${issues.length}${total !== null ? ` of ${total}` : ''} shown)`}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
\ No newline at end of file
@@ -1,5 +1,7 @@
 import { useState, useEffect } from 'react';
-import { getEvents, getIssue, type Event, type Issue } from '../api/issues';
+import { getEvent, getEventsPage, getIssue, type Event, type Issue } from '../api/issues';
+
+const PAGE_SIZE = 100;
 
 interface Props {
   issueId: number;
@@ -8,22 +10,27 @@ interface Props {
 
 export default function EventTrail({ issueId, onBack }: Props) {
   const [events, setEvents] = useState<Event[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [issue, setIssue] = useState<Issue | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [expanding, setExpanding] = useState<number | null>(null);
   const [copiedPatchId, setCopiedPatchId] = useState<number | null>(null);
 
   useEffect(() => {
     loadData();
   }, [issueId]);
 
+  // Summary pages leave out large payload fields; expandEvent fetches one event in full
   async function loadData() {
     try {
       setLoading(true);
-      const [eventsData, issueData] = await Promise.all([
-        getEvents(issueId),
+      const [page, issueData] = await Promise.all([
+        getEventsPage(issueId, { limit: PAGE_SIZE, summary: true }),
         getIssue(issueId)
       ]);
-      setEvents(eventsData);
+      setEvents(page.events);
+      setNextCursor(page.nextCursor);
       setIssue(issueData);
     } catch (error) {
       console.error('Failed to load events:', error);
@@ -32,6 +39,32 @@ export default function EventTrail({ issueId, onBack }: Props) {
     }
   }
 
+  async function loadMore() {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await getEventsPage(issueId, { cursor: nextCursor, limit: PAGE_SIZE, summary: true });
+      setEvents(prev => [...prev, ...page.events]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to load more events:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
+  async function expandEvent(eventId: number) {
+    try {
+      setExpanding(eventId);
+      const full = await getEvent(issueId, eventId);
+      setEvents(prev => prev.map(event => (event.id === eventId ? full : event)));
+    } catch (error) {
+      console.error('Failed to load event:', error);
+    } finally {
+      setExpanding(null);
+    }
+  }
+
   function formatTimestamp(ts: string) {
     const date = new Date(ts);
     return date.toLocaleString();
@@ -402,29 +435,14 @@ export default function EventTrail({ issueId, onBack }: Props) {
 
             {formatPatch(event.payload?.patch || '')}
 
-            <div className="patch-meta-info">
-              <div className="test-results">
-                <strong>Test Results:</strong>
-                <div className="test-badges">
-                  <span className="badge badge-success">
-                    {event.payload?.test_results?.passed?.length || 0} PASSED
-                  </span>
-                  <span className="badge badge-danger">
-                    {event.payload?.test_results?.failed?.length || 0} FAILED
-                  </span>
-                </div>
-                {event.payload?.test_results?.passed && event.payload.test_results.passed.length > 0 && (
-                  <div className="test-list">
-                    <small>Passed: {event.payload.test_results.passed.join(', ')}</small>
-                  </div>
-                )}
-                {event.payload?.test_results?.failed && event.payload.test_results.failed.length > 0 && (
-                  <div className="test-list">
-                    <small>Failed: {event.payload.test_results.failed.join(', ')}</small>
-                  </div>
-                )}
+            {event.payload?.candidates && (
+              <div className="patch-meta-info">
+                <small>
+                  Best of {event.payload.candidates.length} candidate(s)
+                  {event.payload.validated ? ' - applies cleanly' : ' - none applied cleanly'}
+                </small>
               </div>
-            </div>
+            )}
           </div>
         );
 
@@ -433,10 +451,33 @@ export default function EventTrail({ issueId, onBack }: Props) {
           <div className="event-details">
             <p><strong>Validation Status:</strong> {event.payload?.status}</p>
             <p><strong>Recommendation:</strong> {event.payload?.recommendation}</p>
-            <p>
-              <strong>Tests Passed:</strong>{' '}
-              {event.payload?.tests_passed?.join(', ') || 'None'}
-            </p>
+            <div className="test-results">
+              <strong>Test Results:</strong>
+              <div className="test-badges">
+                {event.payload?.status === 'skipped' || event.payload?.validated === false ? (
+                  <span className="badge badge-warning">NOT VALIDATED</span>
+                ) : (
+                  <>
+                    <span className="badge badge-success">
+                      {event.payload?.tests_passed?.length || 0} PASSED
+                    </span>
+                    <span className="badge badge-danger">
+                      {event.payload?.tests_failed?.length || 0} FAILED
+                    </span>
+                    {event.payload?.seconds !== undefined && <small> in {event.payload.seconds}s</small>}
+                  </>
+                )}
+              </div>
+              {event.payload?.tests_failed && event.payload.tests_failed.length > 0 && (
+                <div className="test-list">
+                  {event.payload.tests_failed.map((name: string) => (
+                    <div key={name}>
+                      <small><strong>{name}</strong>: {event.payload.failures?.[name]}</small>
+                    </div>
+                  ))}
+                </div>
+              )}
+            </div>
           </div>
         );
 
@@ -503,10 +544,27 @@ export default function EventTrail({ issueId, onBack }: Props) {
               </div>
               <p className="event-actor">by {event.actor}</p>
               {renderEventDetails(event)}
+              {event.omitted && event.omitted.length > 0 && (
+                <button
+                  className="btn-secondary"
+                  onClick={() => expandEvent(event.id)}
+                  disabled={expanding === event.id}
+                >
+                  {expanding === event.id ? 'Loading...' : `Show full ${event.omitted.join(', ')}`}
+                </button>
+              )}
             </div>
           </div>
         ))}
       </div>
+
+      {nextCursor && (
+        <div className="load-more">
+          <button className="btn-secondary" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more events'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -1,7 +1,7 @@
 // Issue card component with action buttons
 
 import { useState } from 'react';
-import { transition, aiFix, deleteIssue, type Issue } from '../api/issues';
+import { transition, queueAIFix, waitForAIFix, streamAIFix, deleteIssue, type Issue } from '../api/issues';
 
 interface Props {
   issue: Issue;
@@ -12,6 +12,9 @@ interface Props {
 export default function IssueCard({ issue, onUpdate, onShowEvents }: Props) {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [notice, setNotice] = useState<string | null>(null);
+  const [liveStage, setLiveStage] = useState<string | null>(null);
+  const [liveText, setLiveText] = useState('');
 
   async function handleActivate() {
     try {
@@ -25,16 +28,36 @@ export default function IssueCard({ issue, onUpdate, onShowEvents }: Props) {
   }
 
   async function handleAIFix() {
+    let stopStream = () => {};
     try {
       setLoading(true);
       setError(null);
-      await aiFix(issue.id);
+      setNotice(null);
+      setLiveText('');
+      // Subscribe to this job's stream only once it exists, so an earlier run is never replayed.
+      // Tokens stream in as they come; the job poll decides when we're done.
+      const job = await queueAIFix(issue.id);
+      stopStream = streamAIFix(issue.id, job.id, {
+        onStage: stage => {
+          setLiveStage(stage);
+          if (stage !== 'validation') setLiveText('');
+        },
+        onToken: (_, text) => setLiveText(current => current + text)
+      });
+      const finished = await waitForAIFix(issue.id, job);
+      // No tests ran against the patch, so the issue stays Active
+      if (finished.result?.validated === false) {
+        setNotice('Patch not validated - review it in Events before resolving');
+      }
       onUpdate();
     } catch (err) {
       setError('AI fix failed');
       console.error(err);
     } finally {
+      stopStream();
       setLoading(false);
+      setLiveStage(null);
+      setLiveText('');
     }
   }
 
@@ -136,7 +159,15 @@ export default function IssueCard({ issue, onUpdate, onShowEvents }: Props) {
         </button>
       </div>
 
+      {loading && liveStage && (
+        <div className="ai-live">
+          <small>{liveStage === 'analysis' ? 'Analyzing...' : liveStage === 'patch' ? 'Writing patch...' : 'Validating...'}</small>
+          {liveText && <pre className="ai-live-text">{liveText}</pre>}
+        </div>
+      )}
+
       {error && <div className="error-message">{error}</div>}
+      {notice && <div className="notice-message">{notice}</div>}
     </div>
   );
 }
\ No newline at end of file
@@ -1,25 +1,124 @@
+import asyncio
 import os
 import glob
-import requests
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 import mcp.server.stdio
+from workspace_index import WorkspaceIndex
+from file_access import FileAccessError, FileReader
+from context_packer import CHARS_PER_TOKEN, pack_context
+from llm_client import get_llm_client
 
 WORKSPACE = os.getenv('WORKSPACE_PATH', '/workspace')
-CEREBRAS_API_KEY = os.getenv('CEREBRAS_API_KEY')
-CEREBRAS_API_URL = os.getenv('CEREBRAS_API_URL', 'https://api.cerebras.ai/v1/chat/completions')
+
+# Patch context: tokens of code in the prompt, candidate files read for it, and search/read threads.
+# The packer picks the best chunks from about four prompts' worth of candidate code.
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '3000'))
+CONTEXT_MAX_FILES = int(os.getenv('CONTEXT_MAX_FILES', '5'))
+CONTEXT_BUDGET_CHARS = int(os.getenv('CONTEXT_BUDGET_CHARS', str(CONTEXT_TOKEN_BUDGET * CHARS_PER_TOKEN * 4)))
+CONTEXT_MAX_FILE_CHARS = int(os.getenv('CONTEXT_MAX_FILE_CHARS', str(CONTEXT_BUDGET_CHARS)))
+CONTEXT_WORKERS = int(os.getenv('CONTEXT_WORKERS', '8'))
+
+# File reads: larger files are memory-mapped, no read returns more, decoded-text LRU size
+FILE_MMAP_THRESHOLD = int(os.getenv('FILE_MMAP_THRESHOLD', '1000000'))
+FILE_MAX_READ_BYTES = int(os.getenv('FILE_MAX_READ_BYTES', '2000000'))
+FILE_CACHE_BYTES = int(os.getenv('FILE_CACHE_BYTES', '32000000'))
 
 server = Server("jerai-bug-fixer")
+workspace_index = WorkspaceIndex(WORKSPACE)
+context_pool = ThreadPoolExecutor(max_workers=CONTEXT_WORKERS, thread_name_prefix='context')
+file_reader = FileReader(WORKSPACE, mmap_threshold=FILE_MMAP_THRESHOLD, max_read_bytes=FILE_MAX_READ_BYTES,
+                         cache_bytes=FILE_CACHE_BYTES)
 
 
-def read_file_content(file_path: str) -> str:
-    """Read file from workspace"""
-    full_path = os.path.join(WORKSPACE, file_path)
+def read_file_content(file_path: str, start_line: int = None, end_line: int = None,
+                      start_byte: int = None, end_byte: int = None) -> str:
+    """Read a file, or a line or byte range of it, from workspace"""
     try:
-        with open(full_path, 'r') as f:
-            return f.read()
-    except Exception as e:
+        file_slice = file_reader.read_range(file_path, start_line, end_line, start_byte, end_byte)
+    except (FileAccessError, OSError) as e:
         return f"Error reading {file_path}: {str(e)}"
+    if file_slice.start_line is None and file_slice.start_byte == 0 and not file_slice.truncated:
+        return file_slice.text
+    return f"{file_slice.header()}\n{file_slice.text}"
+
+
+def read_file_capped(file_path: str, max_chars: int):
+    """Read at most max_chars characters without loading the rest of the file; None if unreadable"""
+    try:
+        return file_reader.read(file_path, max_chars).text
+    except (FileAccessError, OSError):
+        return None
+
+
+def gather_context(query: str, content_search_terms: list, max_files: int = CONTEXT_MAX_FILES,
+                   budget_chars: int = CONTEXT_BUDGET_CHARS) -> list:
+    """
+    Find and read the files for a patch prompt, as [(path, content)] in relevance order.
+
+    The BM25 ranking and every content search run concurrently, and each
+    file is read (capped) as soon as a search returns it. Files are taken
+    in the same order as before - ranked files, then content matches - and
+    the stage stops as soon as max_files are read or the budget is spent;
+    searches and reads still pending at that point are cancelled. A
+    search that fails is logged and skipped.
+    """
+    searches = [context_pool.submit(lambda: [path for path, score in rank_files(query, limit=5)])]
+    searches += [context_pool.submit(find_files_by_content, term) for term in content_search_terms]
+
+    reads = {}    # path -> read future
+    order = []    # paths in relevance order
+    files = []
+    used = 0
+    position = 0
+    try:
+        for search in searches:
+            try:
+                found = search.result()
+            except Exception as e:
+                print(f"[MCP] Context search failed, skipping it: {e}", flush=True)
+                continue
+            for path in found:
+                if path not in reads:
+                    order.append(path)
+                    reads[path] = context_pool.submit(read_file_capped, path, CONTEXT_MAX_FILE_CHARS)
+
+            # Take finished reads in relevance order until the file count or budget is reached
+            while position < len(order) and len(files) < max_files and used < budget_chars:
+                path = order[position]
+                position += 1
+                content = reads[path].result()
+                if content is None:
+                    continue
+                content = content[:budget_chars - used]
+                files.append((path, content))
+                used += len(content)
+
+            if len(files) >= max_files or used >= budget_chars:
+                break
+    finally:
+        for future in searches + list(reads.values()):
+            future.cancel()
+
+    return files
+
+
+def pack_files(files: list, query: str):
+    """Pack the chunks of files most relevant to query, with whole-file line totals from the index"""
+    return pack_context(files, query, CONTEXT_TOKEN_BUDGET,
+                        workspace_index.line_counts([path for path, _ in files]))
+
+
+def read_fallback_files() -> list:
+    """The first few CSS/TSX files in the workspace, as [(path, content)]"""
+    fallback_files = (search_files('App.css') + search_files('*.tsx'))[:3]
+    return [(f, content) for f, content in
+            zip(fallback_files, context_pool.map(
+                lambda f: read_file_capped(f, CONTEXT_MAX_FILE_CHARS), fallback_files))
+            if content is not None]
 
 
 def search_files(pattern: str) -> list:
@@ -29,60 +128,19 @@ def search_files(pattern: str) -> list:
     # Return relative paths from workspace root
     return [os.path.relpath(m, WORKSPACE) for m in matches if os.path.isfile(m)]
 
-def search_by_keywords(keywords: list) -> list:
-    """Search for files containing any of the keywords in their path or name"""
-    matches = []
-    scored_matches = []
-
-    for root, dirs, files in os.walk(WORKSPACE):
-        # Skip node_modules, venv, __pycache__
-        dirs[:] = [d for d in dirs if d not in ['node_modules', 'venv', '__pycache__', '.git', '.vite', 'dist']]
-
-        for file in files:
-            # Skip non-code files
-            if not file.endswith(('.py', '.js', '.jsx', '.ts', '.tsx', '.css', '.html')):
-                continue
-
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, WORKSPACE)
-
-            # Score based on keyword matches
-            score = 0
-            for keyword in keywords:
-                if keyword.lower() in rel_path.lower():
-                    score += 2
-                if keyword.lower() in file.lower():
-                    score += 3
+def rank_files(query: str, limit: int = 5) -> list:
+    """Rank workspace files against a free-text query with BM25, as (path, score)"""
+    return workspace_index.rank(query, limit=limit)
 
-            if score > 0:
-                scored_matches.append((score, rel_path))
 
-    # Sort by score descending and return paths
-    scored_matches.sort(reverse=True, key=lambda x: x[0])
-    return [path for score, path in scored_matches[:5]]
+def search_by_keywords(keywords: list) -> list:
+    """Search for files best matching the keywords in their path, name or content"""
+    return [path for path, score in rank_files(' '.join(keywords), limit=5)]
 
 
 def find_files_by_content(search_term: str) -> list:
     """Search for files containing specific text in their content"""
-    matches = []
-    for root, dirs, files in os.walk(WORKSPACE):
-        dirs[:] = [d for d in dirs if d not in ['node_modules', 'venv', '__pycache__', '.git', '.vite', 'dist']]
-
-        for file in files:
-            if not file.endswith(('.py', '.js', '.jsx', '.ts', '.tsx', '.css', '.html')):
-                continue
-
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    if search_term.lower() in content.lower():
-                        rel_path = os.path.relpath(file_path, WORKSPACE)
-                        matches.append(rel_path)
-            except:
-                continue
-
-    return matches[:5]
+    return workspace_index.find_by_content(search_term, limit=5)
 
 
 @server.list_tools()
@@ -91,13 +149,33 @@ async def list_tools() -> list[Tool]:
     return [
         Tool(
             name="read_code",
-            description="Read source code file from workspace",
+            description="Read source code file from workspace, whole or a line/byte range of it",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "file_path": {
                         "type": "string",
                         "description": "Relative path to file in workspace"
+                    },
+                    "start_line": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "First line to read (1-based)"
+                    },
+                    "end_line": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Last line to read (inclusive); omit to read to the end"
+                    },
+                    "start_byte": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "Byte offset to start at (instead of a line range)"
+                    },
+                    "end_byte": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "Byte offset to stop before; omit to read to the end"
                     }
                 },
                 "required": ["file_path"]
@@ -148,7 +226,9 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
     if name == "read_code":
         file_path = arguments["file_path"]
-        content = read_file_content(file_path)
+        content = await asyncio.to_thread(read_file_content, file_path, arguments.get("start_line"),
+                                          arguments.get("end_line"), arguments.get("start_byte"),
+                                          arguments.get("end_byte"))
         return [TextContent(type="text", text=content)]
 
     elif name == "analyze_bug":
@@ -162,21 +242,10 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         if 'product' in title.lower():
             keywords.extend(['product', 'ecommerce'])
 
-        relevant_files = search_by_keywords(keywords) if keywords else []
+        relevant_files = await asyncio.to_thread(search_by_keywords, keywords) if keywords else []
         files_context = "\n".join([f"  - {f}" for f in relevant_files[:5]]) if relevant_files else "  - No specific files detected"
 
-        try:
-            response = requests.post(
-                CEREBRAS_API_URL,
-                headers={
-                    'Authorization': f'Bearer {CEREBRAS_API_KEY}',
-                    'Content-Type': 'application/json'
-                },
-                json={
-                    'model': 'llama-3.3-70b',
-                    'messages': [{
-                        'role': 'user',
-                        'content': f"""Analyze this bug and provide a clear, structured analysis.
+        prompt = f"""Analyze this bug and provide a clear, structured analysis.
 
 Bug Title: {title}
 Description: {description or "Application bug"}
@@ -202,18 +271,11 @@ FIX APPROACH:
 [2-3 sentences explaining what changes are needed, mentioning specific CSS properties or code elements]
 
 Use the file paths shown above in your response."""
-                    }],
-                    'max_tokens': 500,
-                    'temperature': 0.5
-                },
-                timeout=10
-            )
 
-            if response.status_code == 200:
-                analysis = response.json()['choices'][0]['message']['content']
-                return [TextContent(type="text", text=analysis)]
-            else:
-                raise Exception(f'Cerebras API error: {response.status_code}')
+        try:
+            analysis = await asyncio.to_thread(get_llm_client().chat, prompt, temperature=0.0,
+                                               max_tokens=500, timeout=10)
+            return [TextContent(type="text", text=analysis)]
 
         except Exception as e:
             print(f"[MCP] Analysis failed: {str(e)}", flush=True)
@@ -257,34 +319,24 @@ Add CSS transition property and hover pseudo-class to enable smooth scaling/zoom
         if any(word in title_lower for word in ['database', 'model', 'schema', 'table']):
             keywords.extend(['models', 'schema'])
 
-        # Search for relevant files by keywords
-        relevant_files = search_by_keywords(keywords) if keywords else []
-        print(f"[MCP] Found by keywords: {relevant_files}", flush=True)
-
-        # Also search by content if we have search terms
-        for term in content_search_terms:
-            content_matches = find_files_by_content(term)
-            for match in content_matches:
-                if match not in relevant_files:
-                    relevant_files.append(match)
-
-        print(f"[MCP] Total relevant files: {relevant_files}", flush=True)
+        # Rank files against the bug itself plus the keyword hints, search and read concurrently
+        query = ' '.join([title, analysis] + keywords + content_search_terms)
+        try:
+            context_files = await asyncio.to_thread(gather_context, query, content_search_terms)
+        except Exception as e:
+            print(f"[MCP] Context gathering failed: {e}", flush=True)
+            context_files = []
 
         # Fallback: if no keywords matched, try generic search
-        if not relevant_files:
-            relevant_files = search_files('App.css') + search_files('*.tsx')
-            relevant_files = relevant_files[:3]
-
-        code_context = ""
-        files_read = []
-        if relevant_files:
-            for f in relevant_files[:3]:  # Limit to 3 most relevant files
-                code_content = read_file_content(f)
-                if "Error reading" not in code_content:
-                    files_read.append(f)
-                    # Read full content for CSS files, limit others
-                    max_chars = 10000 if f.endswith('.css') else 5000
-                    code_context += f"\n=== File: {f} ===\n{code_content[:max_chars]}\n"
+        if not context_files:
+            context_files = await asyncio.to_thread(read_fallback_files)
+
+        # Keep only the chunks most relevant to the bug, within the token budget
+        packed = await asyncio.to_thread(pack_files, context_files,
+                                         ' '.join([title, analysis] + content_search_terms))
+        files_read = packed.files
+        code_context = packed.text
+        print(f"[MCP] Packed {len(packed.sections)} sections, ~{packed.tokens} tokens", flush=True)
 
         if not files_read:
             code_context = "No relevant files found in workspace."
@@ -306,6 +358,7 @@ Analysis: {analysis}
 CRITICAL: You MUST use one of the file paths listed above. DO NOT invent new file paths.
 
 === CODE CONTENT ===
+Excerpts of each file; the header gives the line range shown. Use those line numbers in @@ hunk headers.
 {code_context}
 
 === YOUR TASK ===
@@ -348,57 +401,37 @@ VALIDATION CHECKLIST BEFORE RESPONDING:
 Generate ONLY the diff patch. No explanations:"""
 
         try:
-            response = requests.post(
-                CEREBRAS_API_URL,
-                headers={
-                    'Authorization': f'Bearer {CEREBRAS_API_KEY}',
-                    'Content-Type': 'application/json'
-                },
-                json={
-                    'model': 'llama-3.3-70b',
-                    'messages': [{
-                        'role': 'user',
-                        'content': prompt
-                    }],
-                    'max_tokens': 1000,
-                    'temperature': 0.3
-                },
-                timeout=30
-            )
-
-            if response.status_code == 200:
-                patch = response.json()['choices'][0]['message']['content']
-
-                # Validate that the patch uses real file paths
-                uses_real_paths = False
-                for file in files_read:
-                    if file in patch:
-                        uses_real_paths = True
-                        break
-
-                if uses_real_paths:
-                    print(f"[MCP] ✓ Patch uses real file paths", flush=True)
-                    return [TextContent(type="text", text=patch)]
-                else:
-                    print(f"[MCP] ✗ Patch contains hallucinated paths, using fallback", flush=True)
-                    fallback_patch = generate_fallback_patch(title, files_read, code_context)
-                    return [TextContent(type="text", text=fallback_patch)]
+            patch = await asyncio.to_thread(get_llm_client().chat, prompt, temperature=0.0, max_tokens=1000,
+                                            timeout=30, file_digests=workspace_index.file_digests(files_read))
+
+            # Validate that the patch uses real file paths
+            uses_real_paths = False
+            for file in files_read:
+                if file in patch:
+                    uses_real_paths = True
+                    break
+
+            if uses_real_paths:
+                print(f"[MCP] ✓ Patch uses real file paths", flush=True)
+                return [TextContent(type="text", text=patch)]
             else:
-                raise Exception(f'Cerebras API error: {response.status_code}')
+                print(f"[MCP] ✗ Patch contains hallucinated paths, using fallback", flush=True)
+                fallback_patch = await asyncio.to_thread(generate_fallback_patch, title, files_read)
+                return [TextContent(type="text", text=fallback_patch)]
 
         except Exception as e:
             print(f"[MCP] Cerebras API failed: {str(e)}", flush=True)
             print(f"[MCP] Generating fallback patch from code analysis...", flush=True)
 
             # Generate a smart fallback patch based on the bug type and available files
-            fallback_patch = generate_fallback_patch(title, files_read, code_context)
+            fallback_patch = await asyncio.to_thread(generate_fallback_patch, title, files_read)
             return [TextContent(type="text", text=fallback_patch)]
 
     else:
         raise ValueError(f"Unknown tool: {name}")
 
 
-def generate_fallback_patch(title: str, files: list, code_context: str) -> str:
+def generate_fallback_patch(title: str, files: list) -> str:
     """Generate a smart fallback patch based on actual code analysis"""
     title_lower = title.lower()
 
@@ -406,31 +439,26 @@ def generate_fallback_patch(title: str, files: list, code_context: str) -> str:
     if any(word in title_lower for word in ['hover', 'zoom', 'image', 'scale', 'transition']):
         for file in files:
             if 'App.css' in file and 'ecommerce' in file:
-                # Try to find the actual line number from code context
-                if '.product-image img' in code_context:
-                    # Extract the actual CSS block
-                    import re
-                    match = re.search(r'(\.product-image img\s*\{[^}]+\})', code_context, re.DOTALL)
-                    if match:
-                        css_block = match.group(1)
-                        # Count lines to estimate position
-                        lines_before = code_context[:match.start()].count('\n')
-
-                        patch = f"""--- a/{file}
-+++ b/{file}
-@@ -{lines_before+1},6 +{lines_before+1},11 @@
- .product-image img {{
-   width: 100%;
-   height: 100%;
-   object-fit: cover;
-+  transition: transform 0.3s ease-in-out;
- }}
-
-+.product-image:hover img {{
-+  transform: scale(1.1);
-+}}
-+"""
-                        return patch
+                # Find the rule in the file itself: the packed context has headers and dropped chunks
+                content = read_file_capped(file, FILE_MAX_READ_BYTES) or ''
+                match = re.search(r'\.product-image img\s*\{[^}]+\}', content)
+                if match:
+                    # Whole lines of the rule, plus the line after it as trailing context if there is one
+                    block_start = content.rfind('\n', 0, match.start()) + 1
+                    block_end = content.find('\n', match.end())
+                    block_end = len(content) if block_end < 0 else block_end
+                    block = content[block_start:block_end].split('\n')
+                    after = content[block_end + 1:].split('\n')[:1] if block_end + 1 < len(content) else []
+                    line = content.count('\n', 0, block_start) + 1
+
+                    hunk = [f' {text}' for text in block[:-1]]
+                    hunk += ['+  transition: transform 0.3s ease-in-out;', f' {block[-1]}',
+                             '+', '+.product-image:hover img {', '+  transform: scale(1.1);', '+}']
+                    hunk += [f' {text}' for text in after]
+                    old_count = len(block) + len(after)
+                    return (f"--- a/{file}\n+++ b/{file}\n"
+                            f"@@ -{line},{old_count} +{line},{old_count + 5} @@\n"
+                            + '\n'.join(hunk) + '\n')
 
                 # Fallback if we can't parse the code
                 patch = f"""--- a/{file}
@@ -474,6 +502,8 @@ Note: This is a fallback response. The AI was unable to generate a proper diff p
 
 async def main():
     """Run MCP server using stdio transport"""
+    # Index in the background so initialize is answered at once; searches wait for the build
+    threading.Thread(target=workspace_index.build, name='workspace-index', daemon=True).start()
     async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
         await server.run(
             read_stream,
@@ -483,5 +513,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
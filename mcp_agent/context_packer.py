@@ -0,0 +1,196 @@
+"""
+Token-budget-aware context packing for patch prompts.
+
+Instead of the first N characters of the first few files, the prompt gets
+the most relevant pieces of code: files are split into chunks at function,
+class and CSS-rule boundaries, chunks are ranked with BM25 against the bug
+title and analysis, and the best ones are packed into a token budget.
+
+Each section in the packed text is headed with its file path and line
+range, so the model can write hunk headers with the real line numbers:
+
+    === File: ecommerce-app/src/App.css (lines 35-48 of 120) ===
+
+The file contents may be cut short, so the total ("of 120") is only shown
+when the caller passes the file's real line count.
+"""
+import math
+import re
+
+from workspace_index import B, K1, STOPWORDS, code_terms, count_terms
+
+CHARS_PER_TOKEN = 4          # rough estimate for code with Llama tokenizers
+MAX_CHUNK_LINES = 80         # longer definitions are split into windows
+MIN_CHUNK_LINES = 3          # shorter chunks are merged into the next one
+
+PY_BOUNDARY_RE = re.compile(r'^\s*(@|def |async def |class )')
+JS_BOUNDARY_RE = re.compile(
+    r'^ {0,2}(export\s+)?(default\s+)?(async\s+)?(function|class|const|let|var|interface|type|enum)\b')
+JS_EXTENSIONS = ('.js', '.jsx', '.ts', '.tsx')
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class Chunk:
+    """A contiguous line range of one file"""
+    __slots__ = ('path', 'start', 'end', 'text', 'terms', 'length', 'score')
+
+    def __init__(self, path: str, start: int, end: int, text: str):
+        self.path = path
+        self.start = start      # 1-based, inclusive
+        self.end = end
+        self.text = text
+        self.terms, self.length = count_terms(text)
+        self.score = 0.0
+
+
+class PackedContext:
+    """Packed prompt text plus what went into it"""
+
+    def __init__(self, text: str, files: list, sections: list, tokens: int):
+        self.text = text
+        self.files = files          # paths with at least one section, in relevance order
+        self.sections = sections    # (path, start_line, end_line)
+        self.tokens = tokens
+
+
+def python_boundaries(lines: list) -> list:
+    """Start lines of defs and classes, with their decorators"""
+    starts = []
+    for i, line in enumerate(lines):
+        # A decorator stack belongs to the def below it: only its first line starts a chunk
+        if PY_BOUNDARY_RE.match(line) and not (i > 0 and lines[i - 1].lstrip().startswith('@')):
+            starts.append(i)
+    return starts
+
+
+def js_boundaries(lines: list) -> list:
+    """Start lines of top-level (or one level in) declarations"""
+    return [i for i, line in enumerate(lines) if JS_BOUNDARY_RE.match(line)]
+
+
+def css_boundaries(lines: list) -> list:
+    """Start lines of top-level rules (and the comments just above them)"""
+    starts = []
+    depth = 0
+    rule_start = None
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if depth == 0 and rule_start is None and stripped:
+            rule_start = i
+        depth += line.count('{') - line.count('}')
+        if depth <= 0:
+            depth = 0
+            if rule_start is not None and '}' in line:
+                starts.append(rule_start)
+                rule_start = None
+    if rule_start is not None:
+        starts.append(rule_start)
+    return starts
+
+
+def blank_line_boundaries(lines: list) -> list:
+    return [i for i, line in enumerate(lines) if line.strip() and (i == 0 or not lines[i - 1].strip())]
+
+
+def split_chunks(path: str, content: str) -> list:
+    """Split a file into chunks at definition / rule boundaries"""
+    lines = content.splitlines(keepends=True)
+    if not lines:
+        return []
+
+    if path.endswith('.py'):
+        starts = python_boundaries(lines)
+    elif path.endswith(JS_EXTENSIONS):
+        starts = js_boundaries(lines)
+    elif path.endswith('.css'):
+        starts = css_boundaries(lines)
+    else:
+        starts = blank_line_boundaries(lines)
+
+    # Whatever precedes the first boundary (imports, module docstring) is a chunk too
+    starts = sorted(set([0] + starts))
+    ranges = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(lines)
+        if ranges and ranges[-1][1] - ranges[-1][0] < MIN_CHUNK_LINES:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+
+    chunks = []
+    for start, end in ranges:
+        for window in range(start, end, MAX_CHUNK_LINES):
+            window_end = min(window + MAX_CHUNK_LINES, end)
+            text = ''.join(lines[window:window_end])
+            if text.strip():
+                chunks.append(Chunk(path, window + 1, window_end, text))
+    return chunks
+
+
+def rank_chunks(chunks: list, query: str):
+    """Set each chunk's BM25 score against the query"""
+    query_terms = [t for t in dict.fromkeys(code_terms(query)) if t not in STOPWORDS]
+    if not chunks or not query_terms:
+        return
+
+    avg_length = (sum(c.length for c in chunks) / len(chunks)) or 1.0
+    for term in query_terms:
+        containing = [c for c in chunks if term in c.terms]
+        if not containing:
+            continue
+        idf = math.log(1 + (len(chunks) - len(containing) + 0.5) / (len(containing) + 0.5))
+        for chunk in containing:
+            tf = chunk.terms[term]
+            norm = K1 * (1 - B + B * chunk.length / avg_length)
+            chunk.score += idf * tf * (K1 + 1) / (tf + norm)
+
+
+def section_total(line_counts: dict, path: str) -> str:
+    return f" of {line_counts[path]}" if path in line_counts else ''
+
+
+def pack_context(files: list, query: str, token_budget: int, line_counts: dict = None) -> PackedContext:
+    """
+    Pack the best chunks of files ([(path, content)], most relevant file
+    first) for query into token_budget tokens. line_counts ({path: lines})
+    gives the whole-file totals for the section headers.
+    """
+    file_order = {path: i for i, (path, content) in enumerate(files)}
+    line_counts = line_counts or {}
+    chunks = [chunk for path, content in files for chunk in split_chunks(path, content)]
+    rank_chunks(chunks, query)
+
+    # Best first; ties (and the no-match case) fall back to file relevance, then position
+    ranked = sorted(chunks, key=lambda c: (-c.score, file_order[c.path], c.start))
+    if any(c.score > 0 for c in ranked):
+        ranked = [c for c in ranked if c.score > 0]
+
+    selected = []
+    used = 0
+    for chunk in ranked:
+        cost = estimate_tokens(chunk.text) + 20   # + section header
+        if used + cost > token_budget:
+            continue
+        selected.append(chunk)
+        used += cost
+
+    # Emit per file in relevance order, chunks in line order, adjacent chunks merged
+    selected.sort(key=lambda c: (file_order[c.path], c.start))
+    sections = []
+    for chunk in selected:
+        if sections and sections[-1][0] == chunk.path and sections[-1][2] + 1 == chunk.start:
+            path, start, end, text = sections[-1]
+            sections[-1] = (path, start, chunk.end, text + chunk.text)
+        else:
+            sections.append((chunk.path, chunk.start, chunk.end, chunk.text))
+
+    text = ''.join(
+        f"\n=== File: {path} (lines {start}-{end}{section_total(line_counts, path)}) ===\n{body}"
+        + ('' if body.endswith('\n') else '\n')
+        for path, start, end, body in sections
+    )
+    used_files = list(dict.fromkeys(path for path, _, _, _ in sections))
+    return PackedContext(text, used_files, [(p, s, e) for p, s, e, _ in sections], estimate_tokens(text))
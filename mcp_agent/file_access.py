@@ -0,0 +1,258 @@
+"""
+Bounded reads of workspace files for the MCP agent.
+
+Callers only ever want a few thousand characters of a file, but vendored
+bundles and generated files in the workspace can be tens of MB. Nothing
+here reads a whole large file into memory:
+
+- small text files are decoded once and kept in an LRU keyed by
+  (path, mtime, size), so repeated reads of the same version are free;
+- large files are memory-mapped and only the requested byte or line
+  range is copied out and decoded;
+- binary files (a NUL byte near the start) are refused, and any single
+  read returns at most max_read_bytes, flagged as truncated.
+
+Byte ranges are aligned to UTF-8 character boundaries and line numbers
+are 1-based and inclusive, as in the context packer's section headers.
+"""
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+
+SNIFF_BYTES = 8192
+SEEK_BLOCK_BYTES = 1 << 20
+LINE_RE = re.compile(r'[^\n]*\n|[^\n]+$')
+
+
+class FileAccessError(Exception):
+    """Raised when a file cannot be read: missing, outside the workspace, binary"""
+
+
+class FileSlice:
+    """Decoded text of part of a file and where it came from"""
+    __slots__ = ('path', 'text', 'start_byte', 'end_byte', 'start_line', 'end_line', 'size', 'truncated')
+
+    def __init__(self, path: str, text: str, start_byte: int, end_byte: int, size: int,
+                 start_line: int = None, end_line: int = None, truncated: bool = False):
+        self.path = path
+        self.text = text
+        self.start_byte = start_byte    # byte offsets of the slice, end exclusive
+        self.end_byte = end_byte
+        self.start_line = start_line    # 1-based, inclusive; None for byte-range reads
+        self.end_line = end_line
+        self.size = size
+        self.truncated = truncated      # stopped at max_read_bytes or max_chars
+
+    def header(self) -> str:
+        if self.start_line is not None:
+            where = f"lines {self.start_line}-{self.end_line}"
+        else:
+            where = f"bytes {self.start_byte}-{self.end_byte}"
+        more = ', truncated' if self.truncated else ''
+        return f"=== File: {self.path} ({where} of {self.size} bytes{more}) ==="
+
+
+def is_binary(sample: bytes) -> bool:
+    return b'\0' in sample
+
+
+def align_start(data, start: int, end: int) -> int:
+    """Move start past UTF-8 continuation bytes so decoding begins on a character"""
+    while start < end and (data[start] & 0xC0) == 0x80:
+        start += 1
+    return start
+
+
+class FileReader:
+    """Range reads over one workspace root with a decoded-content LRU"""
+
+    def __init__(self, root: str, mmap_threshold: int = 1_000_000, max_read_bytes: int = 2_000_000,
+                 cache_bytes: int = 32_000_000):
+        self.root = root
+        self.mmap_threshold = mmap_threshold    # larger files are mapped, never read whole
+        self.max_read_bytes = max_read_bytes    # most bytes any single read returns
+        self.cache_bytes = cache_bytes
+
+        self._cache = OrderedDict()             # (path, mtime_ns, size) -> text, LRU
+        self._cached_bytes = 0                  # characters held
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, path: str) -> str:
+        """Absolute path of a workspace-relative path; rejects anything that escapes the root"""
+        root = os.path.realpath(self.root)
+        full = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, full]) != root:
+            raise FileAccessError(f"Path escapes the workspace: {path}")
+        return full
+
+    def stat(self, path: str):
+        full = self.resolve(path)
+        try:
+            stat = os.stat(full)
+        except OSError as e:
+            raise FileAccessError(f"Cannot read {path}: {e.strerror or e}")
+        if not os.path.isfile(full):
+            raise FileAccessError(f"Not a file: {path}")
+        return full, stat
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def read(self, path: str, max_chars: int = None) -> FileSlice:
+        """The start of a file: all of it if small, else at most max_read_bytes"""
+        full, stat = self.stat(path)
+        if stat.st_size <= self.mmap_threshold:
+            text = self._cached_text(path, full, stat)
+            truncated = max_chars is not None and len(text) > max_chars
+            text = text[:max_chars] if truncated else text
+            return FileSlice(path, text, 0, len(text.encode('utf-8')) if truncated else stat.st_size,
+                             stat.st_size, truncated=truncated)
+
+        # Up to 4 bytes per character is enough for max_chars of UTF-8
+        limit = self.max_read_bytes if max_chars is None else min(self.max_read_bytes, max_chars * 4)
+        slice_ = self.read_bytes(path, 0, limit)
+        slice_.truncated = slice_.end_byte < stat.st_size
+        if max_chars is not None and len(slice_.text) > max_chars:
+            slice_.text = slice_.text[:max_chars]
+            slice_.end_byte = len(slice_.text.encode('utf-8'))
+            slice_.truncated = True
+        return slice_
+
+    def read_bytes(self, path: str, start: int = 0, end: int = None) -> FileSlice:
+        """Bytes [start, end) decoded as UTF-8, capped at max_read_bytes"""
+        full, stat = self.stat(path)
+        size = stat.st_size
+        start = max(0, min(start, size))
+        end = size if end is None else max(start, min(end, size))
+        truncated = end - start > self.max_read_bytes
+        if truncated:
+            end = start + self.max_read_bytes
+
+        with self._open(full, size) as data:
+            self._check_text(path, data, size)
+            start = align_start(data, start, end)
+            text = bytes(data[start:end]).decode('utf-8', errors='ignore')
+        return FileSlice(path, text, start, end, size, truncated=truncated)
+
+    def read_lines(self, path: str, start_line: int = 1, end_line: int = None) -> FileSlice:
+        """Lines start_line..end_line (1-based, inclusive), capped at max_read_bytes"""
+        full, stat = self.stat(path)
+        start_line = max(1, start_line)
+        if end_line is not None and end_line < start_line:
+            raise FileAccessError(f"Empty line range {start_line}-{end_line}")
+
+        if stat.st_size <= self.mmap_threshold:
+            # Split on \n only, exactly as the mapped path counts lines
+            lines = LINE_RE.findall(self._cached_text(path, full, stat))
+            end_line = len(lines) if end_line is None else min(end_line, len(lines))
+            text = ''.join(lines[start_line - 1:end_line])
+            start_byte = len(''.join(lines[:start_line - 1]).encode('utf-8'))
+            return FileSlice(path, text, start_byte, start_byte + len(text.encode('utf-8')), stat.st_size,
+                             start_line=start_line, end_line=max(end_line, start_line - 1))
+
+        with self._open(full, stat.st_size) as data:
+            self._check_text(path, data, stat.st_size)
+            start_byte, line = self._seek_line(data, 0, 1, start_line)
+            end_byte, last = start_byte, line - 1
+            limit = start_byte + self.max_read_bytes
+            while end_byte < stat.st_size and (end_line is None or last < end_line) and end_byte < limit:
+                newline = data.find(b'\n', end_byte)
+                end_byte = stat.st_size if newline < 0 else newline + 1
+                last += 1
+            # Cut inside a line, or stopped at the limit with requested lines still to come
+            truncated = end_byte > limit or (end_byte == limit and end_byte < stat.st_size
+                                             and (end_line is None or last < end_line))
+            end_byte = min(end_byte, limit)
+            text = bytes(data[start_byte:end_byte]).decode('utf-8', errors='ignore')
+        return FileSlice(path, text, start_byte, end_byte, stat.st_size,
+                         start_line=start_line, end_line=last, truncated=truncated)
+
+    def read_range(self, path: str, start_line: int = None, end_line: int = None,
+                   start_byte: int = None, end_byte: int = None, max_chars: int = None) -> FileSlice:
+        """Dispatch to read_lines, read_bytes or read depending on which bounds are given"""
+        if start_line is not None or end_line is not None:
+            if start_byte is not None or end_byte is not None:
+                raise FileAccessError("Give a line range or a byte range, not both")
+            slice_ = self.read_lines(path, start_line or 1, end_line)
+        elif start_byte is not None or end_byte is not None:
+            slice_ = self.read_bytes(path, start_byte or 0, end_byte)
+        else:
+            return self.read(path, max_chars)
+        if max_chars is not None and len(slice_.text) > max_chars:
+            slice_.text = slice_.text[:max_chars]
+            slice_.truncated = True
+        return slice_
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._cache), 'bytes': self._cached_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _seek_line(data, offset: int, line: int, target: int) -> tuple:
+        """Byte offset where line number target starts (or end of data), counting from offset/line"""
+        size = len(data)
+        # Skip whole blocks by counting their newlines, then find the line inside the last one
+        while line < target and offset < size:
+            block = data[offset:offset + SEEK_BLOCK_BYTES]
+            newlines = block.count(b'\n')
+            if line + newlines < target:
+                line += newlines
+                offset += len(block)
+                continue
+            position = -1
+            while line < target:
+                position = block.find(b'\n', position + 1)
+                line += 1
+            return offset + position + 1, line
+        return min(offset, size), line
+
+    def _open(self, full: str, size: int):
+        """The file's bytes: memory-mapped when large, read when small"""
+        if size > self.mmap_threshold:
+            with open(full, 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(full, 'rb') as f:
+            return nullcontext(f.read())
+
+    @staticmethod
+    def _check_text(path: str, data, size: int):
+        if is_binary(bytes(data[:min(size, SNIFF_BYTES)])):
+            raise FileAccessError(f"Binary file: {path}")
+
+    def _cached_text(self, path: str, full: str, stat) -> str:
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return text
+            self.misses += 1
+
+        with open(full, 'rb') as f:
+            data = f.read()
+        self._check_text(path, data, len(data))
+        text = data.decode('utf-8', errors='ignore')
+
+        with self._lock:
+            # Older versions of the same file can never be hit again
+            for stale in [k for k in self._cache if k[0] == path]:
+                self._cached_bytes -= len(self._cache.pop(stale))
+            self._cache[key] = text
+            self._cached_bytes += len(text)
+            while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
+        return text
+
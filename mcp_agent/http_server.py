@@ -2,58 +2,102 @@
 """
 HTTP wrapper for MCP agent - provides REST API endpoints
 """
+import contextlib
 import os
 import glob
-import requests
+import threading
 from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import JSONResponse
 from starlette.requests import Request
+from starlette.routing import Route
 import uvicorn
-
-app = Starlette()
+from llm_client import get_async_llm_client, get_llm_cache
+from context_packer import pack_context
+from file_access import FileAccessError, FileReader
+from workspace_index import WorkspaceIndex
 
 WORKSPACE = os.getenv('WORKSPACE_PATH', '/workspace')
 CEREBRAS_API_KEY = os.getenv('CEREBRAS_API_KEY')
-CEREBRAS_API_URL = os.getenv('CEREBRAS_API_URL', 'https://api.cerebras.ai/v1/chat/completions')
-
-def read_file_content(file_path: str) -> str:
-    """Read file from workspace"""
-    full_path = os.path.join(WORKSPACE, file_path)
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '3000'))
+# Most characters of one file that go into a prompt before packing
+CONTEXT_MAX_FILE_CHARS = int(os.getenv('CONTEXT_MAX_FILE_CHARS', '200000'))
+
+# Built in the background at startup, then refreshed incrementally instead of walking the tree per request
+workspace_index = WorkspaceIndex(WORKSPACE)
+file_reader = FileReader(
+    WORKSPACE,
+    mmap_threshold=int(os.getenv('FILE_MMAP_THRESHOLD', '1000000')),
+    max_read_bytes=int(os.getenv('FILE_MAX_READ_BYTES', '2000000')),
+    cache_bytes=int(os.getenv('FILE_CACHE_BYTES', '32000000'))
+)
+
+def read_file_content(file_path: str, max_chars: int = None) -> str:
+    """Read file from workspace (at most max_chars characters)"""
     try:
-        with open(full_path, 'r') as f:
-            return f.read()
-    except Exception as e:
+        return file_reader.read(file_path, max_chars).text
+    except (FileAccessError, OSError) as e:
         return f"Error reading {file_path}: {str(e)}"
 
 def search_by_keywords(keywords: list) -> list:
-    """Search for files containing any of the keywords in their path or name"""
-    matches = []
-    for root, dirs, files in os.walk(WORKSPACE):
-        # Skip node_modules, venv, __pycache__
-        dirs[:] = [d for d in dirs if d not in ['node_modules', 'venv', '__pycache__', '.git']]
+    """Files best matching the keywords in their path, name or content, from the workspace index"""
+    return [path for path, score in workspace_index.rank(' '.join(keywords), limit=10)]
 
-        for file in files:
-            # Skip non-code files
-            if not file.endswith(('.py', '.js', '.jsx', '.ts', '.tsx', '.css', '.html')):
-                continue
+def build_code_context(keywords: list, query: str) -> tuple:
+    """
+    Search, read and pack the chunks most relevant to query (blocking - run in the thread pool).
+    Returns the packed text and the digests of the files in it, for the LLM cache key.
+    """
+    relevant_files = search_by_keywords(keywords) if keywords else []
 
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, WORKSPACE)
+    files = []
+    for f in relevant_files[:5]:
+        code_content = read_file_content(f, CONTEXT_MAX_FILE_CHARS)
+        if not code_content.startswith(f"Error reading {f}"):
+            files.append((f, code_content))
 
-            # Check if any keyword matches the file path or name
-            for keyword in keywords:
-                if keyword.lower() in rel_path.lower() or keyword.lower() in file.lower():
-                    matches.append(rel_path)
-                    break
+    packed = pack_context(files, query, CONTEXT_TOKEN_BUDGET, workspace_index.line_counts([f for f, _ in files]))
+    return packed.text or "No relevant files found in workspace.", workspace_index.file_digests(packed.files)
 
-    return matches[:10]  # Limit to 10 most relevant files
-
-@app.route('/health', methods=['GET'])
 async def health_check(request: Request):
     """Health check endpoint"""
-    return JSONResponse({"status": "healthy", "service": "mcp-agent"})
+    llm_cache = get_llm_cache()
+    return JSONResponse({
+        "status": "healthy",
+        "service": "mcp-agent",
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+        "file_cache": file_reader.stats()
+    })
+
+def int_or_none(value):
+    return None if value is None else int(value)
+
+async def read_code_endpoint(request: Request):
+    """Read a file, or a line or byte range of it"""
+    try:
+        data = await request.json()
+        file_slice = await run_in_threadpool(
+            file_reader.read_range, data['file_path'],
+            int_or_none(data.get('start_line')), int_or_none(data.get('end_line')),
+            int_or_none(data.get('start_byte')), int_or_none(data.get('end_byte'))
+        )
+    except (KeyError, ValueError, TypeError) as e:
+        return JSONResponse({'success': False, 'error': f'Invalid request: {e}'}, status_code=400)
+    except (FileAccessError, OSError) as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=404)
+
+    return JSONResponse({
+        'success': True,
+        'file_path': file_slice.path,
+        'content': file_slice.text,
+        'start_line': file_slice.start_line,
+        'end_line': file_slice.end_line,
+        'start_byte': file_slice.start_byte,
+        'end_byte': file_slice.end_byte,
+        'size': file_slice.size,
+        'truncated': file_slice.truncated
+    })
 
-@app.route('/tools/analyze_bug', methods=['POST'])
 async def analyze_bug_endpoint(request: Request):
     """Analyze bug endpoint"""
     try:
@@ -64,17 +108,7 @@ async def analyze_bug_endpoint(request: Request):
         if not CEREBRAS_API_KEY:
             raise Exception("CEREBRAS_API_KEY not set")
             
-        response = requests.post(
-            CEREBRAS_API_URL,
-            headers={
-                'Authorization': f'Bearer {CEREBRAS_API_KEY}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': 'llama-3.3-70b',
-                'messages': [{
-                    'role': 'user',
-                    'content': f"""Analyze this bug and provide a clear, structured analysis for an engineer.
+        prompt = f"""Analyze this bug and provide a clear, structured analysis for an engineer.
 
 Bug Title: {title}
 Description: {description or "Application bug"}
@@ -96,22 +130,13 @@ FIX APPROACH:
 [2-3 sentences explaining what changes are needed]
 
 Be specific. Mention exact file paths and CSS properties/code elements."""
-                }],
-                'max_tokens': 500,
-                'temperature': 0.7
-            },
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            analysis = response.json()['choices'][0]['message']['content']
-            return JSONResponse({
-                'success': True,
-                'analysis': analysis
-            })
-        else:
-            raise Exception(f'Cerebras API error: {response.status_code}')
-            
+
+        analysis = await get_async_llm_client().chat(prompt, temperature=0.0, max_tokens=500, timeout=10)
+        return JSONResponse({
+            'success': True,
+            'analysis': analysis
+        })
+
     except Exception as e:
         mock_analysis = f"Mock analysis (Cerebras unavailable): Floating-point precision issue in cart.py. Use Decimal for money calculations. Error: {str(e)}"
         return JSONResponse({
@@ -119,7 +144,6 @@ Be specific. Mention exact file paths and CSS properties/code elements."""
             'analysis': mock_analysis
         })
 
-@app.route('/tools/generate_patch', methods=['POST'])
 async def generate_patch_endpoint(request: Request):
     """Generate patch endpoint"""
     try:
@@ -142,16 +166,8 @@ async def generate_patch_endpoint(request: Request):
         if any(word in title_lower for word in ['cart', 'checkout', 'payment', 'price', 'total']):
             keywords.extend(['cart', 'checkout', 'payment'])
         
-        # Search for relevant files
-        relevant_files = search_by_keywords(keywords) if keywords else []
-        
-        code_context = ""
-        if relevant_files:
-            for f in relevant_files[:3]:  # Limit to 3 most relevant files
-                code_content = read_file_content(f)
-                code_context += f"\n--- File: {f} ---\n{code_content[:2000]}\n"  # Limit content per file
-        else:
-            code_context = "No relevant files found in workspace."
+        # Search and read relevant files off the event loop
+        code_context, file_digests = await run_in_threadpool(build_code_context, keywords, f"{title} {analysis}")
 
         prompt = f"""Generate a clean code patch to fix this bug.
 
@@ -159,7 +175,7 @@ Bug: {title}
 
 Analysis: {analysis}
 
-Current Code:
+Current Code (excerpts; each header gives the line range shown - use those line numbers in @@ headers):
 {code_context}
 
 Generate a unified diff patch with this format:
@@ -181,33 +197,13 @@ RULES:
 
 Output ONLY the diff. No explanations."""
 
-        response = requests.post(
-            CEREBRAS_API_URL,
-            headers={
-                'Authorization': f'Bearer {CEREBRAS_API_KEY}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': 'llama-3.3-70b',
-                'messages': [{
-                    'role': 'user',
-                    'content': prompt
-                }],
-                'max_tokens': 1000,
-                'temperature': 0.3
-            },
-            timeout=30
-        )
+        patch = await get_async_llm_client().chat(prompt, temperature=0.0, max_tokens=1000, timeout=30,
+                                                  file_digests=file_digests)
+        return JSONResponse({
+            'success': True,
+            'patch': patch
+        })
 
-        if response.status_code == 200:
-            patch = response.json()['choices'][0]['message']['content']
-            return JSONResponse({
-                'success': True,
-                'patch': patch
-            })
-        else:
-            raise Exception(f'Cerebras API error: {response.status_code}')
-            
     except Exception as e:
         error_message = f"""ERROR: Failed to generate patch.
 
@@ -223,6 +219,21 @@ For manual fix, refer to the Analysis section above for suggested approach."""
             'error': str(e)
         }, status_code=500)
 
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    threading.Thread(target=workspace_index.build, name='workspace-index', daemon=True).start()
+    try:
+        yield
+    finally:
+        await get_async_llm_client().aclose()
+
+app = Starlette(routes=[
+    Route('/health', health_check, methods=['GET']),
+    Route('/tools/read_code', read_code_endpoint, methods=['POST']),
+    Route('/tools/analyze_bug', analyze_bug_endpoint, methods=['POST']),
+    Route('/tools/generate_patch', generate_patch_endpoint, methods=['POST']),
+], lifespan=lifespan)
+
 if __name__ == "__main__":
     port = int(os.getenv('PORT', 9000))
     print(f"Starting MCP HTTP server on port {port}")
@@ -0,0 +1,150 @@
+"""
+Content-addressed cache for LLM completions
+
+Keys are a SHA-256 over (model, prompt, temperature, max_tokens, file
+digests). The agent passes the size/mtime of every file it put in the
+prompt, so an entry stops matching as soon as that code changes.
+
+Tier 1 is an in-process LRU; tier 2 is an optional directory of JSON
+files (LLM_CACHE_DIR) that survives restarts. Both honour the same TTL.
+
+A copy of backend/services/llm_cache.py, which is canonical: change
+cache_key() and LLMResponseCache there first and mirror them here
+(backend/tests/test_llm_sync.py fails until they match).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(model: str, prompt: str, temperature: float, max_tokens: int,
+              file_digests: dict = None) -> str:
+    """Hash everything that determines a completion"""
+    material = json.dumps({
+        'model': model,
+        'prompt': prompt,
+        'temperature': temperature,
+        'max_tokens': max_tokens,
+        'files': sorted((file_digests or {}).items())
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class DiskCacheTier:
+    """Second tier as one JSON file per key under a directory"""
+
+    def __init__(self, directory: str, max_files: int = 10000):
+        self.directory = directory
+        self.max_files = max_files
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if item.get('expires_at', 0) < time.time():
+            return None
+        return item.get('response')
+
+    def set(self, key: str, value: str, ttl: int):
+        # Write then rename, so readers never see a partial file
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'response': value, 'expires_at': time.time() + ttl}, f)
+        os.replace(tmp_path, self._path(key))
+
+        # Drop the oldest files past the limit every 100 writes
+        self._writes += 1
+        if self._writes % 100 == 0:
+            entries = sorted(os.scandir(self.directory), key=lambda e: e.stat().st_mtime)
+            for entry in entries[:max(0, len(entries) - self.max_files)]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+
+class LLMResponseCache:
+    """In-memory LRU with TTL, optional persistent tier, and hit/miss counters"""
+
+    def __init__(self, max_entries: int = 512, ttl: int = 3600, max_value_bytes: int = 256_000,
+                 tier=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_value_bytes = max_value_bytes
+        self.tier = tier
+
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.tier_hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                if item[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+                del self._entries[key]
+
+        value = None
+        if self.tier is not None:
+            try:
+                value = self.tier.get(key)
+            except Exception as e:
+                print(f'[LLM Cache] Tier read failed: {e}')
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.tier_hits += 1
+            self._store(key, value, now)
+        return value
+
+    def set(self, key: str, value: str):
+        if len(value.encode('utf-8')) > self.max_value_bytes:
+            return
+        with self._lock:
+            self._store(key, value, time.time())
+
+        if self.tier is not None:
+            try:
+                self.tier.set(key, value, self.ttl)
+            except Exception as e:
+                print(f'[LLM Cache] Tier write failed: {e}')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.tier_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'tier_hits': self.tier_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.tier_hits) / lookups, 4) if lookups else 0.0
+            }
+
+    def _store(self, key: str, value: str, now: float):
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
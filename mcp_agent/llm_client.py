@@ -0,0 +1,305 @@
+"""
+Shared LLM client for the agent's Cerebras chat completion calls
+
+One pooled requests.Session per process, so repeated calls reuse
+keep-alive connections instead of paying a TLS handshake each time.
+429 and 5xx responses (and connection errors) are retried with
+full-jitter exponential backoff, honouring Retry-After when present.
+
+AsyncLLMClient is the same thing on httpx for the Starlette server, with
+a semaphore capping concurrent outbound calls so the event loop keeps
+serving other requests while completions are in flight. Its cache
+lookups run on a thread when there is a disk tier, so file I/O never
+blocks the loop.
+
+Both answer repeated prompts from the shared LLMResponseCache, for
+completions sampled at or below cache_max_temperature
+(LLM_CACHE_MAX_TEMPERATURE); above it each call draws a fresh answer.
+The agent's analysis and patch calls are greedy (temperature 0) so that
+they are cached.
+
+LLMClient is a copy of backend/services/llm_client.py, which is
+canonical: change the retry statuses, cache keying and backoff there
+first and mirror them here (backend/tests/test_llm_sync.py fails until
+they match).
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from llm_cache import DiskCacheTier, LLMResponseCache, cache_key
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when a completion cannot be obtained"""
+
+
+class LLMClient:
+    """Pooled, retrying client for an OpenAI-compatible chat completions API"""
+
+    def __init__(self, api_url: str, api_key: str, model: str, pool_size: int = 10,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 timeout: float = 30, cache: LLMResponseCache = None, cache_max_temperature: float = 0.0):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.cache = cache
+        self.cache_max_temperature = cache_max_temperature
+        self._connect(pool_size)
+
+    def _connect(self, pool_size: int):
+        """Open the pooled HTTP session"""
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def chat(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1000,
+             timeout: float = None, model: str = None, file_digests: dict = None,
+             use_cache: bool = True) -> str:
+        """
+        Send a single user prompt and return the completion text.
+        file_digests ({path: digest}) ties a cached answer to the code it was generated from.
+        """
+        key = self._cache_key(prompt, temperature, max_tokens, model, file_digests, use_cache)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        result = self.complete(
+            [{'role': 'user', 'content': prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            model=model
+        )
+        text = result['choices'][0]['message']['content']
+
+        if key is not None:
+            self.cache.set(key, text)
+        return text
+
+    def _cache_key(self, prompt, temperature, max_tokens, model, file_digests, use_cache):
+        if self.cache is None or not use_cache or temperature > self.cache_max_temperature:
+            return None
+        return cache_key(model or self.model, prompt, temperature, max_tokens, file_digests)
+
+    def complete(self, messages: list, temperature: float = 0.2, max_tokens: int = 1000,
+                 timeout: float = None, model: str = None) -> dict:
+        """POST a chat completion request and return the decoded JSON body"""
+        if not self.api_key:
+            raise LLMError("CEREBRAS_API_KEY not configured")
+
+        payload = {
+            'model': model or self.model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(
+                    self.api_url,
+                    headers={
+                        'Authorization': f'Bearer {self.api_key}',
+                        'Content-Type': 'application/json'
+                    },
+                    json=payload,
+                    timeout=timeout or self.timeout
+                )
+                if response.status_code == 200:
+                    return response.json()
+
+                last_error = LLMError(f'Cerebras API error: {response.status_code}')
+                if response.status_code not in RETRY_STATUSES:
+                    raise last_error
+                retry_after = response.headers.get('Retry-After')
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = LLMError(f'Cerebras API request failed: {e}')
+
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, retry_after))
+
+        raise last_error
+
+    def _backoff(self, attempt: int, retry_after: str = None) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After if given"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class AsyncLLMClient(LLMClient):
+    """Non-blocking variant on a pooled httpx.AsyncClient"""
+
+    def __init__(self, api_url: str, api_key: str, model: str, pool_size: int = 10,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 timeout: float = 30, max_concurrency: int = 8, cache: LLMResponseCache = None,
+                 cache_max_temperature: float = 0.0):
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        super().__init__(api_url, api_key, model, pool_size=pool_size, max_retries=max_retries,
+                         backoff_base=backoff_base, backoff_max=backoff_max, timeout=timeout,
+                         cache=cache, cache_max_temperature=cache_max_temperature)
+
+    def _connect(self, pool_size: int):
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=self.timeout
+        )
+
+    async def chat(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1000,
+                   timeout: float = None, model: str = None, file_digests: dict = None,
+                   use_cache: bool = True) -> str:
+        """Send a single user prompt and return the completion text"""
+        key = self._cache_key(prompt, temperature, max_tokens, model, file_digests, use_cache)
+        if key is not None:
+            cached = await self._off_loop(self.cache.get, key)
+            if cached is not None:
+                return cached
+
+        result = await self.complete(
+            [{'role': 'user', 'content': prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            model=model
+        )
+        text = result['choices'][0]['message']['content']
+
+        if key is not None:
+            await self._off_loop(self.cache.set, key, text)
+        return text
+
+    async def _off_loop(self, method, *args):
+        """Call a cache method, on a thread if it may touch the disk tier"""
+        if self.cache.tier is None:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    async def complete(self, messages: list, temperature: float = 0.2, max_tokens: int = 1000,
+                       timeout: float = None, model: str = None) -> dict:
+        """POST a chat completion request and return the decoded JSON body"""
+        if not self.api_key:
+            raise LLMError("CEREBRAS_API_KEY not configured")
+
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        payload = {
+            'model': model or self.model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    response = await self.client.post(
+                        self.api_url,
+                        headers={
+                            'Authorization': f'Bearer {self.api_key}',
+                            'Content-Type': 'application/json'
+                        },
+                        json=payload,
+                        timeout=timeout or self.timeout
+                    )
+                if response.status_code == 200:
+                    return response.json()
+
+                last_error = LLMError(f'Cerebras API error: {response.status_code}')
+                if response.status_code not in RETRY_STATUSES:
+                    raise last_error
+                retry_after = response.headers.get('Retry-After')
+            except httpx.TransportError as e:
+                last_error = LLMError(f'Cerebras API request failed: {e}')
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+
+        raise last_error
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# Singleton instances
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """Shared response cache for both clients, or None if disabled"""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None and os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true':
+            cache_dir = os.getenv('LLM_CACHE_DIR')
+            _llm_cache = LLMResponseCache(
+                max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '512')),
+                ttl=int(os.getenv('LLM_CACHE_TTL', '86400')),
+                tier=DiskCacheTier(cache_dir, max_files=int(os.getenv('LLM_CACHE_MAX_FILES', '10000')))
+                if cache_dir else None
+            )
+    return _llm_cache
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    """Get or create the shared LLM client configured from the environment"""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            _llm_client = LLMClient(
+                api_url=os.getenv('CEREBRAS_API_URL', 'https://api.cerebras.ai/v1/chat/completions'),
+                api_key=os.getenv('CEREBRAS_API_KEY'),
+                model=os.getenv('CEREBRAS_MODEL', 'llama-3.3-70b'),
+                pool_size=int(os.getenv('LLM_POOL_SIZE', '10')),
+                max_retries=int(os.getenv('LLM_MAX_RETRIES', '3')),
+                timeout=float(os.getenv('LLM_TIMEOUT', '30')),
+                cache=get_llm_cache(),
+                cache_max_temperature=float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', '0'))
+            )
+    return _llm_client
+
+
+_async_llm_client = None
+
+def get_async_llm_client() -> AsyncLLMClient:
+    """Get or create the shared async LLM client configured from the environment"""
+    global _async_llm_client
+    if _async_llm_client is None:
+        _async_llm_client = AsyncLLMClient(
+            api_url=os.getenv('CEREBRAS_API_URL', 'https://api.cerebras.ai/v1/chat/completions'),
+            api_key=os.getenv('CEREBRAS_API_KEY'),
+            model=os.getenv('CEREBRAS_MODEL', 'llama-3.3-70b'),
+            pool_size=int(os.getenv('LLM_POOL_SIZE', '10')),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', '3')),
+            timeout=float(os.getenv('LLM_TIMEOUT', '30')),
+            max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '8')),
+            cache=get_llm_cache(),
+            cache_max_temperature=float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', '0'))
+        )
+    return _async_llm_client
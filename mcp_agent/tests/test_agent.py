@@ -0,0 +1,97 @@
+"""
+Tests for the stdio agent's context gathering
+"""
+
+import pytest
+
+import agent
+from file_access import FileReader
+from workspace_index import WorkspaceIndex
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Point the agent's index and reader at a small workspace"""
+    files = {
+        'src/cart.py': 'def cart_total(items):\n    return sum(items)\n',
+        'src/discount.py': 'def apply_discount(cart_total):\n    return cart_total * 0.9\n',
+        'src/App.css': '.product-image img {\n  width: 100%;\n}\n',
+        'src/notes.py': '# nothing relevant\n',
+    }
+    for path, text in files.items():
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(text)
+    monkeypatch.setattr(agent, 'workspace_index', WorkspaceIndex(str(tmp_path), refresh_interval=0))
+    monkeypatch.setattr(agent, 'file_reader', FileReader(str(tmp_path)))
+    return tmp_path
+
+
+class TestGatherContext:
+    """Test the concurrent search-and-read stage of generate_patch"""
+
+    def test_ranked_files_then_content_matches(self, workspace):
+        """BM25 results come first, then files from the content searches, without repeats"""
+        files = agent.gather_context('cart total', ['product-image', 'cart_total'])
+        assert [path for path, content in files] == ['src/cart.py', 'src/discount.py', 'src/App.css']
+        assert files[0][1] == 'def cart_total(items):\n    return sum(items)\n'
+
+    def test_stops_at_max_files(self, workspace):
+        """No more than max_files are read"""
+        files = agent.gather_context('cart total', ['product-image'], max_files=1)
+        assert [path for path, content in files] == ['src/cart.py']
+
+    def test_budget_cuts_the_last_file(self, workspace):
+        """Contents are cut so the total stays within budget_chars"""
+        files = agent.gather_context('cart total', [], budget_chars=30)
+        assert sum(len(content) for path, content in files) == 30
+        assert len(files) == 1
+
+    def test_failed_search_is_skipped(self, workspace, monkeypatch):
+        """A content search that raises does not lose the other searches' files"""
+        find = agent.find_files_by_content
+
+        def flaky(term):
+            if term == 'broken':
+                raise RuntimeError('index unavailable')
+            return find(term)
+
+        monkeypatch.setattr(agent, 'find_files_by_content', flaky)
+        files = agent.gather_context('zzz', ['broken', 'product-image'])
+        assert [path for path, content in files] == ['src/App.css']
+
+    def test_failed_ranking_is_skipped(self, workspace, monkeypatch):
+        """If BM25 ranking raises, content matches are still used"""
+        def broken(query, limit=5):
+            raise RuntimeError('index unavailable')
+
+        monkeypatch.setattr(agent, 'rank_files', broken)
+        files = agent.gather_context('cart total', ['product-image'])
+        assert [path for path, content in files] == ['src/App.css']
+
+    def test_unreadable_files_are_left_out(self, workspace):
+        """A file that cannot be read is skipped rather than failing the stage"""
+        (workspace / 'src' / 'cart.py').write_bytes(b'def cart_total\0(items): pass\n')
+        files = agent.gather_context('cart total', [])
+        assert 'src/cart.py' not in [path for path, content in files]
+        assert files
+
+
+class TestFallbackPatch:
+    """Test the CSS fallback patch is positioned from the file itself"""
+
+    def test_hunk_starts_at_the_rule_in_the_file(self, workspace):
+        """The @@ line is the rule's real line, with the rule's own lines as context"""
+        css = '.header {\n  color: red;\n}\n\n.product-image img {\n  width: 100%;\n}\n\n.footer {}\n'
+        (workspace / 'ecommerce-app' / 'src').mkdir(parents=True)
+        (workspace / 'ecommerce-app' / 'src' / 'App.css').write_text(css)
+
+        patch = agent.generate_fallback_patch('Image zoom on hover', ['ecommerce-app/src/App.css'])
+        assert patch.splitlines()[:6] == [
+            '--- a/ecommerce-app/src/App.css',
+            '+++ b/ecommerce-app/src/App.css',
+            '@@ -5,4 +5,9 @@',
+            ' .product-image img {',
+            '   width: 100%;',
+            '+  transition: transform 0.3s ease-in-out;',
+        ]
+        assert patch.endswith('+}\n \n')
@@ -0,0 +1,90 @@
+"""
+Tests for packing the most relevant chunks of code into a token budget
+"""
+
+from context_packer import estimate_tokens, pack_context, split_chunks
+
+CART_PY = '''import math
+
+
+def subtotal(items):
+    return sum(i.price for i in items)
+
+
+def apply_discount(total, pct):
+    return total * (1 - pct)
+
+
+def tax(total):
+    return total * 0.1
+'''
+
+APP_CSS = '''.header {
+  color: red;
+}
+
+.product-image img {
+  width: 100%;
+}
+'''
+
+
+class TestSplitChunks:
+    """Test splitting files at definition and rule boundaries"""
+
+    def test_python_defs(self):
+        """Each def is its own chunk with 1-based inclusive lines"""
+        chunks = split_chunks('cart.py', CART_PY)
+        assert [(c.start, c.end) for c in chunks] == [(1, 3), (4, 7), (8, 11), (12, 13)]
+        assert chunks[2].text.startswith('def apply_discount')
+
+    def test_css_rules(self):
+        """Top-level CSS rules split where they start"""
+        chunks = split_chunks('App.css', APP_CSS)
+        assert [(c.start, c.end) for c in chunks] == [(1, 4), (5, 7)]
+
+    def test_long_definitions_are_windowed(self):
+        """A definition longer than MAX_CHUNK_LINES is cut into windows"""
+        text = 'def big():\n' + '    x = 1\n' * 200
+        assert [(c.start, c.end) for c in split_chunks('big.py', text)] == [(1, 80), (81, 160), (161, 201)]
+
+
+class TestPackContext:
+    """Test ranking and packing chunks within the budget"""
+
+    def test_best_chunk_first_with_line_range(self):
+        """The chunk matching the query is packed with its file and line range"""
+        packed = pack_context([('cart.py', CART_PY)], 'discount is wrong', token_budget=40)
+        assert packed.sections == [('cart.py', 8, 11)]
+        assert '=== File: cart.py (lines 8-11) ===' in packed.text
+        assert 'def apply_discount' in packed.text
+        assert 'def tax' not in packed.text
+
+    def test_header_total_comes_from_line_counts(self):
+        """The whole-file total is shown only when the caller knows it"""
+        truncated = CART_PY[:CART_PY.index('def tax')]
+        packed = pack_context([('cart.py', truncated)], 'discount', 1000, line_counts={'cart.py': 13})
+        assert '(lines 8-11 of 13)' in packed.text
+
+    def test_stays_within_budget(self):
+        """Chunks that do not fit are left out and the total stays under the budget"""
+        files = [('cart.py', CART_PY), ('App.css', APP_CSS)]
+        packed = pack_context(files, 'total discount product image', token_budget=60)
+        assert packed.tokens <= 60
+        assert 0 < len(packed.sections) < len(split_chunks('cart.py', CART_PY)) + 2
+
+    def test_adjacent_chunks_merge_into_one_section(self):
+        """Neighbouring selected chunks of a file form one section"""
+        packed = pack_context([('cart.py', CART_PY)], 'total', token_budget=1000)
+        assert packed.sections == [('cart.py', 8, 13)]
+
+    def test_no_match_falls_back_to_file_order(self):
+        """With nothing matching, the most relevant file's first chunks are packed"""
+        packed = pack_context([('App.css', APP_CSS), ('cart.py', CART_PY)], 'zzz', token_budget=30)
+        assert packed.files == ['App.css']
+        assert packed.sections[0][1] == 1
+
+    def test_estimate_tokens(self):
+        """About four characters per token, rounded up"""
+        assert estimate_tokens('') == 0
+        assert estimate_tokens('abcde') == 2
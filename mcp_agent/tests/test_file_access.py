@@ -0,0 +1,140 @@
+"""
+Tests for bounded, range-aware reads of workspace files
+"""
+
+import os
+
+import pytest
+
+from file_access import FileAccessError, FileReader
+
+LINES = ''.join(f'line{i:04d}\n' for i in range(1, 101))   # 9 bytes per line
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / 'workspace'
+    root.mkdir()
+    (root / 'lines.txt').write_text(LINES)
+    (root / 'notes.txt').write_text('café au lait\n')
+    (root / 'image.png').write_bytes(b'\x89PNG\0\0data')
+    (tmp_path / 'secret.txt').write_text('token\n')
+    return root
+
+
+def small_reader(root, **kwargs):
+    return FileReader(str(root), mmap_threshold=1_000_000, **kwargs)
+
+
+def mapped_reader(root, **kwargs):
+    """Every file is over the threshold, so reads go through mmap"""
+    return FileReader(str(root), mmap_threshold=10, **kwargs)
+
+
+class TestPathEscapes:
+    """Test nothing outside the workspace root can be read"""
+
+    def test_dotdot_is_rejected(self, workspace):
+        """../ out of the root raises"""
+        with pytest.raises(FileAccessError, match='escapes'):
+            small_reader(workspace).read('../secret.txt')
+
+    def test_absolute_path_is_rejected(self, workspace):
+        """An absolute path elsewhere raises"""
+        with pytest.raises(FileAccessError, match='escapes'):
+            small_reader(workspace).read(str(workspace.parent / 'secret.txt'))
+
+    def test_symlink_out_of_the_root_is_rejected(self, workspace):
+        """A symlink inside the root that points outside it raises"""
+        os.symlink(workspace.parent / 'secret.txt', workspace / 'link.txt')
+        with pytest.raises(FileAccessError, match='escapes'):
+            small_reader(workspace).read('link.txt')
+
+    def test_dotdot_that_stays_inside_is_allowed(self, workspace):
+        """A path through .. that ends inside the root is fine"""
+        (workspace / 'sub').mkdir()
+        assert small_reader(workspace).read('sub/../notes.txt').text == 'café au lait\n'
+
+    def test_binary_and_missing_files(self, workspace):
+        """Binary files and missing paths raise FileAccessError"""
+        reader = small_reader(workspace)
+        with pytest.raises(FileAccessError, match='Binary'):
+            reader.read('image.png')
+        with pytest.raises(FileAccessError):
+            reader.read('nope.txt')
+
+
+@pytest.mark.parametrize('make_reader', [small_reader, mapped_reader])
+class TestRangeReads:
+    """Test line and byte ranges give the same answer read whole or mapped"""
+
+    def test_line_range(self, workspace, make_reader):
+        """Lines are 1-based and inclusive, with their byte offsets"""
+        file_slice = make_reader(workspace).read_lines('lines.txt', 3, 4)
+        assert file_slice.text == 'line0003\nline0004\n'
+        assert (file_slice.start_byte, file_slice.end_byte) == (18, 36)
+        assert (file_slice.start_line, file_slice.end_line, file_slice.truncated) == (3, 4, False)
+
+    def test_line_range_past_the_end(self, workspace, make_reader):
+        """A range running off the end stops at the last line"""
+        file_slice = make_reader(workspace).read_lines('lines.txt', 99, 500)
+        assert file_slice.text == 'line0099\nline0100\n'
+        assert file_slice.end_line == 100
+
+    def test_byte_range_aligns_to_characters(self, workspace, make_reader):
+        """A byte range starting inside a multi-byte character skips to the next one"""
+        # 'caf' is 3 bytes, the e-acute is bytes 3-4
+        file_slice = make_reader(workspace).read_bytes('notes.txt', 4, 8)
+        assert file_slice.text == ' au'
+        assert file_slice.start_byte == 5
+
+    def test_max_chars(self, workspace, make_reader):
+        """read() stops at max_chars and says so"""
+        file_slice = make_reader(workspace).read('lines.txt', max_chars=12)
+        assert file_slice.text == 'line0001\nlin'
+        assert file_slice.truncated
+
+
+class TestTruncation:
+    """Test reads capped at max_read_bytes are flagged"""
+
+    def test_line_read_stopping_on_the_limit_with_lines_left(self, workspace):
+        """Whole lines up to exactly the limit, more requested: truncated"""
+        file_slice = mapped_reader(workspace, max_read_bytes=27).read_lines('lines.txt', 1, 4)
+        assert file_slice.text == LINES[:27]
+        assert (file_slice.end_line, file_slice.truncated) == (3, True)
+
+    def test_line_read_ending_on_the_limit(self, workspace):
+        """Exactly the requested lines fit the limit: not truncated"""
+        file_slice = mapped_reader(workspace, max_read_bytes=27).read_lines('lines.txt', 1, 3)
+        assert (file_slice.end_line, file_slice.truncated) == (3, False)
+
+    def test_line_read_cut_inside_a_line(self, workspace):
+        """The limit falls mid-line: the partial line is flagged"""
+        file_slice = mapped_reader(workspace, max_read_bytes=30).read_lines('lines.txt', 1, 10)
+        assert file_slice.text == LINES[:30]
+        assert file_slice.truncated
+
+    def test_open_ended_line_read_to_the_end(self, workspace):
+        """Reading the last lines to the end of the file is complete"""
+        file_slice = mapped_reader(workspace, max_read_bytes=27).read_lines('lines.txt', 98)
+        assert (file_slice.end_line, file_slice.truncated) == (100, False)
+
+    def test_byte_read(self, workspace):
+        """A byte range larger than the limit is cut and flagged"""
+        file_slice = mapped_reader(workspace, max_read_bytes=10).read_bytes('lines.txt', 0, 100)
+        assert (file_slice.end_byte, file_slice.truncated) == (10, True)
+
+
+class TestCache:
+    """Test the decoded-text LRU"""
+
+    def test_repeat_reads_hit_until_the_file_changes(self, workspace):
+        """The same version is decoded once; a rewrite is a miss"""
+        reader = small_reader(workspace)
+        reader.read('notes.txt')
+        reader.read('notes.txt')
+        (workspace / 'notes.txt').write_text('changed and longer\n')
+        assert reader.read('notes.txt').text == 'changed and longer\n'
+        assert (reader.hits, reader.misses) == (1, 2)
+        assert reader.stats()['entries'] == 1
@@ -0,0 +1,57 @@
+"""
+Tests for the agent's HTTP server
+"""
+
+import pytest
+from starlette.testclient import TestClient
+
+import http_server
+from file_access import FileReader
+from workspace_index import WorkspaceIndex
+
+
+class FakeLLMClient:
+    def __init__(self):
+        self.calls = []
+        self.closed = False
+
+    async def chat(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        return '--- a/cart.py\n+++ b/cart.py\n'
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def llm(tmp_path, monkeypatch):
+    """A workspace with one file and a recording LLM client"""
+    (tmp_path / 'cart.py').write_text('def cart_total(items):\n    return sum(items)\n')
+    monkeypatch.setattr(http_server, 'workspace_index', WorkspaceIndex(str(tmp_path), refresh_interval=0))
+    monkeypatch.setattr(http_server, 'file_reader', FileReader(str(tmp_path)))
+    monkeypatch.setattr(http_server, 'CEREBRAS_API_KEY', 'key')
+    fake = FakeLLMClient()
+    monkeypatch.setattr(http_server, 'get_async_llm_client', lambda: fake)
+    return fake
+
+
+class TestHTTPServer:
+    """Test the routes and the lifespan"""
+
+    def test_health_and_read_code(self, llm):
+        """Both routes answer from the workspace"""
+        with TestClient(http_server.app) as client:
+            assert client.get('/health').json()['status'] == 'healthy'
+            response = client.post('/tools/read_code', json={'file_path': 'cart.py', 'start_line': 2})
+            assert response.json()['content'] == '    return sum(items)\n'
+            assert client.post('/tools/read_code', json={'file_path': '../x'}).status_code == 404
+
+    def test_patch_is_cached_against_the_files_in_the_prompt(self, llm):
+        """generate_patch passes the digests of the packed files, and shutdown closes the client"""
+        with TestClient(http_server.app) as test_client:
+            response = test_client.post('/tools/generate_patch', json={'title': 'Cart total is wrong',
+                                                                       'analysis': 'cart_total'})
+        assert response.json()['success']
+        assert llm.calls[0]['file_digests'] == http_server.workspace_index.file_digests(['cart.py'])
+        assert llm.calls[0]['temperature'] == 0.0
+        assert llm.closed
@@ -0,0 +1,50 @@
+"""
+Tests for the agent's LLM clients and their response cache
+"""
+
+import asyncio
+
+from llm_cache import DiskCacheTier, LLMResponseCache, cache_key
+from llm_client import AsyncLLMClient, LLMClient
+
+
+def cached_client(cls, tmp_path, **kwargs):
+    cache = LLMResponseCache(tier=DiskCacheTier(str(tmp_path)))
+    return cls('http://llm.invalid', 'key', 'model', cache=cache, **kwargs), cache
+
+
+class TestAsyncLLMClient:
+    """Test the httpx client shares the synchronous client's setup"""
+
+    def test_init_goes_through_the_parent(self, tmp_path):
+        """Retry, timeout and cache settings come from LLMClient.__init__"""
+        client, cache = cached_client(AsyncLLMClient, tmp_path, max_retries=5, timeout=7, max_concurrency=2)
+        assert (client.max_retries, client.timeout, client.max_concurrency) == (5, 7, 2)
+        assert client.cache is cache
+        assert not hasattr(client, 'session')
+        asyncio.run(client.aclose())
+
+    def test_disk_tier_hit_without_a_request(self, tmp_path):
+        """A greedy prompt already in the disk tier is answered without calling the API"""
+        client, cache = cached_client(AsyncLLMClient, tmp_path)
+        DiskCacheTier(str(tmp_path)).set(cache_key('model', 'prompt', 0.0, 100), 'cached answer', 60)
+
+        async def run():
+            try:
+                return await client.chat('prompt', temperature=0.0, max_tokens=100)
+            finally:
+                await client.aclose()
+
+        assert asyncio.run(run()) == 'cached answer'
+        assert cache.stats()['tier_hits'] == 1
+
+
+class TestGreedyCaching:
+    """Test that the agent's temperature 0 calls are cacheable by default"""
+
+    def test_greedy_cached_sampled_not(self, tmp_path):
+        """Temperature 0 gets a key, sampled completions do not, and use_cache=False skips it"""
+        client, _ = cached_client(LLMClient, tmp_path)
+        assert client._cache_key('p', 0.0, 100, None, None, True) is not None
+        assert client._cache_key('p', 0.3, 100, None, None, True) is None
+        assert client._cache_key('p', 0.0, 100, None, None, False) is None
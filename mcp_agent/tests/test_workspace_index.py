@@ -0,0 +1,118 @@
+"""
+Tests for the agent's in-memory workspace index
+"""
+
+import os
+
+from workspace_index import WorkspaceIndex, split_identifier
+
+
+def write(root, path, text):
+    full = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def built_index(tmp_path, files, **kwargs):
+    for path, text in files.items():
+        write(str(tmp_path), path, text)
+    index = WorkspaceIndex(str(tmp_path), refresh_interval=0, **kwargs)
+    index.build()
+    return index
+
+
+class TestWorkspaceIndex:
+    """Test building, refreshing and content search"""
+
+    def test_skips_vendored_dirs_and_other_extensions(self, tmp_path):
+        """Only code files outside node_modules and friends are indexed"""
+        index = built_index(tmp_path, {
+            'src/app.py': 'x = 1\n',
+            'node_modules/lib/index.js': 'x = 1\n',
+            'README.md': 'x = 1\n',
+        })
+        assert list(index.files) == ['src/app.py']
+
+    def test_refresh_picks_up_changes_and_removals(self, tmp_path):
+        """A changed file is re-read and a deleted one dropped"""
+        index = built_index(tmp_path, {'a.py': 'alpha = 1\n', 'b.py': 'beta = 2\n'})
+        write(str(tmp_path), 'a.py', 'gamma = 3  # grown\n')
+        os.remove(tmp_path / 'b.py')
+        index.refresh()
+
+        assert list(index.files) == ['a.py']
+        assert 'gamma' in index.postings and 'alpha' not in index.postings
+        assert 'beta' not in index.postings
+
+    def test_records_line_counts(self, tmp_path):
+        """Whole-file line counts, with or without a trailing newline"""
+        index = built_index(tmp_path, {'a.py': 'a\nb\n', 'b.py': 'a\nb\nc'})
+        assert index.line_counts(['a.py', 'b.py', 'missing.py']) == {'a.py': 2, 'b.py': 3}
+
+    def test_trigram_lookup_finds_substrings_of_terms(self, tmp_path):
+        """'product' finds a file that only says 'products'"""
+        index = built_index(tmp_path, {'shop.py': 'all_products = []\n', 'other.py': 'produce = 1\n'})
+        assert sorted(index._terms_containing('product')) == ['all_products', 'products']
+        assert index.find_by_content('product') == ['shop.py']
+
+    def test_trigram_lookup_drops_removed_terms(self, tmp_path):
+        """Terms of a deleted file no longer come back from the trigram index"""
+        index = built_index(tmp_path, {'shop.py': 'products = []\n'})
+        os.remove(tmp_path / 'shop.py')
+        index.refresh()
+        assert index._terms_containing('product') == []
+        assert index.grams == {}
+
+    def test_content_search_scans_files_too_large_to_index(self, tmp_path):
+        """Files over max_file_bytes are matched by a direct scan"""
+        index = built_index(tmp_path, {'big.js': 'x' * 100 + ' productCard\n'}, max_file_bytes=50)
+        assert index.unindexed == {'big.js'}
+        assert index.find_by_content('productcard') == ['big.js']
+
+    def test_split_identifier(self):
+        """camelCase and snake_case identifiers split into sub-words"""
+        assert split_identifier('calculateTotal') == ['calculate', 'total']
+        assert split_identifier('compute_total_HTTPRequest') == ['compute', 'total', 'http', 'request']
+
+
+class TestRanking:
+    """Test BM25 ranking over paths and content"""
+
+    def test_more_occurrences_rank_higher(self, tmp_path):
+        """The file that mentions the query terms more often comes first"""
+        index = built_index(tmp_path, {
+            'a.py': 'discount = 1\n' + 'other = 2\n' * 5,
+            'b.py': 'discount = discount * discount\n' + 'other = 2\n' * 5,
+            'c.py': 'unrelated = 3\n',
+        })
+        assert [path for path, score in index.rank('discount')] == ['b.py', 'a.py']
+
+    def test_path_match_outweighs_a_content_match(self, tmp_path):
+        """A query term in the path counts for more than the same term in content"""
+        index = built_index(tmp_path, {
+            'backend/cart.py': 'def calculate(items):\n    return 0\n',
+            'backend/orders.py': 'from x import cart\n',
+        })
+        assert index.rank('cart')[0][0] == 'backend/cart.py'
+
+    def test_query_sub_words_match_identifiers(self, tmp_path):
+        """'cart total' matches calculateTotal(cart); stopwords match nothing"""
+        index = built_index(tmp_path, {
+            'a.ts': 'export function calculateTotal(cart) {}\n',
+            'b.py': 'the = is_a = 1\n',
+        })
+        assert [path for path, score in index.rank('the cart total is')] == ['a.ts']
+
+    def test_ties_break_on_path_and_limit_applies(self, tmp_path):
+        """Equal scores come back in path order, cut at the limit"""
+        index = built_index(tmp_path, {name: 'token = 1\n' for name in ('c.py', 'a.py', 'b.py')})
+        assert [path for path, score in index.rank('token', limit=2)] == ['a.py', 'b.py']
+
+    def test_content_search_orders_matches_by_score(self, tmp_path):
+        """find_by_content returns the better BM25 match first"""
+        index = built_index(tmp_path, {
+            'a.css': '.product-image {}\n' + '.x {}\n' * 10,
+            'b.css': '.product-image {}\n.product-image img {}\n',
+        })
+        assert index.find_by_content('product-image') == ['b.css', 'a.css']
@@ -0,0 +1,368 @@
+"""
+In-memory index of the workspace for the MCP agent.
+
+Built once at startup, then refreshed incrementally: a refresh only stats
+files and re-reads the ones whose mtime or size changed. Both path search
+and content search answer from the index instead of walking and reading
+the whole tree on every call.
+
+Files are ranked with BM25 over two fields, the path and the content.
+Identifiers are split on camelCase and snake_case boundaries, so a query
+for "cart total" also matches calculateTotal and compute_total.
+
+Content search needs substring matches on terms ('product' must find
+'products'), so the vocabulary is also indexed by character trigrams.
+Files over max_file_bytes are not tokenized; content search scans them
+directly instead of skipping them.
+"""
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+SKIP_DIRS = {'node_modules', 'venv', '__pycache__', '.git', '.vite', 'dist'}
+CODE_EXTENSIONS = ('.py', '.js', '.jsx', '.ts', '.tsx', '.css', '.html')
+
+TOKEN_RE = re.compile(r'[a-z0-9_]+')
+IDENTIFIER_RE = re.compile(r'[A-Za-z0-9_]+')
+CAMEL_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+MAX_TERM_LENGTH = 64
+GRAM = 3
+SCAN_CHUNK_CHARS = 1 << 20
+
+# BM25 parameters and field weights
+K1 = 1.2
+B = 0.75
+PATH_WEIGHT = 2.0
+CONTENT_WEIGHT = 1.0
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'in', 'is', 'it',
+    'of', 'on', 'or', 'should', 'that', 'the', 'this', 'to', 'was', 'when', 'with'
+}
+
+
+def split_identifier(identifier: str) -> list:
+    """Split an identifier on snake_case and camelCase boundaries"""
+    parts = []
+    for chunk in identifier.split('_'):
+        parts.extend(CAMEL_RE.findall(chunk))
+    return [part.lower() for part in parts]
+
+
+@lru_cache(maxsize=65536)
+def identifier_terms(identifier: str) -> tuple:
+    """The lowercased identifier plus its sub-words"""
+    if len(identifier) > MAX_TERM_LENGTH:
+        return ()
+    parts = split_identifier(identifier)
+    if len(parts) > 1:
+        return (identifier.lower(), *parts)
+    return (identifier.lower(),)
+
+
+def code_terms(text: str) -> list:
+    """Terms for ranking: each lowercased identifier plus its sub-words"""
+    terms = []
+    for identifier in IDENTIFIER_RE.findall(text):
+        terms.extend(identifier_terms(identifier))
+    return terms
+
+
+def term_grams(term: str) -> set:
+    return {term[i:i + GRAM] for i in range(len(term) - GRAM + 1)}
+
+
+def count_terms(text: str) -> tuple:
+    """Term frequencies of a text and its total term count"""
+    counts = {}
+    for identifier, n in Counter(IDENTIFIER_RE.findall(text)).items():
+        for term in identifier_terms(identifier):
+            counts[term] = counts.get(term, 0) + n
+    return counts, sum(counts.values())
+
+
+class FileEntry:
+    """Metadata and term frequencies for one indexed file"""
+    __slots__ = ('path', 'basename', 'size', 'mtime', 'lines', 'terms', 'length', 'path_terms', 'path_length')
+
+    def __init__(self, path: str, size: int, mtime: float):
+        self.path = path
+        self.basename = os.path.basename(path)
+        self.size = size
+        self.mtime = mtime
+        self.lines = None         # line count, if the file was read
+        self.terms = {}
+        self.length = 0
+        self.path_terms, self.path_length = count_terms(path)
+
+
+class WorkspaceIndex:
+    """Paths, basenames, sizes, mtimes and an inverted token index over file contents"""
+
+    def __init__(self, root: str, extensions: tuple = CODE_EXTENSIONS, skip_dirs: set = None,
+                 max_file_bytes: int = 2_000_000, refresh_interval: float = 2.0):
+        self.root = root
+        self.extensions = extensions
+        self.skip_dirs = skip_dirs if skip_dirs is not None else SKIP_DIRS
+        self.max_file_bytes = max_file_bytes
+        self.refresh_interval = refresh_interval
+
+        self.files = {}           # rel_path -> FileEntry, in walk order
+        self.postings = {}        # content term -> {rel_path: tf}
+        self.path_postings = {}   # path term -> {rel_path: tf}
+        self.grams = {}           # trigram -> content terms containing it
+        self.unindexed = set()    # files too large to tokenize
+        self.total_length = 0
+        self.total_path_length = 0
+        self._norms = None
+        self._lock = threading.RLock()
+        self._last_refresh = 0.0
+        self._built = False
+
+    # ------------------------------------------------------------------
+    # Building and refreshing
+    # ------------------------------------------------------------------
+
+    def build(self):
+        """Index the whole workspace"""
+        started = time.time()
+        with self._lock:
+            self.refresh(force=True)
+            self._built = True
+        print(f"[Index] Indexed {len(self.files)} files, {len(self.postings)} terms "
+              f"in {time.time() - started:.2f}s ({len(self.unindexed)} over {self.max_file_bytes} bytes, "
+              f"scanned directly)", file=sys.stderr, flush=True)
+
+    def refresh(self, force: bool = False):
+        """Re-stat the workspace and re-index only files whose mtime or size changed"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return
+            self._last_refresh = now
+
+            seen = set()
+            for rel_path, size, mtime in self._scan():
+                seen.add(rel_path)
+                entry = self.files.get(rel_path)
+                if entry is not None and entry.mtime == mtime and entry.size == size:
+                    continue
+                self._index_file(rel_path, size, mtime)
+
+            for rel_path in [p for p in self.files if p not in seen]:
+                self._remove_file(rel_path)
+
+    def ensure_fresh(self):
+        """Build on first use, refresh (throttled) afterwards; waits for a build in progress"""
+        with self._lock:
+            if not self._built:
+                self.build()
+            else:
+                self.refresh()
+
+    def _scan(self):
+        for root, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d not in self.skip_dirs]
+            for file in files:
+                if not file.endswith(self.extensions):
+                    continue
+                full_path = os.path.join(root, file)
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                yield os.path.relpath(full_path, self.root), stat.st_size, stat.st_mtime
+
+    def _index_file(self, rel_path: str, size: int, mtime: float):
+        self._remove_file(rel_path)
+        self._norms = None
+        entry = FileEntry(rel_path, size, mtime)
+
+        if size <= self.max_file_bytes:
+            try:
+                with open(os.path.join(self.root, rel_path), 'r', encoding='utf-8', errors='ignore') as f:
+                    text = f.read()
+                entry.terms, entry.length = count_terms(text)
+                entry.lines = text.count('\n') + (1 if text and not text.endswith('\n') else 0)
+            except OSError:
+                pass
+        else:
+            self.unindexed.add(rel_path)
+
+        for term, tf in entry.terms.items():
+            paths = self.postings.get(term)
+            if paths is None:
+                paths = self.postings[term] = {}
+                for gram in term_grams(term):
+                    self.grams.setdefault(gram, set()).add(term)
+            paths[rel_path] = tf
+        for term, tf in entry.path_terms.items():
+            self.path_postings.setdefault(term, {})[rel_path] = tf
+        self.total_length += entry.length
+        self.total_path_length += entry.path_length
+        self.files[rel_path] = entry
+
+    def _remove_file(self, rel_path: str):
+        entry = self.files.pop(rel_path, None)
+        if entry is None:
+            return
+        self._norms = None
+        self.unindexed.discard(rel_path)
+        for postings, terms in ((self.postings, entry.terms), (self.path_postings, entry.path_terms)):
+            for term in terms:
+                paths = postings.get(term)
+                if paths is not None:
+                    paths.pop(rel_path, None)
+                    if not paths:
+                        del postings[term]
+                        if postings is self.postings:
+                            self._drop_grams(term)
+        self.total_length -= entry.length
+        self.total_path_length -= entry.path_length
+
+    def _drop_grams(self, term: str):
+        for gram in term_grams(term):
+            terms = self.grams.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self.grams[gram]
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def file_digests(self, paths: list) -> dict:
+        """Cheap per-file version stamps (size and mtime) for cache keys"""
+        with self._lock:
+            return {p: f"{self.files[p].size}:{self.files[p].mtime}" for p in paths if p in self.files}
+
+    def line_counts(self, paths: list) -> dict:
+        """Whole-file line counts of the indexed files among paths"""
+        with self._lock:
+            return {p: self.files[p].lines for p in paths if p in self.files and self.files[p].lines is not None}
+
+    def rank(self, query: str, limit: int = 10) -> list:
+        """Top files for a free-text query as (rel_path, score), best first"""
+        self.ensure_fresh()
+        query_terms = [t for t in dict.fromkeys(code_terms(query)) if t not in STOPWORDS]
+
+        with self._lock:
+            snapshot = self._snapshot(query_terms)
+        return self._score(snapshot, limit)
+
+    def _snapshot(self, query_terms: list) -> tuple:
+        """Copies of what scoring query_terms reads, so scoring can run without the lock"""
+        postings = []
+        for term in query_terms:
+            for index, weight in ((self.postings, CONTENT_WEIGHT), (self.path_postings, PATH_WEIGHT)):
+                docs = index.get(term)
+                if docs:
+                    postings.append((dict(docs), weight, index is self.path_postings))
+        # The norm dicts are replaced, never mutated, when the index changes
+        return len(self.files), postings, self._length_norms() if self.files else ({}, {})
+
+    @staticmethod
+    def _score(snapshot: tuple, limit: int, restrict_to: set = None) -> list:
+        n_docs, postings, (content_norms, path_norms) = snapshot
+        if not n_docs:
+            return []
+
+        scores = {}
+        for docs, weight, is_path in postings:
+            norms = path_norms if is_path else content_norms
+            idf = weight * math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for rel_path, tf in docs.items():
+                if restrict_to is not None and rel_path not in restrict_to:
+                    continue
+                scores[rel_path] = scores.get(rel_path, 0.0) + idf * tf * (K1 + 1) / (tf + norms[rel_path])
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(path, round(score, 4)) for path, score in ranked[:limit]]
+
+    def _length_norms(self):
+        """Per-file BM25 length normalisation, cached until the index changes"""
+        if self._norms is None:
+            n_docs = len(self.files)
+            avg_length = (self.total_length / n_docs) or 1.0
+            avg_path_length = (self.total_path_length / n_docs) or 1.0
+            self._norms = (
+                {p: K1 * (1 - B + B * e.length / avg_length) for p, e in self.files.items()},
+                {p: K1 * (1 - B + B * e.path_length / avg_path_length) for p, e in self.files.items()},
+            )
+        return self._norms
+
+    def _terms_containing(self, token: str) -> list:
+        """Vocabulary terms that contain token, via the trigram index"""
+        if len(token) < GRAM:
+            return [term for term in self.postings if token in term]
+        terms = None
+        # Rarest trigram first keeps the intersection small
+        for gram in sorted(term_grams(token), key=lambda g: len(self.grams.get(g, ()))):
+            gram_terms = self.grams.get(gram)
+            if not gram_terms:
+                return []
+            terms = set(gram_terms) if terms is None else terms & gram_terms
+            if not terms:
+                return []
+        return [term for term in terms if token in term]
+
+    def find_by_content(self, search_term: str, limit: int = 5) -> list:
+        """Files whose content contains search_term (case-insensitive), best BM25 match first"""
+        self.ensure_fresh()
+        needle = search_term.lower()
+        query_tokens = TOKEN_RE.findall(needle)
+
+        with self._lock:
+            unindexed = sorted(self.unindexed)
+            if query_tokens:
+                candidates = None
+                for query_token in query_tokens:
+                    # Substring semantics: 'product' must also hit 'products'
+                    paths = set()
+                    for term in self._terms_containing(query_token):
+                        paths.update(self.postings[term])
+                    candidates = paths if candidates is None else candidates & paths
+                    if not candidates:
+                        break
+                candidates = candidates or set()
+                snapshot = self._snapshot(list(dict.fromkeys(code_terms(search_term))))
+                walk_order = [p for p in self.files if p in candidates]
+            else:
+                ordered = list(self.files)
+
+        if query_tokens:
+            ranked = [path for path, score in self._score(snapshot, len(candidates), restrict_to=candidates)]
+            ranked_set = set(ranked)
+            ordered = ranked + [p for p in walk_order if p not in ranked_set] + unindexed
+
+        # Confirm the exact substring on candidates only, stopping at the limit
+        matches = []
+        for rel_path in ordered:
+            if self._contains(rel_path, needle):
+                matches.append(rel_path)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def _contains(self, rel_path: str, needle: str) -> bool:
+        """Case-insensitive substring test that reads the file in chunks"""
+        overlap = max(len(needle) - 1, 0)
+        tail = ''
+        try:
+            with open(os.path.join(self.root, rel_path), 'r', encoding='utf-8', errors='ignore') as f:
+                while True:
+                    chunk = f.read(SCAN_CHUNK_CHARS)
+                    if not chunk:
+                        return False
+                    text = tail + chunk.lower()
+                    if needle in text:
+                        return True
+                    tail = text[-overlap:] if overlap else ''
+        except OSError:
+            return False
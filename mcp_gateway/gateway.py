@@ -1,30 +1,255 @@
-from flask import Flask, request, jsonify
-import requests
+#!/usr/bin/env python3
+"""
+MCP gateway - a streaming reverse proxy in front of the mcp_agent backends
+
+Requests and responses are streamed through as bytes over pooled
+keep-alive connections; nothing is parsed or re-serialized on the way.
+Backends and how they are chosen live in upstreams.py; agent processes
+the gateway runs itself live in workers.py.
+"""
+import asyncio
+import contextlib
+import hmac
 import os
+import time
 
-app = Flask(__name__)
-MCP_AGENT_URL = os.getenv('MCP_AGENT_URL', 'http://mcp_agent:9000')
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
 
-@app.route('/health', methods=['GET'])
-def health():
-    return jsonify({"status": "healthy", "service": "mcp-gateway"})
+from upstreams import BackendPool
+from workers import LocalWorkers
 
-@app.route('/generate-patch', methods=['POST'])
-def generate_patch():
-    """Proxy request to MCP Agent running Llama"""
-    try:
-        data = request.json
-        print(f"Gateway received request: {data.get('title', 'N/A')}")
+# Local agent processes to run, where the agent code is, and the first port they listen on
+GATEWAY_LOCAL_WORKERS = int(os.getenv('GATEWAY_LOCAL_WORKERS', '0'))
+MCP_AGENT_DIR = os.getenv('MCP_AGENT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'mcp_agent'))
+GATEWAY_WORKER_BASE_PORT = int(os.getenv('GATEWAY_WORKER_BASE_PORT', '9100'))
+
+# Comma-separated agent URLs (containers); MCP_AGENT_URL still works for a single backend.
+# With local workers and neither set, the local workers are the only backends.
+default_agent_url = '' if GATEWAY_LOCAL_WORKERS else 'http://mcp_agent:9000'
+MCP_AGENT_URLS = [url.strip() for url in
+                  os.getenv('MCP_AGENT_URLS', os.getenv('MCP_AGENT_URL', default_agent_url)).split(',')
+                  if url.strip()]
+
+# Read timeouts per tool (seconds); anything not listed gets GATEWAY_DEFAULT_TIMEOUT
+DEFAULT_ROUTE_TIMEOUTS = 'analyze_bug=30,generate_patch=120,read_code=10'
+GATEWAY_ROUTE_TIMEOUTS = {
+    name.strip(): float(seconds)
+    for name, seconds in (item.split('=') for item in
+                          os.getenv('GATEWAY_ROUTE_TIMEOUTS', DEFAULT_ROUTE_TIMEOUTS).split(',') if '=' in item)
+}
+GATEWAY_DEFAULT_TIMEOUT = float(os.getenv('GATEWAY_DEFAULT_TIMEOUT', '60'))
+GATEWAY_CONNECT_TIMEOUT = float(os.getenv('GATEWAY_CONNECT_TIMEOUT', '3'))
+
+# Upstream connection pool, shared by all backends
+GATEWAY_MAX_CONNECTIONS = int(os.getenv('GATEWAY_MAX_CONNECTIONS', '100'))
+GATEWAY_MAX_KEEPALIVE = int(os.getenv('GATEWAY_MAX_KEEPALIVE', '20'))
+
+# Health: consecutive failures before ejection, ejection time, active check interval (0 disables)
+GATEWAY_MAX_FAILURES = int(os.getenv('GATEWAY_MAX_FAILURES', '3'))
+GATEWAY_EJECT_SECONDS = float(os.getenv('GATEWAY_EJECT_SECONDS', '30'))
+GATEWAY_HEALTH_INTERVAL = float(os.getenv('GATEWAY_HEALTH_INTERVAL', '10'))
+
+# Snapshot affinity may put at most this many times the mean queue depth on one backend
+GATEWAY_LOAD_FACTOR = float(os.getenv('GATEWAY_LOAD_FACTOR', '1.25'))
+# How long draining (and shutdown) waits for in-flight requests
+GATEWAY_DRAIN_SECONDS = float(os.getenv('GATEWAY_DRAIN_SECONDS', '30'))
+# Bearer token for POST /workers/... (drain, resume, restart); unset disables those actions
+GATEWAY_ADMIN_TOKEN = os.getenv('GATEWAY_ADMIN_TOKEN', '')
+
+# Headers that describe one connection, not the message (RFC 9110 7.6.1)
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailer',
+              'trailers', 'transfer-encoding', 'upgrade', 'host'}
+# Upstream answers that say the backend itself is in trouble
+BACKEND_FAILURE_STATUSES = {502, 503, 504}
+
+local_workers = LocalWorkers(MCP_AGENT_DIR, GATEWAY_LOCAL_WORKERS, GATEWAY_WORKER_BASE_PORT)
+pool = BackendPool(MCP_AGENT_URLS + local_workers.urls, max_failures=GATEWAY_MAX_FAILURES,
+                   eject_seconds=GATEWAY_EJECT_SECONDS, health_interval=GATEWAY_HEALTH_INTERVAL,
+                   load_factor=GATEWAY_LOAD_FACTOR)
+client = None
+
+
+def route_timeout(tool: str) -> httpx.Timeout:
+    read = GATEWAY_ROUTE_TIMEOUTS.get(tool, GATEWAY_DEFAULT_TIMEOUT)
+    return httpx.Timeout(read, connect=GATEWAY_CONNECT_TIMEOUT)
 
-        response = requests.post(
-            f"{MCP_AGENT_URL}/generate-patch",
-            json=data,
-            timeout=120
+
+def forward_headers(request: Request) -> dict:
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP}
+    client_host = request.client.host if request.client else None
+    if client_host:
+        prior = request.headers.get('x-forwarded-for')
+        headers['x-forwarded-for'] = f"{prior}, {client_host}" if prior else client_host
+    return headers
+
+
+class BodyStream:
+    """The client's request body as an async iterator that remembers whether it was started"""
+
+    def __init__(self, request: Request):
+        self.request = request
+        self.started = False
+
+    async def __aiter__(self):
+        self.started = True
+        async for chunk in self.request.stream():
+            yield chunk
+
+
+async def proxy(request: Request, path: str, tool: str):
+    """Stream request to a backend's path (by snapshot, else least busy) and its response back"""
+    body = BodyStream(request)
+    headers = forward_headers(request)
+    snapshot = request.headers.get('x-workspace-snapshot')
+    tried = set()
+
+    while True:
+        backend = pool.pick(exclude=tried, key=snapshot)
+        started = time.monotonic()
+        tried.add(backend.url)
+        pool.acquire(backend)
+        upstream_request = client.build_request(
+            request.method, f"{backend.url}{path}", params=request.query_params,
+            headers=headers, content=body, timeout=route_timeout(tool)
         )
+        try:
+            upstream = await client.send(upstream_request, stream=True)
+        except httpx.HTTPError as e:
+            pool.release(backend, time.monotonic() - started)
+            pool.failed(backend, f"{e.__class__.__name__}: {e}" if str(e) else e.__class__.__name__)
+            # Nothing was sent if the connection never opened, so another backend can take it
+            if (isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+                    and not body.started and len(tried) < len(pool.backends)):
+                continue
+            status = 504 if isinstance(e, httpx.TimeoutException) else 502
+            return JSONResponse({'success': False, 'error': f"Upstream {backend.url} failed: {e.__class__.__name__}"},
+                                status_code=status)
+        break
+
+    if upstream.status_code in BACKEND_FAILURE_STATUSES:
+        pool.failed(backend, f"HTTP {upstream.status_code}")
+    else:
+        pool.succeeded(backend)
+
+    async def relay():
+        # aiter_raw passes the body through as received, still compressed if it was.
+        # The finally also runs when the client goes away mid-stream.
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+            pool.release(backend, time.monotonic() - started)
+
+    response_headers = {k: v for k, v in upstream.headers.items() if k.lower() not in HOP_BY_HOP}
+    response_headers['x-mcp-backend'] = backend.url
+    return StreamingResponse(relay(), status_code=upstream.status_code, headers=response_headers)
+
+
+async def tool_call(request: Request):
+    """Proxy an MCP tool call (what MCPHTTPClient sends)"""
+    tool = request.path_params['tool']
+    return await proxy(request, f"/tools/{tool}", tool)
+
+
+async def generate_patch(request: Request):
+    """Older route for patch generation"""
+    return await proxy(request, '/tools/generate_patch', 'generate_patch')
+
+
+async def health(request: Request):
+    backends = pool.stats()
+    healthy = sum(1 for b in backends if b['healthy'])
+    return JSONResponse({
+        'status': 'healthy' if healthy else 'degraded',
+        'service': 'mcp-gateway',
+        'backends': backends
+    }, status_code=200 if healthy else 503)
+
+
+async def metrics(request: Request):
+    """Per-backend queue depth, throughput and health for Prometheus"""
+    return PlainTextResponse(pool.metrics(), media_type='text/plain; version=0.0.4')
+
+
+async def list_workers(request: Request):
+    return JSONResponse({'backends': pool.stats(), 'local_workers': local_workers.stats()})
+
+
+def is_admin(request: Request) -> bool:
+    """Whether the request carries GATEWAY_ADMIN_TOKEN (never, if no token is configured)"""
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    return bool(GATEWAY_ADMIN_TOKEN) and scheme.lower() == 'bearer' and hmac.compare_digest(
+        token.encode('utf-8'), GATEWAY_ADMIN_TOKEN.encode('utf-8'))
+
+
+async def worker_action(request: Request):
+    """drain, resume or (local workers only) restart a backend, by index or URL; admin token required"""
+    if not GATEWAY_ADMIN_TOKEN:
+        return JSONResponse({'success': False, 'error': 'Worker actions are disabled (set GATEWAY_ADMIN_TOKEN)'},
+                            status_code=403)
+    if not is_admin(request):
+        return JSONResponse({'success': False, 'error': 'Admin token required'}, status_code=401,
+                            headers={'WWW-Authenticate': 'Bearer'})
+    name, action = request.path_params['name'], request.path_params['action']
+    backend = pool.find(name)
+    if backend is None:
+        return JSONResponse({'success': False, 'error': f'No backend {name}'}, status_code=404)
+
+    if action == 'drain':
+        drained = await pool.drain(backend, GATEWAY_DRAIN_SECONDS)
+        return JSONResponse({'success': True, 'drained': drained, 'outstanding': backend.outstanding})
+    if action == 'resume':
+        pool.resume(backend)
+        return JSONResponse({'success': True})
+    if action == 'restart':
+        worker = local_workers.find(backend.url)
+        if worker is None:
+            return JSONResponse({'success': False, 'error': 'Only local workers can be restarted'},
+                                status_code=400)
+        drained, ready = await local_workers.restart(pool, client, worker, GATEWAY_DRAIN_SECONDS)
+        if not ready:
+            return JSONResponse({'success': False, 'drained': drained,
+                                 'error': 'Worker did not become ready; it stays drained'}, status_code=503)
+        return JSONResponse({'success': True, 'drained': drained})
+    return JSONResponse({'success': False, 'error': f'Unknown action {action}'}, status_code=404)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global client
+    client = httpx.AsyncClient(limits=httpx.Limits(max_connections=GATEWAY_MAX_CONNECTIONS,
+                                                   max_keepalive_connections=GATEWAY_MAX_KEEPALIVE))
+    if local_workers.workers:
+        await local_workers.start(client)
+        local_workers.supervise(max(GATEWAY_HEALTH_INTERVAL, 1.0))
+    pool.start_health_checks(client)
+    try:
+        yield
+    finally:
+        # Let in-flight calls finish before the workers go away
+        await asyncio.gather(*(pool.drain(b, GATEWAY_DRAIN_SECONDS) for b in pool.backends))
+        await pool.stop_health_checks()
+        await local_workers.stop()
+        await client.aclose()
+
 
-        return jsonify(response.json()), response.status_code
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+app = Starlette(routes=[
+    Route('/tools/{tool}', tool_call, methods=['POST']),
+    Route('/generate-patch', generate_patch, methods=['POST']),
+    Route('/health', health, methods=['GET']),
+    Route('/metrics', metrics, methods=['GET']),
+    Route('/workers', list_workers, methods=['GET']),
+    Route('/workers/{name:path}/{action}', worker_action, methods=['POST']),
+], lifespan=lifespan)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=3000)
+    port = int(os.getenv('PORT', 3000))
+    print(f"Starting MCP gateway on port {port}")
+    print(f"Agent backends: {', '.join(b.url for b in pool.backends)}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -0,0 +1,85 @@
+"""
+Tests for backend selection: the hash ring and bounded-load picking
+"""
+
+import time
+
+from upstreams import Backend, BackendPool, HashRing
+
+URLS = [f'http://agent-{i}:9000' for i in range(4)]
+
+
+def busy(pool, url, outstanding):
+    pool.find(url).outstanding = outstanding
+
+
+class TestHashRing:
+    """Test ring walks"""
+
+    def test_walk_visits_each_backend_once(self):
+        """A walk yields every backend exactly once, whatever the key"""
+        ring = HashRing([Backend(url) for url in URLS], vnodes=16)
+        for key in ('a', 'snapshot-1', 'snapshot-2'):
+            assert sorted(b.url for b in ring.walk(key)) == URLS
+
+    def test_walk_is_stable_per_key(self):
+        """The same key starts at the same backend"""
+        ring = HashRing([Backend(url) for url in URLS])
+        assert [b.url for b in ring.walk('abc')] == [b.url for b in ring.walk('abc')]
+
+    def test_removing_a_backend_keeps_other_keys(self):
+        """Only keys that lived on a removed backend move"""
+        backends = [Backend(url) for url in URLS]
+        before = HashRing(backends)
+        after = HashRing(backends[1:])
+        for i in range(200):
+            key = f'snapshot-{i}'
+            first = next(before.walk(key))
+            if first.url != URLS[0]:
+                assert next(after.walk(key)).url == first.url
+
+
+class TestPick:
+    """Test snapshot affinity, load bounds and fallbacks"""
+
+    def test_same_key_same_backend(self):
+        """Requests for one snapshot go to one backend while it has room"""
+        pool = BackendPool(URLS)
+        assert len({pool.pick(key='snapshot-1').url for _ in range(10)}) == 1
+
+    def test_overloaded_backend_passes_the_key_on(self):
+        """A backend over the load bound hands the key to the next one on the ring"""
+        pool = BackendPool(URLS, load_factor=1.25)
+        walk = [b.url for b in pool.ring.walk('snapshot-1')]
+        busy(pool, walk[0], 10)
+        assert pool.pick(key='snapshot-1').url == walk[1]
+
+    def test_load_within_bound_keeps_affinity(self):
+        """A few requests in flight do not break affinity"""
+        pool = BackendPool(URLS, load_factor=1.25)
+        home = next(pool.ring.walk('snapshot-1')).url
+        busy(pool, home, 1)
+        assert pool.pick(key='snapshot-1').url == home
+
+    def test_no_key_picks_least_outstanding(self):
+        """Without a snapshot the least busy backend wins"""
+        pool = BackendPool(URLS)
+        for url, outstanding in zip(URLS, (3, 1, 0, 2)):
+            busy(pool, url, outstanding)
+        assert pool.pick().url == URLS[2]
+
+    def test_draining_and_excluded_backends_are_skipped(self):
+        """Draining and already tried backends are not picked while others are available"""
+        pool = BackendPool(URLS)
+        home = next(pool.ring.walk('snapshot-1'))
+        home.draining = True
+        assert pool.pick(key='snapshot-1').url != home.url
+        assert pool.pick(exclude=set(URLS[:3])).url == URLS[3]
+
+    def test_all_ejected_tries_least_recently_ejected(self):
+        """With every backend ejected, the one whose ejection ends first is still tried"""
+        pool = BackendPool(URLS)
+        now = time.monotonic()
+        for i, backend in enumerate(pool.backends):
+            backend.ejected_until = now + 60 - i
+        assert pool.pick().url == URLS[3]
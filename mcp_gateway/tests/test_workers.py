@@ -0,0 +1,47 @@
+"""
+Tests for rolling restarts of local agent workers
+"""
+
+import asyncio
+
+from upstreams import BackendPool
+from workers import LocalWorkers
+
+
+class FakeWorker:
+    """Stands in for an agent process"""
+
+    def __init__(self, url, ready):
+        self.url, self.port, self.ready, self.restarts = url, 9100, ready, 0
+
+    async def stop(self):
+        pass
+
+    def start(self):
+        pass
+
+    async def wait_ready(self, client, timeout):
+        return self.ready
+
+
+def restart(ready):
+    pool = BackendPool(['http://127.0.0.1:9100'])
+    worker = FakeWorker('http://127.0.0.1:9100', ready)
+    result = asyncio.run(LocalWorkers('.', 0, 9100).restart(pool, None, worker, drain_timeout=0))
+    return result, pool.backends[0]
+
+
+class TestRestart:
+    """Test that a restart only resumes a worker that came up"""
+
+    def test_ready_worker_is_resumed(self):
+        """A worker that answers health checks goes back into rotation"""
+        (drained, ready), backend = restart(ready=True)
+        assert drained and ready
+        assert not backend.draining
+
+    def test_worker_that_is_not_ready_stays_drained(self):
+        """A worker that never comes up is reported and left out of rotation"""
+        (drained, ready), backend = restart(ready=False)
+        assert drained and not ready
+        assert backend.draining
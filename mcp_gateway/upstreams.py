@@ -0,0 +1,230 @@
+"""
+Agent backends behind the gateway and how requests are spread over them
+
+Each backend counts its outstanding (in-flight) requests - its queue
+depth. Requests that carry a workspace snapshot id (X-Workspace-Snapshot)
+are placed by consistent hashing on it, so the same code version keeps
+landing on the same worker and its file index, file cache and LLM cache
+stay warm; adding or removing a worker only moves the keys next to it on
+the ring. To keep one hot snapshot from piling onto a single worker, a
+backend already over load_factor times the mean queue depth passes the
+request on to the next one on the ring (consistent hashing with bounded
+loads). Requests without a snapshot go to the backend with the fewest
+in flight, ties broken round-robin.
+
+A backend is ejected for eject_seconds after max_failures consecutive
+failures (connection errors, timeouts, 502-504), and an active health
+check of GET /health brings it back early - or ejects it - between
+requests. If every backend is ejected, the least recently ejected one is
+still tried rather than failing outright. A draining backend takes no
+new requests but finishes the ones it has.
+"""
+import asyncio
+import bisect
+import hashlib
+import itertools
+import math
+import time
+
+import httpx
+
+
+class Backend:
+    """One mcp_agent base URL and its load and health counters"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.outstanding = 0
+        self.peak_outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.draining = False
+        self.last_error = None
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until and not self.draining
+
+    def stats(self, now: float) -> dict:
+        return {
+            'url': self.url,
+            'healthy': now >= self.ejected_until,
+            'draining': self.draining,
+            'outstanding': self.outstanding,
+            'peak_outstanding': self.peak_outstanding,
+            'requests': self.requests,
+            'errors': self.errors,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'ejected_for': round(max(0.0, self.ejected_until - now), 1),
+            'last_error': self.last_error
+        }
+
+
+class HashRing:
+    """Consistent hash ring with vnodes points per backend"""
+
+    def __init__(self, backends: list, vnodes: int = 64):
+        points = sorted(((self.hash(f"{backend.url}#{i}"), backend)
+                         for backend in backends for i in range(vnodes)), key=lambda point: point[0])
+        self.hashes = [h for h, _ in points]
+        self.backends = [b for _, b in points]
+        self.size = len(backends)
+
+    @staticmethod
+    def hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def walk(self, key: str):
+        """Distinct backends in ring order, starting at the key's position"""
+        seen = set()
+        start = bisect.bisect(self.hashes, self.hash(key))
+        for i in range(len(self.backends)):
+            backend = self.backends[(start + i) % len(self.backends)]
+            if backend.url not in seen:
+                seen.add(backend.url)
+                yield backend
+                if len(seen) == self.size:
+                    return
+
+
+class BackendPool:
+    """Snapshot-affine or least-outstanding selection with passive and active health checks"""
+
+    def __init__(self, urls: list, max_failures: int = 3, eject_seconds: float = 30.0,
+                 health_interval: float = 10.0, health_timeout: float = 2.0, load_factor: float = 1.25,
+                 vnodes: int = 64):
+        if not urls:
+            raise ValueError('At least one agent URL is required')
+        self.backends = [Backend(url) for url in urls]
+        self.ring = HashRing(self.backends, vnodes)
+        self.load_factor = load_factor
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self._turn = itertools.count()
+        self._health_task = None
+
+    def pick(self, exclude: set = (), key: str = None) -> Backend:
+        """The backend for key on the ring (within its load bound), else the one with fewest in flight"""
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b.url not in exclude] or list(self.backends)
+        healthy = [b for b in candidates if b.available(now)]
+        if not healthy:
+            live = [b for b in candidates if not b.draining] or candidates
+            return min(live, key=lambda b: b.ejected_until)
+
+        if key:
+            # Counting this request, nobody may go over load_factor times the mean
+            # (plus one, so that a few requests in flight never break affinity)
+            total = sum(b.outstanding for b in healthy) + 1
+            bound = math.ceil(self.load_factor * total / len(healthy)) + 1
+            usable = {b.url for b in healthy}
+            for backend in self.ring.walk(key):
+                if backend.url in usable and backend.outstanding + 1 <= bound:
+                    return backend
+
+        fewest = min(b.outstanding for b in healthy)
+        tied = [b for b in healthy if b.outstanding == fewest]
+        return tied[next(self._turn) % len(tied)]
+
+    def find(self, name: str) -> Backend:
+        """Backend by index in the pool or by URL; None if there is no such backend"""
+        if name.isdigit() and int(name) < len(self.backends):
+            return self.backends[int(name)]
+        return next((b for b in self.backends if b.url == name.rstrip('/')), None)
+
+    def acquire(self, backend: Backend):
+        backend.outstanding += 1
+        backend.peak_outstanding = max(backend.peak_outstanding, backend.outstanding)
+        backend.requests += 1
+
+    def release(self, backend: Backend, seconds: float = 0.0):
+        backend.outstanding -= 1
+        backend.busy_seconds += seconds
+
+    async def drain(self, backend: Backend, timeout: float) -> bool:
+        """Stop sending backend new requests and wait for its in-flight ones; False on timeout"""
+        backend.draining = True
+        deadline = time.monotonic() + timeout
+        while backend.outstanding > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        return backend.outstanding == 0
+
+    def resume(self, backend: Backend):
+        backend.draining = False
+
+    def succeeded(self, backend: Backend):
+        backend.consecutive_failures = 0
+
+    def failed(self, backend: Backend, error: str):
+        backend.errors += 1
+        backend.consecutive_failures += 1
+        backend.last_error = error
+        if backend.consecutive_failures >= self.max_failures:
+            backend.ejected_until = time.monotonic() + self.eject_seconds
+            print(f"[Gateway] Ejected {backend.url} for {self.eject_seconds}s: {error}", flush=True)
+
+    async def check_health(self, client: httpx.AsyncClient):
+        """Probe every backend once; a healthy answer reinstates an ejected backend"""
+        async def probe(backend):
+            try:
+                response = await client.get(f"{backend.url}/health", timeout=self.health_timeout)
+                ok = response.status_code == 200
+                error = None if ok else f"health check returned {response.status_code}"
+            except httpx.HTTPError as e:
+                ok, error = False, f"health check failed: {e.__class__.__name__}"
+            if ok:
+                if backend.ejected_until:
+                    print(f"[Gateway] {backend.url} is healthy again", flush=True)
+                backend.ejected_until = 0.0
+                backend.consecutive_failures = 0
+            else:
+                backend.last_error = error
+                backend.ejected_until = time.monotonic() + self.eject_seconds
+
+        await asyncio.gather(*(probe(b) for b in self.backends))
+
+    def start_health_checks(self, client: httpx.AsyncClient):
+        async def loop():
+            while True:
+                await self.check_health(client)
+                await asyncio.sleep(self.health_interval)
+
+        if self.health_interval > 0 and self._health_task is None:
+            self._health_task = asyncio.get_running_loop().create_task(loop())
+
+    async def stop_health_checks(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    def stats(self) -> list:
+        now = time.monotonic()
+        return [b.stats(now) for b in self.backends]
+
+    def metrics(self) -> str:
+        """Per-backend counters in the Prometheus text format"""
+        gauges = [
+            ('mcp_gateway_backend_outstanding', 'gauge', 'Requests in flight (queue depth)', 'outstanding'),
+            ('mcp_gateway_backend_peak_outstanding', 'gauge', 'Most requests ever in flight', 'peak_outstanding'),
+            ('mcp_gateway_backend_requests_total', 'counter', 'Requests sent', 'requests'),
+            ('mcp_gateway_backend_errors_total', 'counter', 'Failed requests', 'errors'),
+            ('mcp_gateway_backend_busy_seconds_total', 'counter', 'Summed request durations', 'busy_seconds'),
+            ('mcp_gateway_backend_healthy', 'gauge', '1 unless ejected', 'healthy'),
+            ('mcp_gateway_backend_draining', 'gauge', '1 while draining', 'draining'),
+        ]
+        stats = self.stats()
+        lines = []
+        for name, kind, help_text, field in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for backend in stats:
+                lines.append(f'{name}{{backend="{backend["url"]}"}} {float(backend[field])}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,144 @@
+"""
+Local mcp_agent worker processes managed by the gateway
+
+With GATEWAY_LOCAL_WORKERS=N the gateway starts N copies of the agent's
+HTTP server (python http_server.py from MCP_AGENT_DIR) on consecutive
+ports from GATEWAY_WORKER_BASE_PORT and puts them in its backend pool,
+instead of - or next to - agent containers listed in MCP_AGENT_URLS.
+A worker that exits is started again by supervise(); restart() replaces
+one worker gracefully (drain, stop, start, resume) for rolling restarts;
+a replacement that does not come up stays drained.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+class LocalWorker:
+    """One agent process on one port"""
+
+    def __init__(self, agent_dir: str, port: int, env: dict = None):
+        self.agent_dir = agent_dir
+        self.port = port
+        self.env = env or {}
+        self.process = None
+        self.restarts = 0
+        self.stopping = False    # stopped on purpose: not for the supervisor to restart
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        self.stopping = False
+        env = dict(os.environ, **self.env, PORT=str(self.port))
+        self.process = subprocess.Popen([sys.executable, 'http_server.py'], cwd=self.agent_dir, env=env)
+        print(f"[Gateway] Started agent worker pid {self.process.pid} on port {self.port}", flush=True)
+
+    async def wait_ready(self, client: httpx.AsyncClient, timeout: float) -> bool:
+        """Poll GET /health until the worker answers; False if it does not within timeout"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.running:
+            try:
+                if (await client.get(f"{self.url}/health", timeout=1.0)).status_code == 200:
+                    return True
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+        return False
+
+    async def stop(self, timeout: float = 10.0):
+        """SIGTERM (uvicorn finishes open requests), then SIGKILL after timeout"""
+        self.stopping = True
+        if not self.running:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.to_thread(self.process.wait, timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            await asyncio.to_thread(self.process.wait)
+
+
+class LocalWorkers:
+    """A fixed set of local agent workers"""
+
+    def __init__(self, agent_dir: str, count: int, base_port: int, env: dict = None):
+        self.workers = [LocalWorker(agent_dir, base_port + i, env) for i in range(count)]
+        self._supervisor = None
+
+    @property
+    def urls(self) -> list:
+        return [worker.url for worker in self.workers]
+
+    def find(self, url: str):
+        return next((worker for worker in self.workers if worker.url == url), None)
+
+    async def start(self, client: httpx.AsyncClient, ready_timeout: float = 30.0):
+        """Start every worker and wait until they answer health checks"""
+        for worker in self.workers:
+            worker.start()
+        ready = await asyncio.gather(*(worker.wait_ready(client, ready_timeout) for worker in self.workers))
+        for worker, ok in zip(self.workers, ready):
+            if not ok:
+                print(f"[Gateway] Agent worker on port {worker.port} is not ready after {ready_timeout}s",
+                      flush=True)
+
+    async def restart(self, pool, client: httpx.AsyncClient, worker: LocalWorker, drain_timeout: float,
+                      ready_timeout: float = 30.0) -> tuple:
+        """
+        Drain the worker's backend, replace the process, and put it back in
+        rotation once it is up. Returns (drained, ready); a worker that is
+        not ready within ready_timeout is left draining.
+        """
+        backend = pool.find(worker.url)
+        drained = await pool.drain(backend, drain_timeout)
+        await worker.stop()
+        worker.start()
+        worker.restarts += 1
+        ready = await worker.wait_ready(client, ready_timeout)
+        if ready:
+            pool.resume(backend)
+        else:
+            print(f"[Gateway] Agent worker on port {worker.port} is not ready after {ready_timeout}s, "
+                  f"left draining", flush=True)
+        return drained, ready
+
+    def supervise(self, interval: float):
+        """Start workers again if they exit on their own"""
+        async def loop():
+            while True:
+                await asyncio.sleep(interval)
+                for worker in self.workers:
+                    if not worker.running and not worker.stopping:
+                        code = worker.process.returncode if worker.process else None
+                        print(f"[Gateway] Agent worker on port {worker.port} exited ({code}), restarting",
+                              flush=True)
+                        worker.start()
+                        worker.restarts += 1
+
+        self._supervisor = asyncio.get_running_loop().create_task(loop())
+
+    async def stop(self, timeout: float = 10.0):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        await asyncio.gather(*(worker.stop(timeout) for worker in self.workers))
+
+    def stats(self) -> dict:
+        return {
+            worker.url: {
+                'pid': worker.process.pid if worker.process else None,
+                'running': worker.running,
+                'restarts': worker.restarts
+            }
+            for worker in self.workers
+        }